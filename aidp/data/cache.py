@@ -0,0 +1,144 @@
+"""This module defines an on-disk cache for data files that have already been parsed"""
+import hashlib
+import logging
+import os
+import pathlib
+import pickle
+import pandas as pd
+
+DEFAULT_CACHE_DIR = pathlib.Path(__file__).parent.parent.parent / 'cache'
+# Entries are parquet files, or pickles of the frames Arrow can't store
+ENTRY_SUFFIXES = ('.parquet', '.pkl')
+
+class DataFileCache:
+    """Stores parsed DataFrames as parquet files keyed by the content hash and mtime of their source file
+
+    Frames that Arrow rejects, such as ones with object columns mixing numbers and text
+    (e.g. a Subject or GroupID column holding both 1001 and 'Albany_2attempt'), are
+    pickled instead, so they come back exactly as parsed.  Entries for a source file whose content has changed are evicted the next time that file
+    is looked up, and the cache as a whole is kept under `max_bytes` by evicting the least
+    recently used entries.
+    """
+    _logger = logging.getLogger(__name__)
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._enabled = True
+
+    def load(self, filepath, variant=''):
+        """Returns the cached DataFrame for a file, or None if there is no valid entry
+
+        Arguments:
+            filepath {string} -- filepath of the source data file
+
+        Keyword Arguments:
+            variant {string} -- extra key for different parses of the same file (default: {''})
+        """
+        if not self._enabled:
+            return None
+
+        entry = self._entry_path(filepath, variant)
+        self._evict_stale(filepath, entry)
+        if not entry.exists():
+            entry = entry.with_suffix('.pkl')
+        if not entry.exists():
+            self._logger.info("Cache miss for input file: %s", filepath)
+            return None
+
+        try:
+            data = pd.read_parquet(str(entry)) if entry.suffix == '.parquet' else pd.read_pickle(str(entry))
+        except ImportError:
+            self._disable()
+            return None
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            self._logger.warning("Discarding unreadable cache entry: %s", entry)
+            _remove(entry)
+            return None
+
+        os.utime(str(entry))
+        self._logger.info("Cache hit for input file: %s (reusing %s)", filepath, entry.name)
+        return data
+
+    def store(self, filepath, data, variant=''):
+        """Writes a parsed DataFrame to the cache
+
+        Arguments:
+            filepath {string} -- filepath of the source data file
+            data {DataFrame} -- parsed contents of the file
+
+        Keyword Arguments:
+            variant {string} -- extra key for different parses of the same file (default: {''})
+        """
+        if not self._enabled:
+            return
+
+        entry = self._entry_path(filepath, variant)
+        os.makedirs(str(self.cache_dir), exist_ok=True)
+        tmp_entry = entry.with_suffix('.tmp')
+        try:
+            data.to_parquet(str(tmp_entry))
+        except ImportError:
+            self._disable()
+            _remove(tmp_entry)
+            return
+        except (TypeError, ValueError) as error:
+            # Arrow only stores columns of one type
+            self._logger.debug("Pickling input file %s instead of writing parquet: %s", filepath, error)
+            entry = entry.with_suffix('.pkl')
+            data.to_pickle(str(tmp_entry))
+        os.replace(str(tmp_entry), str(entry))
+
+        self._logger.debug("Cached input file %s as %s", filepath, entry.name)
+        evict_lru(self.cache_dir, self.max_bytes, ['*' + suffix for suffix in ENTRY_SUFFIXES])
+
+    def _entry_path(self, filepath, variant):
+        source_id = _hash_text(os.path.abspath(str(filepath)))
+        name = '%s_%s_%s.parquet' %(source_id, _content_hash(filepath), _hash_text(variant))
+        return self.cache_dir / name
+
+    def _evict_stale(self, filepath, entry):
+        source_id, content_id, _ = entry.stem.split('_')
+        for stale in self.cache_dir.glob('%s_*' %source_id):
+            if stale.suffix in ENTRY_SUFFIXES and stale.stem.split('_')[1] != content_id:
+                self._logger.info("Evicting stale cache entry: %s", stale.name)
+                _remove(stale)
+
+    def _disable(self):
+        self._logger.warning("Parquet support (pyarrow) is not installed.  Input file caching is disabled")
+        self._enabled = False
+
+def evict_lru(directory, max_bytes, pattern='*'):
+    """Deletes the least recently used files in a directory until it is under a size budget
+
+    Arguments:
+        directory {Path} -- directory holding the cached files
+        max_bytes {int} -- total size the matching files are allowed to use
+        pattern {string or list(string)} -- glob pattern(s) of the files to consider (default: {'*'})
+    """
+    patterns = [pattern] if isinstance(pattern, str) else pattern
+    entries = sorted((entry for pattern in patterns for entry in pathlib.Path(directory).glob(pattern)),
+                     key=lambda p: p.stat().st_mtime, reverse=True)
+    used = 0
+    for entry in entries:
+        used += entry.stat().st_size
+        if used > max_bytes:
+            logging.getLogger(__name__).info("Evicting least recently used cache entry: %s", entry.name)
+            _remove(entry)
+
+def _content_hash(filepath):
+    stat = os.stat(str(filepath))
+    digest = hashlib.sha1(('%d:%d:' %(stat.st_mtime_ns, stat.st_size)).encode())
+    with open(str(filepath), 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:20]
+
+def _hash_text(text):
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+def _remove(path):
+    try:
+        os.remove(str(path))
+    except FileNotFoundError:
+        pass
@@ -6,10 +6,12 @@
 import logging
 import pathlib
 from abc import ABC, abstractmethod
+import numpy as np
 import pandas as pd
-from aidp.data.groupings import ParkinsonsVsControlGrouping, MsaPspVsPdGrouping, MsaVsPdPspGrouping, PspVsPdMsaGrouping, PspVsMsaGrouping, PdVsMsaGrouping
-from aidp.ml.predictors import Predictor, LinearSvcPredictor
-from aidp.report.writers import LogReportWriter
+from aidp.data.schema import get_schema
+from aidp.data.groupings import GroupIndex, ParkinsonsVsControlGrouping, MsaPspVsPdGrouping, MsaVsPdPspGrouping, PspVsPdMsaGrouping, PspVsMsaGrouping, PdVsMsaGrouping
+from aidp.ml.compact import CompactLinearModel
+from aidp.ml.registry import get_registry
 import itertools
 
 class DataExperiment(ABC):
@@ -24,46 +26,191 @@ class DataExperiment(ABC):
    
     ]
    
-    report_writer = LogReportWriter()
+    report_writer = None
 
     def __init__(self):
         self._logger = logging.getLogger(__name__)
 
     @abstractmethod
-    def filter_data(self, data):
+    def feature_columns(self, schema):
+        """Returns the names of the feature columns used by this experiment, in schema order"""
         pass #pragma: no cover
 
-    def predict(self, data, model_key):
+    def filter_data(self, data):
+        schema = get_schema()
+        return data[[schema.target] + self.feature_columns(schema)]
+
+    def filter_features(self, features):
+        """Selects this experiment's columns from a feature matrix laid out by the column schema
+
+        Arguments:
+            features {ndarray} -- feature matrix from `ColumnSchema.to_matrix`
+        """
+        schema = get_schema()
+        return features[:, schema.projection(self.feature_columns(schema))]
+
+    def predict(self, data, model_key, index=None, groupings=None):
+        """Makes predictions with every grouping's model, or with the given groupings' models only
+
+        Arguments:
+            data {DataFrame or ndarray} -- input data, or the feature matrix built from it by the column schema
+            model_key {str} -- name of the models to use
+
+        Keyword Arguments:
+            index {Index} -- row labels for the results (default: {the index of `data`})
+            groupings {list(str)} -- keys of the groupings to predict (default: {None, all of them})
+        """
         self._logger.info("Starting model prediction")
-        filtered_data = self.filter_data(data)
-        for grouping in self.groupings:
-            predictor = Predictor()
-            predictor.load_model_from_file(self.key, grouping.key, model_key)
+        if isinstance(data, pd.DataFrame):
+            index = data.index if index is None else index
+            data = get_schema().to_matrix(data)
+        self._prediction_index = pd.RangeIndex(len(data)) if index is None else index
+        filtered_data = self.filter_features(data)
+        registry = get_registry()
+        self._predicted_groupings = self._select_groupings(groupings)
+        for grouping in self._predicted_groupings:
+            predictor = registry.get(model_key, self.key, grouping.key)
             grouping.predictions = predictor.make_predictions(filtered_data)
         self._logger.info("Starting model prediction")
 
+    def set_predictions(self, predictions, index, groupings=None):
+        """Stores predictions made outside of `predict`, e.g. by a fused scorer, so `get_results` returns them
+
+        Arguments:
+            predictions {ndarray} -- positive class probabilities, one column per grouping in `groupings` order
+            index {Index} -- row labels for the results
+
+        Keyword Arguments:
+            groupings {list(str)} -- keys of the groupings the predictions are for (default: {None, all of them})
+        """
+        self._prediction_index = index
+        self._predicted_groupings = self._select_groupings(groupings)
+        for i, grouping in enumerate(self._predicted_groupings):
+            grouping.predictions = predictions[:, i]
+
+    def compact_models(self, model_key, groupings=None):
+        """Returns the (experiment key, grouping key) and compact model of every grouping, or of the given groupings
+
+        Models that only exist as pickles are converted in memory.
+
+        Arguments:
+            model_key {str} -- name of the models to use
+
+        Keyword Arguments:
+            groupings {list(str)} -- keys of the groupings to return (default: {None, all of them})
+        """
+        registry = get_registry()
+        feature_names = self.feature_columns(get_schema())
+        models = []
+        for grouping in self._select_groupings(groupings):
+            model = registry.get(model_key, self.key, grouping.key)
+            if not isinstance(model, CompactLinearModel):
+                model = CompactLinearModel.from_pipeline(model.classifier, feature_names)
+            models.append(((self.key, grouping.key), model))
+        return models
 
-    def train(self, data, model_key, save_models=True):
+    def load_models(self, model_key):
+        """Loads every grouping's model for `model_key` into the model registry, so later predictions don't reload them
+
+        Arguments:
+            model_key {str} -- name of the models to load
+        """
+        registry = get_registry()
+        for grouping in self.groupings:
+            registry.get(model_key, self.key, grouping.key)
+        return self
+
+    def export_models(self, model_key):
+        """Writes compact .npz artifacts for every grouping's saved model
+
+        Arguments:
+            model_key {str} -- name of the models to export
+        """
+        from aidp.ml.predictors import Predictor
+        feature_names = self.feature_columns(get_schema())
+        for grouping in self.groupings:
+            Predictor().load_model_from_file(self.key, grouping.key, model_key) \
+                .export_compact(self.key, grouping.key, model_key, feature_names)
+        return self
+
+
+    def train(self, data, model_key, save_models=True, features=None, group_index=None, settings=None,
+              precompute_gram=False, bootstrap=0, cache=None):
+        """Trains, reports on and saves a model for every grouping, one after another
+
+        Arguments:
+            data {DataFrame} -- training data, including the GroupID column
+            model_key {str} -- name to save the models under
+
+        Keyword Arguments:
+            save_models {bool} -- write the models to disk (default: {True})
+            features {ndarray} -- feature matrix of `data` from the column schema, if already built (default: {None})
+            group_index {GroupIndex} -- GroupID index of `data`, if already built (default: {None})
+            settings {dict} -- LinearSvcPredictor attributes to override, e.g. {'search': 'path'} (default: {None})
+            precompute_gram {bool} -- tune C over slices of each model's Gram matrix (default: {False})
+            bootstrap {int} -- bootstrap resamples for the metrics' confidence intervals, 0 for none (default: {0})
+            cache {TrainingCache} -- reuses the models of unchanged jobs and stores the rest (default: {None})
+        """
         self._logger.info("Starting model training")
-        #TODO: Implement Training mechanism
-        filtered_data = self.filter_data(data)
+        jobs = self.training_jobs(data, features, group_index, settings, precompute_gram, bootstrap)
+        for job in jobs:
+            if cache is None or not cache.restore(job):
+                job.run(self.report_writer)
+                if cache is not None:
+                    cache.store(job)
+        self.finish_training(jobs, model_key, save_models)
+
+    def training_jobs(self, data, features=None, group_index=None, settings=None, precompute_gram=False, bootstrap=0):
+        """Returns a TrainingJob for every grouping, each holding its own copy of the grouping's rows
+
+        Arguments:
+            data {DataFrame} -- training data, including the GroupID column
 
+        Keyword Arguments:
+            features {ndarray} -- feature matrix of `data` from the column schema, if already built (default: {None})
+            group_index {GroupIndex} -- GroupID index of `data`, if already built (default: {None})
+            settings {dict} -- LinearSvcPredictor attributes to override, e.g. {'search': 'path'} (default: {None})
+            precompute_gram {bool} -- have each job tune C over slices of the Gram matrix of its training
+                rows, unless it is too large for memory (default: {False})
+            bootstrap {int} -- bootstrap resamples for the metrics' confidence intervals, 0 for none (default: {0})
+        """
+        # sklearn is only imported for training, so predicting with compact models never loads it
+        from aidp.ml.predictors import TrainingJob
+
+        schema = get_schema()
+        features = self.filter_features(schema.to_matrix(data) if features is None else features)
+        group_index = GroupIndex(data[schema.target]) if group_index is None else group_index
+
+        jobs = []
+        for grouping in self.groupings:
+            # Each grouping is a set of rows and new labels over the shared feature matrix.  Indexing by
+            # the rows copies them, so every job carries only its own rows to a worker process
+            grouping.index_data(group_index)
+            jobs.append(TrainingJob(self.key, grouping.key, features[grouping.rows], grouping.labels, settings=settings,
+                                    precompute_gram=precompute_gram,
+                                    bootstrap=bootstrap))
+        return jobs
+
+    def finish_training(self, jobs, model_key, save_models=True):
+        """Saves the models of finished training jobs and writes their metrics to the Training_Performance CSV
+
+        Arguments:
+            jobs {list(TrainingJob)} -- finished jobs of this experiment, in grouping order
+            model_key {str} -- name to save the models under
+
+        Keyword Arguments:
+            save_models {bool} -- write the models to disk (default: {True})
+        """
+        schema = get_schema()
         master_outcome_num = []	
         master_outcome_grp = []	
 
-        for grouping in self.groupings:
-            grouping.group_data(filtered_data).grouped_data
-            self._logger.debug("Training model for grouping: %s", grouping.key)
-            trainer = LinearSvcPredictor()
-            trainer.train_model(grouping.grouped_data) 
-            # Write report of the results
-            training_output, validation_output = self.report_writer.write_report(trainer.classifier.best_estimator_, trainer.X_train, trainer.Y_train, trainer.X_test, trainer.Y_test)
-            
+        for job in jobs:
             # make a group list
-            master_outcome_grp.append(grouping.key)
+            master_outcome_grp.append(job.grouping_key)
 
             # make a data list
-            combined_data = list(itertools.chain.from_iterable([training_output, validation_output]))           
+            combined_data = list(itertools.chain.from_iterable([job.training_output, job.validation_output]))           
            
             # make it to small datafram and transpose
             smalldataframe = pd.DataFrame(combined_data)
@@ -72,31 +219,111 @@ class DataExperiment(ABC):
             master_outcome_num.append(smalldataframe.transpose())
             # Write model to pickle file
             if save_models:
-                trainer.save_model_to_file(self.key, grouping.key, model_key)
+                trainer = job.predictor()
+                trainer.save_model_to_file(self.key, job.grouping_key, model_key)
+                trainer.export_compact(self.key, job.grouping_key, model_key, self.feature_columns(schema))
         # save the master outcome
-        Group_df = pd.DataFrame({'Group':master_outcome_grp})
-        master_outcome_num_df = pd.concat(master_outcome_num, ignore_index=True)
+        parent_path=str(pathlib.Path(__file__).parent.parent.parent)
+        filepath = parent_path + "/" + str(model_key) + '_' + str(self.key) + '_Training_Performance.csv'
+        self.write_performance(master_outcome_grp, master_outcome_num, filepath)
+        if any(getattr(job, 'validation_intervals', None) is not None for job in jobs):
+            self.write_intervals(jobs, parent_path + "/" + str(model_key) + '_' + str(self.key) + '_Training_Performance_CI.csv')
+  
+        self._logger.debug("Finished model training")
+
+    def write_performance(self, groups, outcomes, filepath):
+        """Writes metrics in the Training_Performance layout, a row per grouping
+
+        Arguments:
+            groups {list(str)} -- grouping keys
+            outcomes {list(DataFrame)} -- one-row frame of each grouping's training then validation metrics
+            filepath {str} -- CSV file to write
+        """
+        Group_df = pd.DataFrame({'Group':groups})
+        master_outcome_num_df = pd.concat(outcomes, ignore_index=True)
    
         # column bind x            
         master_outcome_num_bigdataframe = pd.concat([Group_df, master_outcome_num_df], axis=1, ignore_index=True)
-        parent_path=str(pathlib.Path(__file__).parent.parent.parent)
-        filepath = parent_path + "/" + str(model_key) + '_' + str(self.key) + '_Training_Performance.csv'
         master_outcome_num_bigdataframe.to_csv(filepath, header= ['Group', 'recall_t', 'precision_t', 'auc_t', 'specificity_t', 
             'npv_t', 'accuracy_t', 'weighted_sensitivity_t', 'weighted_ppv_t', 'weighted_specificity_t' ,
             'weighted_npv_t', 'weighted_accuracy_t', 'recall_v', 'precision_v', 'auc_v', 'specificity_v', 
             'npv_v', 'accuracy_v', 'weighted_sensitivity_v', 'weighted_ppv_v', 'weighted_specificity_v' ,
             'weighted_npv_v', 'weighted_accuracy_v'])
-  
-        self._logger.debug("Finished model training")       
+
+    def nested_jobs(self, data, model_key, n_splits, features=None, group_index=None, settings=None, checkpoint_dir=None):
+        """Returns a NestedFoldJob for every outer fold of every grouping, checkpointed under the model key
+
+        Arguments:
+            data {DataFrame} -- training data, including the GroupID column
+            model_key {str} -- name of the run, whose checkpoints are resumed
+            n_splits {int} -- number of outer folds
+
+        Keyword Arguments:
+            features {ndarray} -- feature matrix of `data` from the column schema, if already built (default: {None})
+            group_index {GroupIndex} -- GroupID index of `data`, if already built (default: {None})
+            settings {dict} -- LinearSvcPredictor attributes to override, e.g. {'search': 'path'} (default: {None})
+            checkpoint_dir {Path} -- directory of every run's checkpoints (default: {None, checkpoints/ in the repo})
+        """
+        from aidp.ml.nested import DEFAULT_CHECKPOINT_DIR, nested_jobs
+
+        checkpoint_dir = pathlib.Path(checkpoint_dir or DEFAULT_CHECKPOINT_DIR) / str(model_key)
+        return [fold_job for job in self.training_jobs(data, features, group_index, settings)
+                for fold_job in nested_jobs(self.key, job.grouping_key, job.features, job.labels, n_splits,
+                                            checkpoint_dir, settings)]
+
+    def finish_nested(self, jobs, model_key):
+        """Writes the metrics of finished outer folds, averaged per grouping, in the Training_Performance layout
+
+        Arguments:
+            jobs {list(NestedFoldJob)} -- finished folds of this experiment, in grouping order
+            model_key {str} -- name of the run
+        """
+        from aidp.ml.metrics import METRICS
+
+        groups, outcomes = [], []
+        for grouping_key in dict.fromkeys(job.grouping_key for job in jobs):
+            folds = pd.DataFrame([job.training_output + job.validation_output for job in jobs if job.grouping_key == grouping_key])
+            self._logger.info("%s %s: validation metrics over %s outer folds, mean +/- std:", self.key, grouping_key, len(folds))
+            for metric, mean, std in zip(METRICS, folds.mean().iloc[len(METRICS):], folds.std().iloc[len(METRICS):]):
+                self._logger.info("\t%s\t%.4f +/- %.4f", metric, mean, std)
+            groups.append(grouping_key)
+            # Undefined metrics of a fold are left out of its grouping's mean
+            outcomes.append(folds.mean().to_frame().transpose())
+        parent_path = str(pathlib.Path(__file__).parent.parent.parent)
+        filepath = parent_path + "/" + str(model_key) + '_' + str(self.key) + '_Nested_CV_Performance.csv'
+        self.write_performance(groups, outcomes, filepath)
+        self._logger.info("Wrote nested cross validation metrics to: %s", filepath)
+
+    def write_intervals(self, jobs, filepath):
+        """Writes the bootstrap confidence intervals of the jobs' metrics, a lower and upper column per
+        Training_Performance column
+
+        Arguments:
+            jobs {list(TrainingJob)} -- finished jobs of this experiment, bootstrapped
+            filepath {str} -- CSV file to write
+        """
+        from aidp.ml.metrics import METRICS
+
+        columns = ["%s_%s_%s" %(metric, split, bound) for split in ['t', 'v'] for metric in METRICS for bound in ['low', 'high']]
+        rows = [np.concatenate([job.training_intervals, job.validation_intervals]).ravel() for job in jobs]
+        intervals = pd.DataFrame(rows, columns=columns)
+        intervals.insert(0, 'Group', [job.grouping_key for job in jobs])
+        intervals.to_csv(filepath)
+        self._logger.info("Wrote confidence intervals to: %s", filepath)       
 
     def get_results(self):
         # TODO: Add tests
-        results = pd.DataFrame()
-        for grouping in self.groupings:
-            column = '%s_%s (%s Probability)' %(self.key, grouping.key, grouping.positive_label)
-            results[column] = grouping.predictions
+        # Built in one go; inserting the columns one at a time is slow for small batches
+        return pd.DataFrame({self.result_column(grouping): grouping.predictions
+                             for grouping in self._predicted_groupings}, index=self._prediction_index)
+
+    def result_column(self, grouping):
+        """Name of the output column holding a grouping's predicted probabilities"""
+        return '%s_%s (%s Probability)' %(self.key, grouping.key, grouping.positive_label)
 
-        return results
+    def _select_groupings(self, keys):
+        # Groupings in their usual order, optionally restricted to the given keys
+        return [grouping for grouping in self.groupings if keys is None or grouping.key in keys]
 
     def __str__(self):
         return type(self).__name__
@@ -104,27 +331,21 @@ class DataExperiment(ABC):
 class ClinicalOnlyDataExperiment(DataExperiment):
     key = "clinical"
 
-    def filter_data(self, data):
-        standard_data = get_standardized_data(data)
-        return standard_data[['GroupID', 'Age', 'Sex', 'UPDRS']]
+    def feature_columns(self, schema):
+        return ['Age', 'Sex', 'UPDRS']
 
 class ImagingOnlyDataExperiment(DataExperiment):
     key = "dmri"
 
-    def filter_data(self, data):
-        standard_data = get_standardized_data(data)
-        return standard_data.drop(['UPDRS'], axis=1)
+    def feature_columns(self, schema):
+        return [column for column in schema.features if column != 'UPDRS']
 
 class FullDataExperiment(DataExperiment):
     key = "both"
 
-    def filter_data(self, data):
-        return get_standardized_data(data)
+    def feature_columns(self, schema):
+        return schema.features
 
 
 def get_standardized_data(data):
-    # TODO: Find a cleaner way to do this
-    columns_conf = pathlib.Path(__file__).parent.parent.parent / 'resources/column_names.conf'
-    with open(str(columns_conf)) as f:
-        columns = f.read().splitlines() 
-        return data[columns]
+    return data[get_schema().columns]
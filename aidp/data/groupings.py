@@ -6,6 +6,27 @@
  """
 
 from abc import ABC, abstractmethod
+import numpy as np
+
+class GroupIndex:
+    """Row positions of every GroupID in a dataset, built once and shared by all groupings"""
+    def __init__(self, group_ids):
+        """
+        Arguments:
+            group_ids {array-like} -- GroupID of each row
+        """
+        self.group_ids = np.asarray(group_ids)
+        codes, inverse = np.unique(self.group_ids, return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.cumsum(np.bincount(inverse, minlength=len(codes)))[:-1]
+        self._rows = dict(zip(codes.tolist(), np.split(order, bounds)))
+
+    def rows(self, groups):
+        """Returns the positions of the rows in any of `groups`, in their original order"""
+        selected = [self._rows[g] for g in groups if g in self._rows]
+        if not selected:
+            return np.array([], dtype=np.intp)
+        return np.sort(np.concatenate(selected))
 
 class DataGrouping(ABC):
     postive_groups = []
@@ -20,6 +41,19 @@ class DataGrouping(ABC):
         self.grouped_data = reassign_classes(data, grouping, "GroupID")
         return self
 
+    def index_data(self, group_index):
+        """Selects this grouping's rows and their new class labels without copying any feature data
+
+        Sets `rows` (positions into the shared feature matrix) and `labels` (1 for the
+        positive groups, 0 for the negative groups, aligned with `rows`).
+
+        Arguments:
+            group_index {GroupIndex} -- index of the dataset's GroupIDs
+        """
+        self.rows = group_index.rows(self.negative_groups + self.postive_groups)
+        self.labels = np.isin(group_index.group_ids[self.rows], self.postive_groups).astype(int)
+        return self
+
 
 class ParkinsonsVsControlGrouping(DataGrouping):
     def __init__(self):
@@ -98,4 +132,5 @@ def reassign_classes(data, grouping, group_col):
         classes_to_keep = grouping.keys()
         data_to_keep = data.loc[data[group_col].isin(classes_to_keep)]
         classes_to_change = {k:grouping[k] for k in classes_to_keep if k!= grouping[k]}
-        return data_to_keep.replace(classes_to_change)
\ No newline at end of file
+        # Only relabel the class column; feature values that equal a class label are left alone
+        return data_to_keep.assign(**{group_col: data_to_keep[group_col].replace(classes_to_change)})
\ No newline at end of file
@@ -2,31 +2,103 @@
 import os
 import logging
 import pandas as pd
+from aidp.data.schema import get_schema
+from aidp.data.groupings import GroupIndex
+from aidp.data.writer import get_writer
 
 class ModelData:
     """This class represents the data and includes """
     _logger =logging.getLogger(__name__)
     
-    def __init__(self, filename, dataReader):
+    def __init__(self, filename, dataReader, output_format='xlsx'):
         self._data_reader = dataReader
+        self._data_writer = get_writer(output_format)
         self.filename = filename
         self.data = None
-    def read_data(self):
-        """Reads in data as a pandas dataframe using the filename passed from the constructor"""
-        self.data = self._data_reader.read_data(self.filename)
+        self._features = None
+        self._features_source = None
+        self._group_index = None
+        self._group_index_source = None
+
+    @property
+    def data(self):
+        """The input data, with any results added so far joined on as extra columns"""
+        if self._pending_results:
+            # Join every pending result block onto the data in one allocation
+            results = [r.reindex(self._data.index) for r in self._pending_results]
+            self._pending_results = []
+            self._data = pd.concat([self._data] + results, axis=1)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self._pending_results = []
+
+    @property
+    def group_index(self):
+        """Row positions of each GroupID in the data, built once per dataset"""
+        if self._group_index_source is not self.data:
+            self._group_index = GroupIndex(self.data[get_schema().target])
+            self._group_index_source = self.data
+        return self._group_index
+
+    @property
+    def features(self):
+        """The schema's feature columns of the data as one contiguous float matrix, built once per dataset"""
+        if self._features_source is not self.data:
+            self._features = get_schema().to_matrix(self.data)
+            self._features_source = self.data
+        return self._features
+
+    def read_data(self, columns=None):
+        """Reads in data as a pandas dataframe using the filename passed from the constructor
+
+        Keyword Arguments:
+            columns {iterable(str)} -- only read these columns from the file (default: {None, all columns})
+        """
+        self.data = self._data_reader.read_data(self.filename, columns)
 
         return self 
 
+    def iter_chunks(self, chunksize, columns=None):
+        """Yields the input data as DataFrames of at most `chunksize` rows without reading it all in
+
+        Arguments:
+            chunksize {int} -- number of rows per chunk
+
+        Keyword Arguments:
+            columns {iterable(str)} -- only read these columns from the file (default: {None, all columns})
+        """
+        return self._data_reader.read_chunks(self.filename, chunksize, columns)
+
     def add_results(self, new_data):
-        """Adds additional columns (predictions) to the class' data DataFrame"""
-        #TODO: Add tests
+        """Adds additional columns (predictions) to the class' data DataFrame
+
+        The columns are buffered and joined onto the data in one step the next time `data` is read,
+        so adding the results of several experiments doesn't copy the data once per experiment.
+        """
         self._logger.debug("Adding %s to the data", ", ".join(new_data.columns))
-        self.data = self.data.join(new_data) 
+        self._pending_results.append(new_data)
+
+    @property
+    def output_filename(self):
+        return '%s_out.%s' %(os.path.splitext(os.path.basename(self.filename))[-2], self._data_writer.extension)
 
     def write_output_file(self):
-        """Writes the classes data DataFrame to disk as an excel sheet"""
-        #TODO: Add Tests
-        #FUTURE: Extract DataWriter class
-        new_filename = '%s_out.xlsx' %os.path.splitext(os.path.basename(self.filename))[-2]
-        self._logger.info("Writing results to output file: %s", new_filename)
-        self.data.to_excel(new_filename)
+        """Writes the classes data DataFrame to disk in the output format passed from the constructor"""
+        self._logger.info("Writing results to output file: %s", self.output_filename)
+        self._data_writer.write_data(self.data, self.output_filename)
+
+    def append_output_chunk(self, chunk, first_chunk):
+        """Appends one chunk of results to the output file so the full output never has to be held in memory
+
+        Only the csv output format can be appended to.
+
+        Arguments:
+            chunk {DataFrame} -- input data and results for one chunk of rows
+            first_chunk {bool} -- whether this is the first chunk (truncates the file and writes the header)
+        """
+        if first_chunk:
+            self._logger.info("Streaming results to output file: %s", self.output_filename)
+        self._data_writer.append_data(chunk, self.output_filename, first_chunk)
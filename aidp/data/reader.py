@@ -1,33 +1,153 @@
 """This module defines classes with functionality for reading data from a file"""
 from abc import ABC, abstractmethod
 import logging
+import os
 import pandas as pd
 
 class DataFileReader(ABC):
     """Abstract Base Class for classes which can read in data files"""
-    def __init__(self):
+    def __init__(self, cache=None):
+        """
+        Keyword Arguments:
+            cache {DataFileCache} -- optional cache of previously parsed files (default: {None})
+        """
         self._logger = logging.getLogger(__name__)
+        self._cache = cache
 
-    @abstractmethod
-    def read_data(self, filepath):
-        """Abstract method for reading a file and returning a dataframe
+    def read_data(self, filepath, columns=None):
+        """Reads a file and returns its contents as a pandas DataFrame
 
         Arguments:
             filepath {string} -- filepath of data file
-        """
-
-class ExcelDataReader(DataFileReader):
-    """Defines logic for reading data from an excel sheet"""
-    def read_data(self, filepath):
-        """Reads data in from an excel sheet as a pandas DataFrame
 
-        Arguments:
-            filepath {string} -- filepath of the excel sheet
+        Keyword Arguments:
+            columns {iterable(str)} -- only parse these columns; any not in the file are skipped (default: {None, all columns})
         """
         try:
             self._logger.info("Reading in input file: %s", filepath)
-            return pd.read_excel(filepath)
+            if self._cache is None:
+                return self._parse(filepath, columns)
+
+            variant = '' if columns is None else ','.join(sorted(columns))
+            data = self._cache.load(filepath, variant)
+            if data is None:
+                data = self._parse(filepath, columns)
+                self._cache.store(filepath, data, variant)
+            return data
 
         except FileNotFoundError:
             self._logger.exception('Error trying to read file: %s', filepath)
-            raise
\ No newline at end of file
+            raise
+
+    def read_chunks(self, filepath, chunksize, columns=None):
+        """Reads a file as a sequence of DataFrames of at most `chunksize` rows
+
+        The default implementation reads the whole file and slices it.  Readers for formats
+        that can be streamed override this so only one chunk is held in memory at a time.
+
+        Arguments:
+            filepath {string} -- filepath of data file
+            chunksize {int} -- number of rows per chunk
+
+        Keyword Arguments:
+            columns {iterable(str)} -- only parse these columns; any not in the file are skipped (default: {None, all columns})
+        """
+        data = self.read_data(filepath, columns)
+        for start in range(0, len(data.index), chunksize):
+            yield data.iloc[start:start + chunksize]
+
+    @abstractmethod
+    def _parse(self, filepath, columns):
+        """Abstract method for parsing a file into a dataframe
+
+        Arguments:
+            filepath {string} -- filepath of data file
+            columns {iterable(str)} -- columns to parse, or None for all columns
+        """
+
+class ExcelDataReader(DataFileReader):
+    """Defines logic for reading data from an excel sheet"""
+    def _parse(self, filepath, columns):
+        return pd.read_excel(filepath, usecols=_column_filter(columns))
+
+class CsvDataReader(DataFileReader):
+    """Defines logic for reading data from a csv file"""
+    def _parse(self, filepath, columns):
+        return pd.read_csv(filepath, usecols=_column_filter(columns))
+
+    def read_chunks(self, filepath, chunksize, columns=None):
+        self._logger.info("Streaming input file: %s (%s rows per chunk)", filepath, chunksize)
+        for chunk in pd.read_csv(filepath, chunksize=chunksize, usecols=_column_filter(columns)):
+            yield chunk
+
+class ParquetDataReader(DataFileReader):
+    """Defines logic for reading data from a parquet file"""
+    def _parse(self, filepath, columns):
+        return pd.read_parquet(filepath, columns=self._present_columns(filepath, columns))
+
+    def read_chunks(self, filepath, chunksize, columns=None):
+        import pyarrow.parquet as pq
+
+        self._logger.info("Streaming input file: %s (%s rows per chunk)", filepath, chunksize)
+        parquet_file = pq.ParquetFile(filepath)
+        present = self._present_columns(filepath, columns)
+        row_groups = (parquet_file.read_row_group(i, columns=present).to_pandas() for i in range(parquet_file.num_row_groups))
+        for chunk in rechunk(row_groups, chunksize):
+            yield chunk
+
+    @staticmethod
+    def _present_columns(filepath, columns):
+        # Unlike the excel and csv parsers, pyarrow fails on columns that aren't in the file
+        if columns is None:
+            return None
+        import pyarrow.parquet as pq
+
+        wanted = set(columns)
+        return [name for name in pq.read_schema(filepath).names if name in wanted]
+
+def rechunk(frames, chunksize):
+    """Regroups a sequence of DataFrames into DataFrames of exactly `chunksize` rows (except the last)
+
+    Arguments:
+        frames {iterable(DataFrame)} -- frames with the same columns
+        chunksize {int} -- number of rows per chunk
+    """
+    buffered = None
+    position = 0
+    offset = 0
+    for frame in frames:
+        # Only the rows not yet yielded, fewer than a chunk, are copied along with each new frame
+        buffered = frame if buffered is None else pd.concat([buffered.iloc[position:], frame], ignore_index=True)
+        position = 0
+        while len(buffered.index) - position >= chunksize:
+            chunk = buffered.iloc[position:position + chunksize]
+            chunk.index = pd.RangeIndex(offset, offset + chunksize)
+            position += chunksize
+            offset += chunksize
+            yield chunk
+    if buffered is not None and position < len(buffered.index):
+        chunk = buffered.iloc[position:]
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk.index))
+        yield chunk
+
+def _column_filter(columns):
+    if columns is None:
+        return None
+    wanted = frozenset(columns)
+    return lambda column: column in wanted
+
+def get_reader(filepath, cache=None):
+    """Returns the reader for a data file based on its extension
+
+    Arguments:
+        filepath {string} -- filepath of data file
+
+    Keyword Arguments:
+        cache {DataFileCache} -- optional cache of previously parsed files (default: {None})
+    """
+    extension = os.path.splitext(str(filepath))[-1].lower()
+    if extension == '.csv':
+        return CsvDataReader(cache=cache)
+    if extension in ('.parquet', '.pq'):
+        return ParquetDataReader(cache=cache)
+    return ExcelDataReader(cache=cache)
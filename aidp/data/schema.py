@@ -0,0 +1,62 @@
+"""This module defines the column schema of the model input data.
+
+    The schema is read from resources/column_names.conf once per process and
+    is used to turn input data into a single contiguous feature matrix that
+    every experiment projects its columns out of.
+ """
+import functools
+import pathlib
+import numpy as np
+
+COLUMNS_CONF = pathlib.Path(__file__).parent.parent.parent / 'resources/column_names.conf'
+
+class ColumnSchema:
+    """Ordered input columns, their positions, and cached column projections"""
+    target = 'GroupID'
+
+    def __init__(self, columns):
+        """
+        Arguments:
+            columns {list(str)} -- ordered column names, including the target column
+        """
+        self.columns = list(columns)
+        self.positions = {column: i for i, column in enumerate(self.columns)}
+        self.features = [column for column in self.columns if column != self.target]
+        self.feature_positions = {column: i for i, column in enumerate(self.features)}
+        self._projections = {}
+
+    def projection(self, columns):
+        """Returns an indexer selecting `columns` from the feature matrix
+
+        The indexer is compiled once per distinct column list.  When the columns are a
+        contiguous run of the feature matrix a slice is returned so the selection is a view.
+
+        Arguments:
+            columns {list(str)} -- feature columns to select, in order
+        """
+        key = tuple(columns)
+        if key not in self._projections:
+            positions = np.array([self.feature_positions[column] for column in key], dtype=np.intp)
+            if len(positions) and np.array_equal(positions, np.arange(positions[0], positions[0] + len(positions))):
+                self._projections[key] = slice(int(positions[0]), int(positions[0]) + len(positions))
+            else:
+                self._projections[key] = positions
+        return self._projections[key]
+
+    def to_matrix(self, data):
+        """Returns the feature columns of `data` as one C-contiguous float64 matrix in schema order
+
+        Arguments:
+            data {DataFrame} -- input data containing every feature column
+        """
+        return np.ascontiguousarray(data[self.features].to_numpy(dtype=np.float64))
+
+@functools.lru_cache(maxsize=None)
+def get_schema(path=str(COLUMNS_CONF)):
+    """Returns the schema defined by a column names file, reading the file only once per process
+
+    Keyword Arguments:
+        path {str} -- path of the column names file (default: {resources/column_names.conf})
+    """
+    with open(path) as f:
+        return ColumnSchema(f.read().splitlines())
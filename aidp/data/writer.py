@@ -0,0 +1,83 @@
+"""This module defines classes with functionality for writing data to a file"""
+from abc import ABC, abstractmethod
+import logging
+import pandas as pd
+
+class DataFileWriter(ABC):
+    """Abstract Base Class for classes which can write out data files"""
+    extension = None
+
+    def __init__(self):
+        self._logger = logging.getLogger(__name__)
+
+    @abstractmethod
+    def write_data(self, data, filepath):
+        """Abstract method for writing a dataframe (including its index) to a file
+
+        Arguments:
+            data {DataFrame} -- data to write
+            filepath {string} -- filepath of the output file
+        """
+
+    def append_data(self, data, filepath, first_chunk):
+        """Appends a dataframe (including its index) to a file, for formats that can be written a chunk at a time
+
+        Arguments:
+            data {DataFrame} -- data to write
+            filepath {string} -- filepath of the output file
+            first_chunk {bool} -- whether this is the first chunk (truncates the file and writes the header)
+        """
+        self._logger.error("Appending to %s output files is not supported", self.extension)
+        raise NotImplementedError
+
+class ExcelDataWriter(DataFileWriter):
+    """Writes an excel sheet row by row with a write-only workbook, so no cell objects are kept in memory"""
+    extension = 'xlsx'
+
+    def write_data(self, data, filepath):
+        import openpyxl
+
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        # Same layout as DataFrame.to_excel: an unnamed index column followed by the data columns
+        sheet.append([None] + [str(column) for column in data.columns])
+        for index, row in zip(data.index, data.itertuples(index=False, name=None)):
+            sheet.append([_cell_value(index)] + [_cell_value(value) for value in row])
+        workbook.save(filepath)
+
+class CsvDataWriter(DataFileWriter):
+    """Writes a csv file"""
+    extension = 'csv'
+
+    def write_data(self, data, filepath):
+        data.to_csv(filepath)
+
+    def append_data(self, data, filepath, first_chunk):
+        data.to_csv(filepath, mode='w' if first_chunk else 'a', header=first_chunk)
+
+class ParquetDataWriter(DataFileWriter):
+    """Writes a parquet file"""
+    extension = 'parquet'
+
+    def write_data(self, data, filepath):
+        data.to_parquet(filepath)
+
+WRITERS = {writer.extension: writer for writer in [ExcelDataWriter, CsvDataWriter, ParquetDataWriter]}
+
+def get_writer(output_format):
+    """Returns the writer for an output format
+
+    Arguments:
+        output_format {string} -- one of 'xlsx', 'csv' or 'parquet' (a leading '.' is ignored)
+    """
+    output_format = output_format.lower().lstrip('.')
+    if output_format not in WRITERS:
+        logging.getLogger(__name__).error("Unsupported output format: %s", output_format)
+        raise NotImplementedError
+    return WRITERS[output_format]()
+
+def _cell_value(value):
+    # Empty cells for missing values, as DataFrame.to_excel writes them
+    if pd.isna(value):
+        return None
+    return value
@@ -0,0 +1,76 @@
+"""This module caches the fitted transformer steps of a pipeline during hyperparameter search.
+
+    The steps before the classifier (the StandardScaler, and any imputation or
+    harmonization step added later) don't depend on the searched classifier parameters,
+    so a grid search refits them on the same fold for every candidate.  With the
+    pipeline's `memory` set, each step's fit is cached on disk keyed by a hash of the
+    step and the fold's data, and every other candidate on that fold reuses it.
+ """
+from contextlib import contextmanager
+import inspect
+import logging
+import shutil
+import tempfile
+from joblib import Memory
+from sklearn.base import clone
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# joblib 1.2+ takes the size budget as an argument of reduce_size; older versions read Memory.bytes_limit
+_REDUCE_SIZE_TAKES_LIMIT = 'bytes_limit' in inspect.signature(Memory.reduce_size).parameters
+
+_logger = logging.getLogger(__name__)
+
+class BoundedMemory(Memory):
+    """joblib Memory that evicts its least recently used entries once they take up more than `max_bytes`"""
+
+    def __init__(self, location, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Arguments:
+            location {str} -- directory of the cache
+
+        Keyword Arguments:
+            max_bytes {int} -- size budget of the cached results (default: {256MB})
+        """
+        super().__init__(location, verbose=0)
+        self.max_bytes = self.bytes_limit = max_bytes
+
+    def cache(self, func=None, **kwargs):
+        cached = super().cache(func, **kwargs)
+
+        def call(*args, **call_kwargs):
+            result = cached(*args, **call_kwargs)
+            if _REDUCE_SIZE_TAKES_LIMIT:
+                self.reduce_size(bytes_limit=self.max_bytes)
+            else:
+                self.reduce_size()
+            return result
+        return call
+
+@contextmanager
+def transformer_cache(pipeline, max_bytes=DEFAULT_MAX_BYTES):
+    """Yields a copy of a pipeline that caches its fitted transformer steps in a temporary directory
+
+    The directory is removed on exit; use `clear_memory` on any estimator fitted from
+    the copy before saving it, so it doesn't refer to the removed cache.
+
+    Arguments:
+        pipeline {Pipeline} -- unfitted pipeline
+
+    Keyword Arguments:
+        max_bytes {int} -- size budget of the cache (default: {256MB})
+    """
+    directory = tempfile.mkdtemp(prefix='aidp_transformers_')
+    _logger.debug("Caching fitted transformers in: %s", directory)
+    try:
+        yield clone(pipeline).set_params(memory=BoundedMemory(directory, max_bytes))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def clear_memory(estimator):
+    """Detaches a fitted pipeline, or the pipeline inside a search or calibration wrapper, from its cache"""
+    for attribute in ['best_estimator_', 'estimator']:
+        if hasattr(estimator, attribute):
+            clear_memory(getattr(estimator, attribute))
+    if hasattr(estimator, 'get_params') and 'memory' in estimator.get_params(deep=False):
+        estimator.set_params(memory=None)
+    return estimator
@@ -0,0 +1,119 @@
+"""This module defines the probability calibration stage that runs once after hyperparameter search.
+
+    With `probability=True` every SVC fit in a grid search also runs libsvm's own 5-fold
+    cross validation for its Platt sigmoid, although the search only uses the predicted
+    classes.  Instead the search can fit plain decision functions, and the selected model
+    is calibrated once, on out-of-fold decision values of the training data, with a
+    sigmoid (Platt scaling) or an isotonic mapping.
+ """
+import logging
+import numpy as np
+from scipy.optimize import minimize
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.isotonic import IsotonicRegression
+from sklearn.model_selection import cross_val_predict
+
+# 'svc' keeps libsvm's internal calibration of SVC(probability=True)
+CALIBRATION_METHODS = ['svc', 'sigmoid', 'isotonic']
+
+class DecisionCalibrator:
+    """Maps decision function values to positive class probabilities"""
+
+    def __init__(self, method='sigmoid'):
+        """
+        Keyword Arguments:
+            method {str} -- 'sigmoid' for Platt scaling or 'isotonic' (default: {'sigmoid'})
+        """
+        if method not in ('sigmoid', 'isotonic'):
+            raise ValueError("Unknown calibration method: %s" %method)
+        self.method = method
+
+    def fit(self, decision, positive):
+        """
+        Arguments:
+            decision {ndarray} -- decision value of each sample, from a model that wasn't fitted on it
+            positive {ndarray(bool)} -- whether each sample is in the positive class
+        """
+        decision, positive = np.asarray(decision, dtype=float), np.asarray(positive, dtype=bool)
+        if self.method == 'sigmoid':
+            self.a, self.b = _fit_sigmoid(decision, positive)
+        else:
+            isotonic = IsotonicRegression(y_min=0, y_max=1, out_of_bounds='clip').fit(decision, positive)
+            self.thresholds, self.probabilities = isotonic.X_thresholds_, isotonic.y_thresholds_
+        return self
+
+    def transform(self, decision):
+        """Returns the positive class probability of each decision value"""
+        decision = np.asarray(decision, dtype=float)
+        if self.method == 'isotonic':
+            return np.interp(decision, self.thresholds, self.probabilities)
+        with np.errstate(over='ignore'):
+            return 1 / (1 + np.exp(self.a * decision + self.b))
+
+class CalibratedClassifier(BaseEstimator, ClassifierMixin):
+    """A fitted classifier whose probabilities come from a DecisionCalibrator over its decision function"""
+    _logger = logging.getLogger(__name__)
+
+    def __init__(self, estimator, calibrator):
+        """
+        Arguments:
+            estimator {Pipeline} -- fitted binary classifier with a decision function
+            calibrator {DecisionCalibrator} -- fitted mapping of its decision values to probabilities
+        """
+        self.estimator = estimator
+        self.calibrator = calibrator
+
+    @classmethod
+    def fit_out_of_fold(cls, estimator, X, y, method='sigmoid', cv=5):
+        """Calibrates a fitted classifier on the out-of-fold decision values of its training data
+
+        Arguments:
+            estimator {Pipeline} -- binary classifier already fitted on X, y
+            X {array-like} -- training features
+            y {array-like} -- training classes
+
+        Keyword Arguments:
+            method {str} -- 'sigmoid' or 'isotonic' (default: {'sigmoid'})
+            cv {int or cross-validation generator} -- folds the decision values come from (default: {5})
+        """
+        cls._logger.info("Calibrating %s probabilities on out-of-fold decision values", method)
+        decision = cross_val_predict(clone(estimator), X, y, cv=cv, method='decision_function')
+        calibrator = DecisionCalibrator(method).fit(decision, np.asarray(y) == estimator.classes_[1])
+        return cls(estimator, calibrator)
+
+    @property
+    def classes_(self):
+        return self.estimator.classes_
+
+    @property
+    def named_steps(self):
+        return self.estimator.named_steps
+
+    def fit(self, X, y):
+        raise NotImplementedError("Calibrate a fitted classifier with CalibratedClassifier.fit_out_of_fold")
+
+    def decision_function(self, X):
+        return self.estimator.decision_function(X)
+
+    def predict(self, X):
+        return self.estimator.predict(X)
+
+    def predict_proba(self, X):
+        positive = self.calibrator.transform(self.decision_function(X))
+        return np.column_stack([1 - positive, positive])
+
+def _fit_sigmoid(decision, positive):
+    # Platt scaling, p = 1 / (1 + exp(a * decision + b)), fitted to Platt's smoothed
+    # targets, which keep the fit from running off to infinity on separable data
+    n_positive = positive.sum()
+    n_negative = len(positive) - n_positive
+    targets = np.where(positive, (n_positive + 1) / (n_positive + 2), 1 / (n_negative + 2))
+
+    def loss(params):
+        z = params[0] * decision + params[1]
+        residual = targets - 1 / (1 + np.exp(np.clip(z, -500, 500)))
+        return np.sum(np.logaddexp(0, z) - (1 - targets) * z), np.array([residual @ decision, residual.sum()])
+
+    start = np.array([0, np.log((n_negative + 1) / (n_positive + 1))])
+    a, b = minimize(loss, start, jac=True, method='L-BFGS-B').x
+    return float(a), float(b)
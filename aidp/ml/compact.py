@@ -0,0 +1,223 @@
+"""This module defines the compact model artifact: a trained linear SVC model reduced to NumPy arrays.
+
+    A scaler + linear SVC pipeline only needs a scale/shift, a dot product and a Platt
+    sigmoid to score new data, so the artifact stores those parameters in an `.npz`
+    file next to the pickled model and scores without importing sklearn.  Models
+    calibrated after training (see aidp.ml.calibration) store their sigmoid or isotonic
+    mapping instead of libsvm's.
+ """
+import logging
+import pathlib
+import numpy as np
+
+MODELS_DIR = pathlib.Path(__file__).parent.parent.parent / 'resources/models'
+
+# Constants of libsvm's probability estimates, which SVC.predict_proba reproduces
+_MIN_PROBABILITY = 1e-7
+_COUPLING_MAX_ITER = 100
+_COUPLING_EPS = 0.005 / 2
+
+def model_path(model_key, experiment_key, comparison_key, extension='pkl'):
+    """Path of the saved model for a model key, experiment and grouping"""
+    return MODELS_DIR / model_key / experiment_key / ('%s.%s' %(comparison_key, extension))
+
+class CompactLinearModel:
+    """NumPy-only scorer for a StandardScaler + linear SVC(probability=True) pipeline"""
+    _logger = logging.getLogger(__name__)
+
+    def __init__(self, mean, scale, coef, intercept, prob_a, prob_b, feature_names=(), calibration='svc',
+                 thresholds=(), probabilities=()):
+        """
+        Arguments:
+            mean {ndarray} -- per-feature mean of the scaler
+            scale {ndarray} -- per-feature scale of the scaler
+            coef {ndarray} -- weight of each scaled feature
+            intercept {float} -- intercept of the decision function
+            prob_a {float} -- Platt scaling slope
+            prob_b {float} -- Platt scaling offset
+
+        Keyword Arguments:
+            feature_names {list(str)} -- feature column of each weight, in order (default: {()})
+            calibration {str} -- 'svc' for libsvm's coupled Platt probabilities, 'sigmoid' for a plain
+                Platt sigmoid or 'isotonic' for a piecewise linear mapping (default: {'svc'})
+            thresholds {ndarray} -- decision values of the isotonic mapping (default: {()})
+            probabilities {ndarray} -- probability at each isotonic threshold (default: {()})
+        """
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.coef = np.asarray(coef, dtype=float).ravel()
+        self.intercept = float(intercept)
+        self.prob_a = float(prob_a)
+        self.prob_b = float(prob_b)
+        self.feature_names = [str(name) for name in feature_names]
+        self.calibration = str(calibration)
+        self.thresholds = np.asarray(thresholds, dtype=float)
+        self.probabilities = np.asarray(probabilities, dtype=float)
+
+    @classmethod
+    def from_pipeline(cls, classifier, feature_names=()):
+        """Extracts the parameters of a fitted pipeline, or of a grid search whose best estimator is one
+
+        Arguments:
+            classifier {Pipeline or GridSearchCV} -- fitted scaler + linear SVC model
+
+        Keyword Arguments:
+            feature_names {list(str)} -- feature column of each input, in order (default: {the names the model was fitted with})
+        """
+        pipeline = getattr(classifier, 'best_estimator_', classifier)
+        # A CalibratedClassifier wraps the pipeline with its own probability mapping
+        calibrator = getattr(pipeline, 'calibrator', None)
+        pipeline = getattr(pipeline, 'estimator', pipeline)
+        scaler, svc = pipeline.named_steps['Scaler'], pipeline.named_steps['classifier']
+        if getattr(svc, 'kernel', None) != 'linear' or len(svc.classes_) != 2:
+            raise ValueError("Only binary linear SVC models can be made compact")
+        if not len(feature_names):
+            feature_names = getattr(pipeline, 'feature_names_in_', ())
+        parameters = [scaler.mean_, scaler.scale_, svc.coef_, svc.intercept_[0]]
+        if calibrator is None:
+            return cls(*parameters, svc.probA_[0], svc.probB_[0], feature_names)
+        if calibrator.method == 'isotonic':
+            return cls(*parameters, 0, 0, feature_names, 'isotonic', calibrator.thresholds, calibrator.probabilities)
+        # Stored with libsvm's sign convention for the slope
+        return cls(*parameters, -calibrator.a, calibrator.b, feature_names, 'sigmoid')
+
+    @classmethod
+    def load(cls, filepath):
+        with np.load(str(filepath), allow_pickle=False) as arrays:
+            # Artifacts written before post-training calibration existed are all 'svc'
+            calibration = arrays['calibration'] if 'calibration' in arrays else 'svc'
+            thresholds = arrays['thresholds'] if 'thresholds' in arrays else ()
+            probabilities = arrays['probabilities'] if 'probabilities' in arrays else ()
+            return cls(arrays['mean'], arrays['scale'], arrays['coef'], arrays['intercept'],
+                       arrays['prob_a'], arrays['prob_b'], arrays['feature_names'], calibration, thresholds, probabilities)
+
+    def save(self, filepath):
+        self._logger.info("Saving compact model to file: %s", filepath)
+        with open(str(filepath), 'wb') as f:
+            np.savez(f, mean=self.mean, scale=self.scale, coef=self.coef, intercept=self.intercept,
+                     prob_a=self.prob_a, prob_b=self.prob_b, feature_names=np.array(self.feature_names, dtype=str),
+                     calibration=self.calibration, thresholds=self.thresholds, probabilities=self.probabilities)
+        return self
+
+    def decision_function(self, data):
+        """Signed distance of each row from the separating hyperplane, as SVC.decision_function"""
+        return ((np.asarray(data, dtype=float) - self.mean) / self.scale) @ self.coef + self.intercept
+
+    def predict_proba(self, data):
+        """Probability of each class, as SVC.predict_proba or CalibratedClassifier.predict_proba
+
+        libsvm couples the pairwise Platt probabilities with an iterative solver even for
+        two classes; it is reproduced here so the probabilities match to rounding error.
+        Rows with missing values get NaN probabilities.
+        """
+        decision = self.decision_function(data)
+        if self.calibration == 'isotonic':
+            positive = np.interp(decision, self.thresholds, self.probabilities)
+            return np.column_stack([1 - positive, positive])
+        # libsvm's decision values have the opposite sign to sklearn's for binary models
+        with np.errstate(over='ignore'):
+            positive = 1 / (1 + np.exp(self.prob_a * -decision + self.prob_b))
+        if self.calibration == 'sigmoid':
+            return np.column_stack([1 - positive, positive])
+        return _couple_probabilities(np.clip(positive, _MIN_PROBABILITY, 1 - _MIN_PROBABILITY))
+
+    def make_predictions(self, data):
+        """Probability of the positive class for each row, as Predictor.make_predictions"""
+        if hasattr(data, 'columns'):
+            data = data.drop(['GroupID'], axis=1, errors='ignore')
+        return self.predict_proba(data)[:, 1]
+
+def _couple_probabilities(pairwise):
+    # libsvm's multiclass_probability for k=2, written out for the 2x2 case and vectorized
+    # over rows; rows drop out of the working set as they converge
+    pairwise = np.asarray(pairwise, dtype=float)
+    p = np.full((len(pairwise), 2), np.nan)
+    rows = np.flatnonzero(~np.isnan(pairwise))
+    r01 = pairwise[rows]
+    q00, q11, q01 = (1 - r01) ** 2, r01 ** 2, -r01 * (1 - r01)
+    p0, p1 = np.full(len(rows), 0.5), np.full(len(rows), 0.5)
+
+    for _ in range(_COUPLING_MAX_ITER):
+        qp0, qp1 = q00 * p0 + q01 * p1, q01 * p0 + q11 * p1
+        pqp = p0 * qp0 + p1 * qp1
+        converged = np.maximum(np.abs(qp0 - pqp), np.abs(qp1 - pqp)) < _COUPLING_EPS
+        if converged.any():
+            p[rows[converged], 0], p[rows[converged], 1] = p0[converged], p1[converged]
+            active = ~converged
+            rows, q00, q11, q01 = rows[active], q00[active], q11[active], q01[active]
+            p0, p1, qp0, qp1, pqp = p0[active], p1[active], qp0[active], qp1[active], pqp[active]
+        if not len(rows):
+            return p
+
+        diff = (pqp - qp0) / q00
+        p0 = p0 + diff
+        pqp = (pqp + diff * (diff * q00 + 2 * qp0)) / (1 + diff) ** 2
+        qp0, qp1 = (qp0 + diff * q00) / (1 + diff), (qp1 + diff * q01) / (1 + diff)
+        p0, p1 = p0 / (1 + diff), p1 / (1 + diff)
+
+        diff = (pqp - qp1) / q11
+        p1 = p1 + diff
+        p0, p1 = p0 / (1 + diff), p1 / (1 + diff)
+
+    p[rows, 0], p[rows, 1] = p0, p1
+    return p
+
+class FusedLinearScorer:
+    """Scores many compact models at once with a single matrix multiply
+
+    Each model's scaler is folded into its weights (w / scale, b - mean . w / scale) and the
+    folded weights are laid out in one (features x models) matrix over a shared feature
+    layout, with zeros for the columns a model doesn't use.
+    """
+    def __init__(self, models, columns):
+        """
+        Arguments:
+            models {list(tuple)} -- (key, CompactLinearModel) pairs; each model's feature names must be in `columns`
+            columns {list(str)} -- feature column names of the matrices that will be scored, in order
+        """
+        self.keys = [key for key, _ in models]
+        positions = {column: i for i, column in enumerate(columns)}
+        self.weights = np.zeros((len(columns), len(models)))
+        self.intercepts = np.empty(len(models))
+        self.prob_a = np.empty(len(models))
+        self.prob_b = np.empty(len(models))
+        self._used = np.zeros((len(columns), len(models)))
+        self._coupled = np.array([model.calibration == 'svc' for _, model in models], dtype=bool)
+        self._isotonic = [(j, model.thresholds, model.probabilities) for j, (_, model) in enumerate(models)
+                          if model.calibration == 'isotonic']
+        for j, (key, model) in enumerate(models):
+            missing = [name for name in model.feature_names if name not in positions]
+            if missing or not model.feature_names:
+                raise ValueError("Model %s has features that aren't in the scored columns: %s" %(key, missing))
+            rows = [positions[name] for name in model.feature_names]
+            folded = model.coef / model.scale
+            self.weights[rows, j] = folded
+            self._used[rows, j] = 1
+            self.intercepts[j] = model.intercept - model.mean @ folded
+            self.prob_a[j], self.prob_b[j] = model.prob_a, model.prob_b
+
+    def decision_function(self, features):
+        """Decision values of every model, one column per model
+
+        A model's decision value is NaN where any of the columns it uses is missing,
+        but missing values in columns it doesn't use are ignored.
+        """
+        features = np.asarray(features, dtype=float)
+        missing = np.isnan(features)
+        if not missing.any():
+            return features @ self.weights + self.intercepts
+        decision = np.where(missing, 0, features) @ self.weights + self.intercepts
+        decision[(missing @ self._used) > 0] = np.nan
+        return decision
+
+    def predict_proba(self, features):
+        """Positive class probability of every model, one column per model, as CompactLinearModel.make_predictions"""
+        decision = self.decision_function(features)
+        with np.errstate(over='ignore'):
+            probabilities = 1 / (1 + np.exp(self.prob_a * -decision + self.prob_b))
+        if self._coupled.any():
+            pairwise = np.clip(probabilities[:, self._coupled], _MIN_PROBABILITY, 1 - _MIN_PROBABILITY)
+            probabilities[:, self._coupled] = _couple_probabilities(pairwise.ravel())[:, 1].reshape(pairwise.shape)
+        for j, thresholds, values in self._isotonic:
+            probabilities[:, j] = np.interp(decision[:, j], thresholds, values)
+        return probabilities
@@ -0,0 +1,130 @@
+"""This module turns the predicted probabilities of the experiments into a diagnosis.
+
+    Diagnosis algorithms are written as data: each version is an ordered list of
+    rules and the first rule that holds for a subject gives its diagnosis.  A rule
+    holds when any of its clauses holds, and a clause holds when all of its
+    conditions do.  Conditions compare an `<experiment>_<grouping>` probability
+    column to a threshold.
+ """
+import operator
+import numpy as np
+import pandas as pd
+
+DIAGNOSIS_RULES = {
+    1: [
+        ('Not Parkinsonism', [[('both_park_v_control', '<', 0.5)]]),
+        ('PD', [[('both_park_v_control', '>=', 0.5), ('dmri_msa_psp_v_pd', '<', 0.5), ('dmri_psp_v_msa', '<', 0.5)]]),
+        ('MSA', [[('both_park_v_control', '>=', 0.5), ('dmri_msa_psp_v_pd', '>=', 0.5), ('dmri_psp_v_msa', '<', 0.5)]]),
+        ('PSP', [[('both_park_v_control', '>=', 0.5), ('dmri_msa_psp_v_pd', '>=', 0.5), ('dmri_psp_v_msa', '>=', 0.5)]]),
+        ('PSP', [[('both_park_v_control', '>=', 0.5), ('dmri_msa_psp_v_pd', '<', 0.5), ('dmri_psp_v_pd_msa', '>=', 0.5)],
+                 [('dmri_psp_v_msa', '>=', 0.5)]]),
+    ],
+    2: [
+        ('Not Parkinsonism', [[('both_park_v_control', '<', 0.5)]]),
+        ('PD', [[('both_park_v_control', '>=', 0.5), ('dmri_msa_psp_v_pd', '<', 0.08), ('dmri_psp_v_pd_msa', '<', 0.04),
+                 ('dmri_psp_v_msa', '<', 0.5)]]),
+        ('PSP', [[('both_park_v_control', '>=', 0.5), ('dmri_psp_v_pd_msa', '>=', 0.3)],
+                 [('dmri_psp_v_msa', '>=', 0.3)]]),
+        ('MSA', [[('both_park_v_control', '>=', 0.5), ('dmri_psp_v_pd_msa', '<', 0.5), ('dmri_psp_v_msa', '<', 0.5),
+                  ('dmri_pd_v_msa', '<', 0.5)]]),
+        ('PSP', [[('both_park_v_control', '>=', 0.5), ('dmri_msa_psp_v_pd', '<', 0.5), ('dmri_psp_v_pd_msa', '>=', 0.5)],
+                 [('dmri_psp_v_msa', '>=', 0.5)]]),
+    ],
+}
+DEFAULT_VERSIONS = (1,)
+UNKNOWN = 'Unknown'
+
+_OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+class DiagnosisRules:
+    """Several versions of the diagnosis rules, compiled to be evaluated together in one pass"""
+
+    def __init__(self, versions=DEFAULT_VERSIONS, rules=DIAGNOSIS_RULES):
+        """
+        Keyword Arguments:
+            versions {iterable(int)} -- versions to evaluate; the first is the primary diagnosis (default: {(1,)})
+            rules {dict(int -> list)} -- rule tables by version (default: {DIAGNOSIS_RULES})
+        """
+        self.versions = list(versions)
+        unknown = [v for v in self.versions if v not in rules]
+        if unknown:
+            raise ValueError("Unknown diagnosis algorithm version(s): %s" %unknown)
+        self._rules = {version: rules[version] for version in self.versions}
+
+        # Every distinct condition is evaluated once, however many rules and versions use it
+        self.conditions = sorted({condition for version in self.versions
+                                  for _, clauses in self._rules[version]
+                                  for clause in clauses for condition in clause})
+        for _, op, _ in self.conditions:
+            if op not in _OPERATORS:
+                raise ValueError("Unsupported operator in diagnosis rule: %s" %op)
+
+    @property
+    def columns(self):
+        """The `<experiment>_<grouping>` probability columns the rules read"""
+        return sorted({column for column, _, _ in self.conditions})
+
+    def output_column(self, version):
+        """Name of the output column for a version; the primary version keeps the plain name"""
+        return 'Predicted_diagnosis' if version == self.versions[0] else 'Predicted_diagnosis_v%s' %version
+
+    def evaluate(self, data):
+        """Diagnoses every subject with every version
+
+        Missing probabilities fail every comparison.
+
+        Arguments:
+            data {DataFrame} -- predicted probabilities, one row per subject
+
+        Returns:
+            DataFrame -- one diagnosis column per version, indexed like `data`
+        """
+        probabilities = {key: data[probability_column(data.columns, key)].to_numpy(dtype=float) for key in self.columns}
+        return pd.DataFrame(self.evaluate_arrays(probabilities), index=data.index)
+
+    def evaluate_arrays(self, probabilities):
+        """Diagnoses every subject with every version, from plain arrays rather than a DataFrame
+
+        Arguments:
+            probabilities {dict(str -> ndarray)} -- probabilities of each subject by `<experiment>_<grouping>` key
+
+        Returns:
+            dict(str -> ndarray) -- diagnosis of each subject by output column, one per version
+        """
+        with np.errstate(invalid='ignore'):
+            masks = {condition: _OPERATORS[condition[1]](probabilities[condition[0]], condition[2])
+                     for condition in self.conditions}
+
+        results = {}
+        for version in self.versions:
+            choices = [np.logical_or.reduce([np.logical_and.reduce([masks[c] for c in clause]) for clause in clauses])
+                       for _, clauses in self._rules[version]]
+            labels = [label for label, _ in self._rules[version]]
+            results[self.output_column(version)] = np.select(choices, labels, default=UNKNOWN)
+        return results
+
+def probability_column(columns, key):
+    """Finds the probability column for an `<experiment>_<grouping>` key, e.g. 'dmri_psp_v_msa (PSP Probability)'
+
+    Arguments:
+        columns {iterable(str)} -- column names to search
+        key {str} -- `<experiment>_<grouping>` key
+    """
+    for column in columns:
+        if column == key or str(column).startswith(key + ' ('):
+            return column
+    raise KeyError("No probability column for %s" %key)
+
+def diagnose(data, versions=DEFAULT_VERSIONS):
+    """Diagnoses every subject with the given versions of the diagnosis algorithm
+
+    Arguments:
+        data {DataFrame} -- predicted probabilities, one row per subject
+
+    Keyword Arguments:
+        versions {iterable(int)} -- versions to evaluate; the first is the primary diagnosis (default: {(1,)})
+
+    Returns:
+        DataFrame -- one diagnosis column per version, indexed like `data`
+    """
+    return DiagnosisRules(versions).evaluate(data)
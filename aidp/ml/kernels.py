@@ -0,0 +1,50 @@
+"""This module computes the linear kernel (Gram) matrix that the precomputed training mode shares between fits.
+
+    Every fold and C value of a model's search fits a linear kernel over a subset of
+    the model's training rows.  The Gram matrix of those rows, standardized with their
+    own mean and deviation, is computed once, in blocks of rows and stored as float32,
+    and each fit slices it with `kernel='precomputed'` instead of having libsvm
+    recompute the dot products.  The validation rows are left out of the matrix and
+    its statistics, so they stay unseen until the model is scored.
+ """
+import logging
+import os
+import numpy as np
+
+DEFAULT_BLOCK_ROWS = 1024
+
+_logger = logging.getLogger(__name__)
+
+def linear_gram(features, max_bytes=None, block_rows=DEFAULT_BLOCK_ROWS):
+    """Returns the float32 linear kernel matrix of the standardized features, or None if it wouldn't fit in memory
+
+    The features are standardized once over all the given rows, rather than per fold as
+    the pipeline's scaler is, so the search may score C values slightly differently.
+
+    Arguments:
+        features {ndarray} -- training rows of a model's features, one row per subject
+
+    Keyword Arguments:
+        max_bytes {int} -- largest Gram matrix to compute (default: {None, a quarter of physical memory})
+        block_rows {int} -- rows computed at once, bounding the float64 scratch space (default: {1024})
+    """
+    n = len(features)
+    max_bytes = _default_max_bytes() if max_bytes is None else max_bytes
+    if n * n * np.dtype(np.float32).itemsize > max_bytes:
+        _logger.warning("A Gram matrix of %s subjects would be over %s bytes, training without one", n, max_bytes)
+        return None
+
+    features = np.asarray(features, dtype=float)
+    scale = features.std(axis=0)
+    standardized = (features - features.mean(axis=0)) / np.where(scale == 0, 1, scale)
+    gram = np.empty((n, n), dtype=np.float32)
+    for start in range(0, n, block_rows):
+        gram[start:start + block_rows] = standardized[start:start + block_rows] @ standardized.T
+    _logger.info("Computed the %s x %s Gram matrix", n, n)
+    return gram
+
+def _default_max_bytes():
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // 4
+    except (AttributeError, ValueError, OSError):
+        return 1024 * 1024 * 1024
@@ -0,0 +1,130 @@
+"""This module computes the training report's metrics from one prediction per split.
+
+    Every metric of the Training_Performance report is a function of the 2x2 confusion
+    matrix, so the classes are predicted once, the four counts are taken with a single
+    bincount, and all metrics are derived from them at once.  They match the sklearn
+    scorers and the aidp.ml.helpers functions they replace exactly, including the NaN
+    of an undefined specificity, NPV or AUC and the 0 of an undefined recall or precision.
+    The exception is a split where only one class appears in both the true and the
+    predicted classes: sklearn's 1x1 confusion matrix made the helpers take that class
+    as the negative one, so an all-positive split had a specificity and NPV of 1 and the
+    weighted metrics raised IndexError.  Here the counts of the missing class are 0, so
+    every metric it leaves undefined is NaN.
+    Counts may have leading dimensions, e.g. one row per resample, to score many at once.
+
+    The bootstrap draws its resamples as one matrix of row indices and counts the cells of
+    every resample with one bincount, offsetting each resample's cells into its own four
+    bins, so ten thousand resamples take well under a second.
+ """
+import warnings
+import numpy as np
+
+DEFAULT_CONFIDENCE = 0.95
+# Indices drawn at once, bounding the bootstrap's index matrix to 64MB
+MAX_BOOTSTRAP_CELLS = 8 * 1024 * 1024
+
+# In the order of the Training_Performance columns
+METRICS = ['recall', 'precision', 'auc', 'specificity', 'npv', 'accuracy', 'weighted_sensitivity',
+           'weighted_ppv', 'weighted_specificity', 'weighted_npv', 'weighted_accuracy']
+
+def confusion_counts(y_true, y_pred, positive=1):
+    """Returns the true negative, false positive, false negative and true positive counts
+
+    Arguments:
+        y_true {array-like} -- true classes
+        y_pred {array-like} -- predicted classes
+
+    Keyword Arguments:
+        positive {int} -- label of the positive class (default: {1})
+
+    Returns:
+        ndarray(int) -- [tn, fp, fn, tp]
+    """
+    cell = 2 * (np.asarray(y_true) == positive) + (np.asarray(y_pred) == positive)
+    return np.bincount(cell, minlength=4)
+
+def metrics_from_counts(counts):
+    """Returns every metric of METRICS from confusion counts
+
+    Arguments:
+        counts {array-like(int)} -- [tn, fp, fn, tp] in the last dimension
+
+    Returns:
+        ndarray(float) -- the metrics in the order of METRICS in the last dimension
+    """
+    tn, fp, fn, tp = np.moveaxis(np.asarray(counts), -1, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # As specificity and negative_predictive_value, NaN when undefined
+        tpw, fnw = tp / (tp + fn), fn / (tp + fn)
+        tnw, fpw = tn / (tn + fp), fp / (tn + fp)
+        npv = tn / (tn + fn)
+        # As sklearn's recall_score and precision_score, 0 when undefined
+        recall = np.where(tp + fn > 0, tpw, 0.0)
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        # roc_auc_score of hard predictions: the trapezoids under (0, 0), (fpr, tpr), (1, 1)
+        auc = fpw * tpw / 2.0 + (1 - fpw) * (1 + tpw) / 2.0
+        accuracy = (tp + tn) / (tn + fp + fn + tp)
+        weighted = [tpw / (tpw + fnw), tpw / (tpw + fpw), tnw / (tnw + fpw), tnw / (tnw + fnw),
+                    (tpw + tnw) / (tpw + fpw + fnw + tnw)]
+    return np.stack([recall, precision, auc, tnw, npv, accuracy] + weighted, axis=-1)
+
+def score_predictions(y_true, y_pred, positive=1):
+    """Returns every metric of METRICS, by name, of predicted classes"""
+    return dict(zip(METRICS, metrics_from_counts(confusion_counts(y_true, y_pred, positive)).tolist()))
+
+def score_model(model, X, y, positive=1):
+    """Returns every metric of METRICS, by name, of a fitted classifier predicting X once"""
+    return score_predictions(y, model.predict(X), positive)
+
+def bootstrap_counts(y_true, y_pred, n_resamples, random_state=None, positive=1):
+    """Returns the confusion counts of resamples, with replacement, of the predictions
+
+    Arguments:
+        y_true {array-like} -- true classes
+        y_pred {array-like} -- predicted classes
+        n_resamples {int} -- number of resamples
+
+    Keyword Arguments:
+        random_state {int} -- seed of the resamples (default: {None})
+        positive {int} -- label of the positive class (default: {1})
+
+    Returns:
+        ndarray(int) -- [tn, fp, fn, tp] of each resample, n_resamples x 4
+    """
+    cells = 2 * (np.asarray(y_true) == positive) + (np.asarray(y_pred) == positive)
+    n = len(cells)
+    rng = np.random.RandomState(random_state)
+    counts = np.empty((n_resamples, 4), dtype=np.int64)
+    batch = max(1, MAX_BOOTSTRAP_CELLS // max(n, 1))
+    for start in range(0, n_resamples, batch):
+        size = min(batch, n_resamples - start)
+        # Resample i's cells are counted in bins 4i to 4i + 3
+        offset_cells = cells[rng.randint(0, n, (size, n))] + 4 * np.arange(size)[:, None]
+        counts[start:start + size] = np.bincount(offset_cells.ravel(), minlength=4 * size).reshape(size, 4)
+    return counts
+
+def bootstrap_intervals(y_true, y_pred, n_resamples=10000, confidence=DEFAULT_CONFIDENCE, random_state=None, positive=1):
+    """Returns percentile bootstrap confidence intervals of every metric of METRICS
+
+    Resamples in which a metric is NaN, e.g. with no negatives for specificity, are left
+    out of that metric's interval; recall and precision count as 0 there, as in the report.
+
+    Arguments:
+        y_true {array-like} -- true classes
+        y_pred {array-like} -- predicted classes
+
+    Keyword Arguments:
+        n_resamples {int} -- number of resamples (default: {10000})
+        confidence {float} -- confidence level of the intervals (default: {0.95})
+        random_state {int} -- seed of the resamples (default: {None})
+        positive {int} -- label of the positive class (default: {1})
+
+    Returns:
+        ndarray(float) -- lower and upper bound of each metric, in the order of METRICS, len(METRICS) x 2
+    """
+    scores = metrics_from_counts(bootstrap_counts(y_true, y_pred, n_resamples, random_state, positive))
+    tail = (1 - confidence) / 2 * 100
+    with warnings.catch_warnings():
+        # All NaN when a metric is undefined in every resample
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanpercentile(scores, [tail, 100 - tail], axis=0).T
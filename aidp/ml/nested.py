@@ -0,0 +1,132 @@
+"""This module defines nested cross validation of the models, with a checkpoint per outer fold.
+
+    The single holdout of LinearSvcPredictor gives one noisy estimate of each model's
+    performance.  Nested cross validation splits each grouping's rows into stratified
+    outer folds, tunes C with the usual inner search on the rest of the rows and scores
+    the outer fold.  Every (experiment, grouping, fold) is an independent TrainingJob,
+    so the TrainingScheduler runs them in parallel worker processes.
+
+    A finished fold is written to a JSON checkpoint, keyed by a hash of its data, rows
+    and settings.  Running the same model key again skips the folds already finished,
+    so an interrupted run resumes where it stopped.
+ """
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+from aidp.ml.predictors import LinearSvcPredictor, TrainingJob
+
+DEFAULT_CHECKPOINT_DIR = pathlib.Path(__file__).parent.parent.parent / 'checkpoints'
+
+class NestedFoldJob(TrainingJob):
+    """One outer fold of the nested cross validation of a grouping's model"""
+    _logger = logging.getLogger(__name__)
+
+    def __init__(self, experiment_key, grouping_key, features, labels, fold, split, checkpoint, n_jobs=-1, settings=None):
+        """
+        Arguments:
+            experiment_key {str} -- experiment the model belongs to
+            grouping_key {str} -- grouping the model belongs to
+            features {ndarray} -- the experiment's feature columns for the grouping's rows
+            labels {ndarray} -- class of each row
+            fold {int} -- index of the outer fold
+            split {tuple} -- (training rows, validation rows) of the outer fold
+            checkpoint {Path} -- JSON file the fold's results are written to
+
+        Keyword Arguments:
+            n_jobs {int} -- cores used by the fold's inner search (default: {-1, all available})
+            settings {dict} -- LinearSvcPredictor attributes to override, e.g. {'search': 'path'} (default: {None})
+        """
+        super().__init__(experiment_key, grouping_key, features, labels, n_jobs=n_jobs, settings=settings, split=split)
+        self.fold = fold
+        self.checkpoint = pathlib.Path(checkpoint)
+        self.fingerprint = _fingerprint(features, labels, split, self.settings)
+        self.best_params = None
+
+    def resume(self):
+        """Loads the fold's results from its checkpoint if it has one for the same data and settings
+
+        Returns:
+            bool -- whether the fold was already finished
+        """
+        try:
+            with open(str(self.checkpoint)) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        except ValueError:
+            self._logger.warning("Ignoring unreadable checkpoint: %s", self.checkpoint)
+            return False
+        if state.get('fingerprint') != self.fingerprint:
+            self._logger.info("Ignoring checkpoint of different data or settings: %s", self.checkpoint)
+            return False
+
+        self.training_output, self.validation_output = state['training_output'], state['validation_output']
+        self.best_params = state['best_params']
+        # No work was done this run
+        self.seconds = 0.0
+        self.classifier = self.features = self.labels = None
+        return True
+
+    def run(self, report_writer=None):
+        """Trains and scores the fold, or loads it from its checkpoint, keeping only the metrics"""
+        if self.resume():
+            self._logger.info("Resumed %s %s fold %s from its checkpoint", self.experiment_key, self.grouping_key, self.fold)
+            return self
+        super().run(report_writer)
+        self.best_params = {name: _plain(value) for name, value in self.classifier.best_params_.items()}
+        self.classifier = None
+        self._save()
+        return self
+
+    def _save(self):
+        state = {
+            'experiment': self.experiment_key,
+            'grouping': self.grouping_key,
+            'fold': self.fold,
+            'fingerprint': self.fingerprint,
+            'best_params': self.best_params,
+            'seconds': self.seconds,
+            'training_output': [_plain(value) for value in self.training_output],
+            'validation_output': [_plain(value) for value in self.validation_output],
+        }
+        self.checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        # Written whole and then renamed, so an interrupted write never leaves a partial checkpoint
+        temporary = self.checkpoint.with_suffix('.tmp')
+        with open(str(temporary), 'w') as f:
+            json.dump(state, f)
+        os.replace(str(temporary), str(self.checkpoint))
+
+def nested_jobs(experiment_key, grouping_key, features, labels, n_splits, checkpoint_dir, settings=None):
+    """Returns a NestedFoldJob for every stratified outer fold of a grouping's rows
+
+    Arguments:
+        experiment_key {str} -- experiment the model belongs to
+        grouping_key {str} -- grouping the model belongs to
+        features {ndarray} -- the experiment's feature columns for the grouping's rows
+        labels {ndarray} -- class of each row
+        n_splits {int} -- number of outer folds
+        checkpoint_dir {Path} -- directory of the run's checkpoints
+
+    Keyword Arguments:
+        settings {dict} -- LinearSvcPredictor attributes to override, e.g. {'search': 'path'} (default: {None})
+    """
+    outer = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=LinearSvcPredictor().random_seed)
+    return [NestedFoldJob(experiment_key, grouping_key, features, labels, fold, split,
+                          pathlib.Path(checkpoint_dir) / ('%s_%s_fold%sof%s.json' %(experiment_key, grouping_key, fold, n_splits)),
+                          settings=settings)
+            for fold, split in enumerate(outer.split(features, labels))]
+
+def _fingerprint(features, labels, split, settings):
+    digest = hashlib.sha1()
+    for values in [features, labels, split[0], split[1]]:
+        digest.update(np.asarray(values).tobytes())
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+def _plain(value):
+    # numpy scalars as the python values json can write
+    return value.item() if hasattr(value, 'item') else value
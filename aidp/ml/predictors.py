@@ -2,10 +2,12 @@
 import logging
 import os
 from datetime import datetime
+from contextlib import contextmanager
 import pickle
 import pathlib
+import time
 
-from sklearn.base import BaseEstimator
+from sklearn.base import BaseEstimator, clone
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import make_scorer, accuracy_score, recall_score, precision_score, roc_auc_score
 from sklearn.model_selection import GridSearchCV, train_test_split
@@ -15,13 +17,19 @@ import pandas as pd
 import numpy as np
 
 import aidp.ml.helpers as ml
+from aidp.report.writers import LogReportWriter
+from aidp.ml.compact import CompactLinearModel, MODELS_DIR, model_path
+from aidp.ml.search import RegularizationPathSearch, make_search
+from aidp.ml.calibration import CalibratedClassifier
+from aidp.ml.caching import transformer_cache, clear_memory
+from aidp.ml.kernels import linear_gram
 
 class Predictor():
     name = __name__
     _logger = logging.getLogger(__name__)
 
     def load_model_from_file(self, experiment_key, comparison_key, model_key="default"):
-        filepath = pathlib.Path(__file__).parent.parent.parent / ('resources/models/%s/%s/%s.pkl' %(model_key, experiment_key, comparison_key))
+        filepath = model_path(model_key, experiment_key, comparison_key)
         self._logger.info("Loading model from file: %s", filepath)
         
         try:
@@ -40,7 +48,7 @@ class Predictor():
         
     def save_model_to_file(self, experiment_key, comparison_key, model_key):        
         try:
-            filepath = pathlib.Path(__file__).parent.parent.parent / ('resources/models/%s/%s/%s.pkl' %(model_key, experiment_key, comparison_key))
+            filepath = model_path(model_key, experiment_key, comparison_key)
         
             #Make sure the directory exists
             os.makedirs(os.path.dirname(str(filepath)), exist_ok=True)
@@ -56,12 +64,29 @@ class Predictor():
         
         self._logger.debug("Sucessfully saved model: %s", self.classifier)
         return self
+
+    def export_compact(self, experiment_key, comparison_key, model_key, feature_names=()):
+        """Writes the model as a compact .npz artifact which can be scored without sklearn
+
+        Arguments:
+            experiment_key {str} -- experiment the model belongs to
+            comparison_key {str} -- grouping the model belongs to
+            model_key {str} -- name of the models
+
+        Keyword Arguments:
+            feature_names {list(str)} -- feature column of each model input, in order (default: {()})
+        """
+        filepath = model_path(model_key, experiment_key, comparison_key, extension='npz')
+        os.makedirs(os.path.dirname(str(filepath)), exist_ok=True)
+        CompactLinearModel.from_pipeline(self.classifier, feature_names).save(filepath)
+        return self
     
     def make_predictions(self, data):
         self._logger.info("Making predictions")
         # We don't consider the actual GroupID when making predictions
-        prediction_data = data.drop(['GroupID'], axis=1)
-        predictions = self.classifier.predict_proba(prediction_data)
+        if isinstance(data, pd.DataFrame):
+            data = data.drop(['GroupID'], axis=1)
+        predictions = self.classifier.predict_proba(data)
         return predictions[:,1]
 
 class LinearSvcPredictor(Predictor):
@@ -94,15 +119,138 @@ class LinearSvcPredictor(Predictor):
 
         self.scoring='f1_micro'
         self.random_seed = 55
+        self.n_jobs = -1 # cores used by the grid search (-1 is all available)
+        self.search = 'grid' # one of aidp.ml.search.SEARCHES: 'grid', 'halving', 'path' or 'smbo'
+        self.calibration = 'svc' # 'svc' for SVC(probability=True), or 'sigmoid'/'isotonic' after the search
+        self.cache_transformers = False # reuse the fitted scaler of each fold across the searched C values
+
+    def train_model(self, data, labels=None, precompute_gram=False, split=None):
+        """Splits off a validation set and tunes the model on the rest
 
-    def train_model(self, data):
+        Arguments:
+            data {DataFrame or ndarray} -- features, plus the GroupID column when `labels` isn't given
+
+        Keyword Arguments:
+            labels {array-like} -- class of each row of `data` (default: {None, use data['GroupID']})
+            precompute_gram {bool} -- tune C with the path search over slices of the Gram matrix of the
+                training rows, unless it is too large for memory (default: {False})
+            split {tuple} -- (training rows, validation rows) positions to use instead of a random
+                holdout of `test_size`, e.g. an outer fold of nested cross validation (default: {None})
+        """
         self._logger.info("\tTraining %s Model", self.name)
-        y = data['GroupID']
-        X = data.drop(['GroupID'], axis=1)
-        X_train, X_test, Y_train, Y_test = train_test_split(X, y, test_size=self.test_size, random_state=self.random_seed)
-        self.classifier = ml.grid_search_optimization(self.classifier, self.param_grid, X_train, Y_train, X_test, Y_test, cv= self.cv, scoring= self.scoring)
+        if labels is None:
+            y = data['GroupID']
+            X = data.drop(['GroupID'], axis=1)
+        else:
+            X, y = data, labels
+        if split is None:
+            X_train, X_test, Y_train, Y_test = train_test_split(X, y, test_size=self.test_size, random_state=self.random_seed)
+        else:
+            train_rows, test_rows = split
+            X_train, X_test, Y_train, Y_test = _rows(X, train_rows), _rows(X, test_rows), _rows(y, train_rows), _rows(y, test_rows)
+        # Standardized with the training rows only, so nothing of the validation rows reaches the search
+        gram = linear_gram(X_train) if precompute_gram else None
+        if gram is not None and self.search != 'path':
+            self._logger.warning("The Gram matrix is only searched by the path search; using it instead of the %s search",
+                                 self.search)
+        classifier = self.classifier
+        if self.calibration != 'svc':
+            # The search only needs decision functions; probabilities are fitted once afterwards
+            classifier = clone(classifier).set_params(classifier__probability=False)
+        with transformer_cache(classifier) if self.cache_transformers else _uncached(classifier) as classifier:
+            if gram is not None:
+                self.classifier = RegularizationPathSearch(classifier, self.param_grid, cv=self.cv, scoring=self.scoring, n_jobs=self.n_jobs).fit(X_train, Y_train, gram=gram)
+            else:
+                search = make_search(self.search, classifier, self.param_grid, cv=self.cv, scoring=self.scoring,
+                                     n_jobs=self.n_jobs, random_state=self.random_seed)
+                self.classifier = search.fit(X_train, Y_train)
+            if self.calibration != 'svc':
+                self.classifier.best_estimator_ = CalibratedClassifier.fit_out_of_fold(
+                    self.classifier.best_estimator_, X_train, Y_train, self.calibration, cv=self.cv)
+        # The cache is gone, so the saved model mustn't refer to it
+        clear_memory(self.classifier)
         self.X_train = X_train
         self.Y_train = Y_train
         self.X_test = X_test
         self.Y_test = Y_test
-        
\ No newline at end of file
+        
+
+class TrainingJob:
+    """Training of one grouping's model on its own copy of the data, so it can run in another process"""
+    _logger = logging.getLogger(__name__)
+
+    def __init__(self, experiment_key, grouping_key, features, labels, n_jobs=-1, settings=None, precompute_gram=False,
+                 bootstrap=0, split=None):
+        """
+        Arguments:
+            experiment_key {str} -- experiment the model belongs to
+            grouping_key {str} -- grouping the model belongs to
+            features {ndarray} -- the experiment's feature columns for the grouping's rows
+            labels {ndarray} -- class of each row
+
+        Keyword Arguments:
+            n_jobs {int} -- cores used by the job's grid search (default: {-1, all available})
+            settings {dict} -- LinearSvcPredictor attributes to override, e.g. {'search': 'path'} (default: {None})
+            precompute_gram {bool} -- tune C over slices of the Gram matrix of the training rows (default: {False})
+            bootstrap {int} -- bootstrap resamples for the metrics' confidence intervals, 0 for none (default: {0})
+            split {tuple} -- (training rows, validation rows) positions instead of the predictor's random
+                holdout (default: {None})
+        """
+        self.experiment_key = experiment_key
+        self.grouping_key = grouping_key
+        self.features = features
+        self.labels = labels
+        self.n_jobs = n_jobs
+        self.settings = settings or {}
+        self.precompute_gram = precompute_gram
+        self.bootstrap = bootstrap
+        self.split = split
+
+    @property
+    def size(self):
+        """Rough cost of the job, for scheduling the biggest jobs first"""
+        return self.features.size
+
+    def run(self, report_writer=None):
+        """Trains and reports on the model, keeping the fitted classifier and metrics but dropping the data
+
+        Keyword Arguments:
+            report_writer {LogReportWriter} -- writes the training and validation metrics
+                (default: {LogReportWriter(), bootstrapping the job's resamples})
+        """
+        self._logger.info("Training model for %s %s on %s cores", self.experiment_key, self.grouping_key, self.n_jobs)
+        start = time.time()
+        trainer = self.trainer()
+        trainer.train_model(self.features, self.labels, precompute_gram=self.precompute_gram, split=self.split)
+        report_writer = report_writer or LogReportWriter(self.bootstrap, random_state=trainer.random_seed)
+        self.training_output, self.validation_output = report_writer.write_report(
+            trainer.classifier.best_estimator_, trainer.X_train, trainer.Y_train, trainer.X_test, trainer.Y_test)
+        self.training_intervals = getattr(report_writer, 'training_intervals', None)
+        self.validation_intervals = getattr(report_writer, 'validation_intervals', None)
+        self.classifier = trainer.classifier
+        self.seconds = time.time() - start
+        self.features = self.labels = None
+        return self
+
+    def trainer(self):
+        """Returns the untrained LinearSvcPredictor with the job's settings"""
+        trainer = LinearSvcPredictor()
+        for name, value in self.settings.items():
+            setattr(trainer, name, value)
+        trainer.n_jobs = self.n_jobs
+        return trainer
+
+    def predictor(self):
+        """Returns a Predictor holding the trained classifier"""
+        predictor = Predictor()
+        predictor.classifier = self.classifier
+        return predictor
+
+def _rows(values, rows):
+    # Row positions of an array or a DataFrame/Series
+    return values.iloc[rows] if hasattr(values, 'iloc') else values[rows]
+
+@contextmanager
+def _uncached(pipeline):
+    # The pipeline as is, in place of transformer_cache (contextlib.nullcontext needs python 3.7)
+    yield pipeline
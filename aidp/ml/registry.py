@@ -0,0 +1,131 @@
+"""This module keeps loaded models in memory so each one is read from disk at most once per process.
+
+    Models are looked up by `(model_key, experiment_key, grouping_key)` and held in a
+    least-recently-used cache bounded by an estimate of their size in memory.
+ """
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
+
+from aidp.ml.compact import CompactLinearModel, MODELS_DIR, model_path
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+class ModelRegistry:
+    """Least-recently-used cache of loaded models, evicting the oldest once `max_bytes` is exceeded"""
+    _logger = logging.getLogger(__name__)
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, loader=None):
+        """
+        Keyword Arguments:
+            max_bytes {int} -- approximate memory budget for the loaded models (default: {1GB})
+            loader {callable} -- `loader(model_key, experiment_key, grouping_key)` returning a
+                (predictor, size in bytes) pair (default: {load from resources/models})
+        """
+        self.max_bytes = max_bytes
+        self._loader = loader or load_predictor
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_key, experiment_key, grouping_key):
+        """Returns the predictor for a model, loading it on first use
+
+        Arguments:
+            model_key {str} -- name of the models
+            experiment_key {str} -- experiment the model belongs to
+            grouping_key {str} -- grouping the model belongs to
+        """
+        key = (model_key, experiment_key, grouping_key)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+
+        # Load outside the lock so other models can be loaded at the same time
+        predictor, nbytes = self._loader(*key)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (predictor, nbytes)
+                self._evict()
+            return self._entries.get(key, (predictor, nbytes))[0]
+
+    def preload(self, model_key, n_jobs=None, keys=None):
+        """Loads every model saved under `model_key`, or the given models, in parallel
+
+        Arguments:
+            model_key {str} -- name of the models to load
+
+        Keyword Arguments:
+            n_jobs {int} -- number of loader threads (default: {None, one per model up to the cpu count})
+            keys {list(tuple)} -- (model_key, experiment_key, grouping_key) of the models to load (default: {None, all saved models})
+
+        Returns:
+            list(tuple) -- the (model_key, experiment_key, grouping_key) of the loaded models
+        """
+        keys = saved_models(model_key) if keys is None else list(keys)
+        if not keys:
+            self._logger.warning("No models found to preload for model key: %s", model_key)
+            return keys
+        n_jobs = n_jobs or min(len(keys), os.cpu_count() or 1)
+        self._logger.info("Preloading %s models for model key: %s", len(keys), model_key)
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            list(pool.map(lambda key: self.get(*key), keys))
+        return keys
+
+    def clear(self):
+        """Drops every loaded model"""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def nbytes(self):
+        """Estimated memory held by the loaded models"""
+        with self._lock:
+            return sum(nbytes for _, nbytes in self._entries.values())
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _evict(self):
+        # Always keep the most recently used model, even if it alone is over budget
+        total = sum(nbytes for _, nbytes in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            key, (_, nbytes) = self._entries.popitem(last=False)
+            total -= nbytes
+            self._logger.debug("Evicted model from registry: %s", key)
+
+def load_predictor(model_key, experiment_key, grouping_key):
+    """Loads a saved model, using the file's size as an estimate of its size in memory
+
+    The compact .npz artifact is preferred when it exists, so sklearn is only imported
+    for models which have not been exported.
+    """
+    filepath = model_path(model_key, experiment_key, grouping_key, extension='npz')
+    if filepath.exists():
+        ModelRegistry._logger.info("Loading compact model from file: %s", filepath)
+        return CompactLinearModel.load(filepath), os.path.getsize(str(filepath))
+
+    from aidp.ml.predictors import Predictor
+    predictor = Predictor().load_model_from_file(experiment_key, grouping_key, model_key)
+    return predictor, os.path.getsize(str(model_path(model_key, experiment_key, grouping_key)))
+
+def saved_models(model_key):
+    """Returns the (model_key, experiment_key, grouping_key) of every model saved under `model_key`"""
+    return sorted({(model_key, path.parent.name, path.stem) for pattern in ['*/*.pkl', '*/*.npz']
+                   for path in (MODELS_DIR / model_key).glob(pattern)})
+
+_registry = None
+
+def get_registry():
+    """Returns the registry shared by everything in this process"""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
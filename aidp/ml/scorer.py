@@ -0,0 +1,97 @@
+"""This module defines the Scorer, an in-process API for scoring subjects without any files.
+
+    The models of every experiment are loaded once and fused into one matrix multiply,
+    so scoring a subject is a few small array operations.  Input columns are ordered by
+    the column schema from resources/column_names.conf, which is validated once up front.
+ """
+import logging
+import numpy as np
+import pandas as pd
+
+from aidp.data.schema import get_schema
+from aidp.data.experiments import FullDataExperiment, ImagingOnlyDataExperiment, ClinicalOnlyDataExperiment
+from aidp.ml.compact import FusedLinearScorer
+from aidp.ml.diagnosis import DiagnosisRules, DEFAULT_VERSIONS
+from aidp.ml.registry import get_registry
+
+class Scorer:
+    """Returns the probabilities of all models and the diagnosis for one subject or a batch of them"""
+    _logger = logging.getLogger(__name__)
+
+    def __init__(self, model_key='default', diagnosis_versions=DEFAULT_VERSIONS, experiments=None):
+        """
+        Keyword Arguments:
+            model_key {str} -- name of the models to use (default: {'default'})
+            diagnosis_versions {iterable(int)} -- diagnosis algorithm versions to run (default: {(1,)})
+            experiments {list(DataExperiment)} -- experiments whose models are scored (default: {all three})
+        """
+        schema = get_schema()
+        experiments = experiments or [FullDataExperiment(), ImagingOnlyDataExperiment(), ClinicalOnlyDataExperiment()]
+        get_registry().preload(model_key, keys=[(model_key, experiment.key, grouping.key)
+                                                for experiment in experiments for grouping in experiment.groupings])
+
+        self.model_key = model_key
+        self.features = schema.features
+        self.required_columns = sorted({column for experiment in experiments
+                                        for column in experiment.feature_columns(schema)})
+        self.columns = [experiment.result_column(grouping) for experiment in experiments
+                        for grouping in experiment.groupings]
+        self._keys = ['%s_%s' %(experiment.key, grouping.key) for experiment in experiments
+                      for grouping in experiment.groupings]
+        self._fused = FusedLinearScorer([model for experiment in experiments
+                                         for model in experiment.compact_models(model_key)], schema.features)
+        self._rules = DiagnosisRules(diagnosis_versions)
+
+    def to_matrix(self, subjects):
+        """Returns the schema feature matrix of one subject or a batch of them
+
+        Arguments:
+            subjects {dict, list(dict), array-like or DataFrame} -- a subject as a dict of column -> value or a
+                1-D array or list of values in schema feature order, or a batch as a list of dicts, a 2-D array
+                or a DataFrame
+        """
+        if isinstance(subjects, dict):
+            subjects = [subjects]
+        if _is_records(subjects):
+            missing = [column for column in self.required_columns if any(column not in s for s in subjects)]
+            if missing:
+                raise KeyError("Subjects are missing required columns: %s" %missing)
+            # Columns the models don't use may be left out and become NaN
+            return np.array([[subject.get(column) for column in self.features] for subject in subjects],
+                            dtype=np.float64)
+        if isinstance(subjects, pd.DataFrame):
+            return get_schema().to_matrix(subjects)
+
+        features = np.atleast_2d(np.asarray(subjects, dtype=np.float64))
+        if features.ndim != 2 or features.shape[1] != len(self.features):
+            raise ValueError("Expected %s feature values per subject in column_names.conf order, got shape %s"
+                             %(len(self.features), np.shape(subjects)))
+        return features
+
+    def score(self, subjects):
+        """Scores one subject or a batch of them
+
+        Arguments:
+            subjects {dict, list(dict), array-like or DataFrame} -- see `to_matrix`
+
+        Returns:
+            dict or DataFrame -- for one subject (a dict, 1-D array or list of values) a dict of output
+                column -> value, otherwise a DataFrame with one row per subject
+        """
+        single = isinstance(subjects, dict) or (isinstance(subjects, (list, np.ndarray)) and not _is_records(subjects)
+                                                and np.ndim(subjects) == 1)
+        probabilities = self._fused.predict_proba(self.to_matrix(subjects))
+        diagnoses = self._rules.evaluate_arrays({key: probabilities[:, i] for i, key in enumerate(self._keys)})
+
+        if single:
+            result = dict(zip(self.columns, probabilities[0].tolist()))
+            result.update((column, str(labels[0])) for column, labels in diagnoses.items())
+            return result
+
+        index = subjects.index if isinstance(subjects, pd.DataFrame) else None
+        results = pd.DataFrame(probabilities, columns=self.columns, index=index)
+        return results.assign(**diagnoses)
+
+def _is_records(subjects):
+    # A list of subjects as dicts, rather than a list of one subject's values
+    return isinstance(subjects, list) and all(isinstance(subject, dict) for subject in subjects)
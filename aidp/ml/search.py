@@ -0,0 +1,304 @@
+"""This module defines the regularization path search, a faster alternative to grid searching C of a linear SVC.
+
+    A grid search refits the whole scaler + SVC(probability=True) pipeline for every C and
+    fold, and every one of those fits runs libsvm's own 5-fold cross validation for the
+    Platt sigmoid, although the probabilities are only needed from the final model and
+    the scorer only uses the predicted classes.  The path search fits the pipeline's
+    transformer steps (the scaler) on each fold once, walks the C values with the same
+    libsvm solver minus the probability fits, and refits the full pipeline (with its
+    probability calibration) only at the selected C.
+
+    The decision functions along the path are the ones the grid search would fit, so
+    the scores and the selected C are identical to GridSearchCV's.  Given a precomputed
+    Gram matrix (see aidp.ml.kernels) the path fits slice it instead, trading that
+    exactness for skipping the dot products.
+
+    SEARCHES names every search strategy LinearSvcPredictor can tune C with: the grid,
+    the path, successive halving over sample size, and a sequential model-based search
+    that spends fewer fits on a Gaussian process model of the score over log C.
+    Successive halving is scikit-learn's HalvingGridSearchCV, which needs scikit-learn
+    0.24 or later; with an older one it is unavailable (see `search_available`).
+ """
+import importlib
+import logging
+import time
+import warnings
+import numpy as np
+from joblib import Parallel, delayed
+from scipy.stats import norm, rankdata
+from sklearn.base import clone
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import ConstantKernel, Matern, WhiteKernel
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import GridSearchCV, check_cv
+
+C_PARAMETER = 'classifier__C'
+
+class RegularizationPathSearch:
+    """Cross validated search over C of a scaler + linear SVC pipeline, with the attributes of a fitted GridSearchCV"""
+    _logger = logging.getLogger(__name__)
+
+    def __init__(self, estimator, param_grid, cv=5, scoring='f1_micro', n_jobs=None):
+        """
+        Arguments:
+            estimator {Pipeline} -- unfitted pipeline of transformer steps and a final linear SVC 'classifier' step
+            param_grid {dict or list(dict)} -- grid of `classifier__C` values, as for GridSearchCV
+
+        Keyword Arguments:
+            cv {int or cross-validation generator} -- folds of the search, as for GridSearchCV (default: {5})
+            scoring {str} -- name of scorer to select C by (default: {'f1_micro'})
+            n_jobs {int} -- number of folds searched at once (default: {None, one})
+        """
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y, gram=None):
+        """Scores every C on every fold, then refits the pipeline at the best C on all of X
+
+        Arguments:
+            X {array-like} -- features
+            y {array-like} -- classes
+
+        Keyword Arguments:
+            gram {ndarray} -- linear kernel matrix of the standardized rows of X; if given the path
+                fits SVC(kernel='precomputed') on slices of it (default: {None})
+        """
+        c_values = self._c_values()
+        features, classes, folds, scorer, path = self._prepare(X, y, gram)
+
+        fold_results = Parallel(n_jobs=self.n_jobs)(
+            delayed(_fold_path)(self.estimator[:-1], path, features, classes, train, test, c_values, scorer, gram)
+            for train, test in folds)
+        scores = np.array([fold_scores for fold_scores, _ in fold_results])
+        fit_times = np.array([fold_times for _, fold_times in fold_results])
+        return self._refit(X, y, c_values, scores, fit_times, scorer)
+
+    @property
+    def classes_(self):
+        return self.best_estimator_.classes_
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.best_estimator_.predict_proba(X)
+
+    def decision_function(self, X):
+        return self.best_estimator_.decision_function(X)
+
+    def score(self, X, y):
+        return self.scorer_(self.best_estimator_, X, y)
+
+    def _prepare(self, X, y, gram=None):
+        # The data, folds, scorer and C-less SVC shared by every fit of the search
+        svc = self.estimator.named_steps['classifier']
+        if getattr(svc, 'kernel', None) != 'linear':
+            raise ValueError("The %s only supports linear SVC pipelines" %type(self).__name__)
+
+        features, classes = np.asarray(X, dtype=float), np.asarray(y)
+        folds = list(check_cv(self.cv, classes, classifier=True).split(features, classes))
+        scorer = check_scoring(svc, scoring=self.scoring)
+        # SVC.predict doesn't use the probability model, so the search can go without it
+        path = clone(svc).set_params(probability=False)
+        if gram is not None:
+            path.set_params(kernel='precomputed')
+        return features, classes, folds, scorer, path
+
+    def _refit(self, X, y, c_values, scores, fit_times, scorer):
+        # Selects the best C from the (folds x C values) scores and refits the full pipeline at it
+        self.cv_results_ = _cv_results(c_values, scores, fit_times)
+        # The first of the best scoring C values, as GridSearchCV picks
+        self.best_index_ = int(np.argmin(self.cv_results_['rank_test_score']))
+        self.best_params_ = {C_PARAMETER: c_values[self.best_index_]}
+        self.best_score_ = self.cv_results_['mean_test_score'][self.best_index_]
+        self.n_splits_ = scores.shape[0]
+        self.scorer_ = scorer
+        self._logger.info("Best parameters found by the %s: %s", type(self).__name__, self.best_params_)
+
+        start = time.time()
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+        self.refit_time_ = time.time() - start
+        return self
+
+    def _c_values(self):
+        grids = [self.param_grid] if isinstance(self.param_grid, dict) else list(self.param_grid)
+        if any(set(grid) != {C_PARAMETER} for grid in grids):
+            raise ValueError("The %s only tunes %s, got: %s" %(type(self).__name__, C_PARAMETER, self.param_grid))
+        return [c for grid in grids for c in grid[C_PARAMETER]]
+
+class BayesianCSearch(RegularizationPathSearch):
+    """Sequential model-based search over log C, fitting a Gaussian process to the scores and evaluating
+    the C with the highest expected improvement next"""
+
+    def __init__(self, estimator, param_grid, cv=5, scoring='f1_micro', n_jobs=None, n_iter=10, n_initial=4):
+        """
+        Arguments:
+            estimator {Pipeline} -- unfitted pipeline of transformer steps and a final linear SVC 'classifier' step
+            param_grid {dict or list(dict)} -- `classifier__C` values whose range bounds the search
+
+        Keyword Arguments:
+            cv {int or cross-validation generator} -- folds of the search, as for GridSearchCV (default: {5})
+            scoring {str} -- name of scorer to select C by (default: {'f1_micro'})
+            n_jobs {int} -- number of folds scored at once, in threads (default: {None, one})
+            n_iter {int} -- maximum number of C values to evaluate (default: {10})
+            n_initial {int} -- C values evenly spaced over log C evaluated before the model is used (default: {4})
+        """
+        super().__init__(estimator, param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs)
+        self.n_iter = n_iter
+        self.n_initial = n_initial
+
+    def fit(self, X, y):
+        """Evaluates up to `n_iter` values of C, then refits the pipeline at the best one on all of X
+
+        Arguments:
+            X {array-like} -- features
+            y {array-like} -- classes
+        """
+        c_values = self._c_values()
+        features, classes, folds, scorer, path = self._prepare(X, y)
+        parallel = Parallel(n_jobs=self.n_jobs, prefer='threads')
+        fold_data = parallel(delayed(_transform_fold)(self.estimator[:-1], features, classes, train, test)
+                             for train, test in folds)
+
+        candidates = np.linspace(np.log10(min(c_values)), np.log10(max(c_values)), 256)
+        log_c, scores, fit_times = [], [], []
+        next_log_c = list(np.linspace(candidates[0], candidates[-1], min(self.n_initial, self.n_iter)))
+        while next_log_c and len(log_c) < self.n_iter:
+            log_c.append(next_log_c.pop(0))
+            fold_results = parallel(delayed(_score_fold)(path, fold, [10 ** log_c[-1]], scorer) for fold in fold_data)
+            scores.append([fold_scores[0] for fold_scores, _ in fold_results])
+            fit_times.append([fold_times[0] for _, fold_times in fold_results])
+            if not next_log_c:
+                next_log_c = self._next_candidate(candidates, log_c, np.mean(scores, axis=1))
+
+        # In increasing C, so that ties go to the most regularized model as in the grid search
+        order = np.argsort(log_c)
+        return self._refit(X, y, [10 ** log_c[i] for i in order], np.array(scores)[order].T,
+                           np.array(fit_times)[order].T, scorer)
+
+    def _next_candidate(self, candidates, log_c, mean_scores):
+        # The candidate with the highest expected improvement over the best score, if any would improve
+        process = GaussianProcessRegressor(ConstantKernel() * Matern(nu=2.5) + WhiteKernel(1e-4), normalize_y=True)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', ConvergenceWarning)
+            process.fit(np.reshape(log_c, (-1, 1)), mean_scores)
+        mean, std = process.predict(candidates[:, None], return_std=True)
+        improvement = mean - mean_scores.max()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = improvement / std
+            expected = np.where(std > 0, improvement * norm.cdf(z) + std * norm.pdf(z), 0)
+        # Don't evaluate the same C twice
+        spacing = candidates[1] - candidates[0]
+        expected[np.abs(candidates[:, None] - np.array(log_c)[None, :]).min(axis=1) < spacing] = 0
+        if expected.max() <= 0:
+            return []
+        return [candidates[np.argmax(expected)]]
+
+def _grid_search(estimator, param_grid, cv=5, scoring='f1_micro', n_jobs=None, random_state=None):
+    return GridSearchCV(estimator, _as_list(param_grid), cv=cv, scoring=scoring, n_jobs=n_jobs)
+
+def _halving_search(estimator, param_grid, cv=5, scoring='f1_micro', n_jobs=None, random_state=None):
+    # Successive halving over the number of samples: every C is scored on a small subsample,
+    # and only the best third go on to three times as many samples
+    if not search_available('halving'):
+        raise ValueError("The halving search needs %s" %SEARCH_REQUIREMENTS['halving'])
+    from sklearn.model_selection import HalvingGridSearchCV
+    return HalvingGridSearchCV(estimator, _as_list(param_grid), cv=cv, scoring=scoring, n_jobs=n_jobs,
+                               factor=3, random_state=random_state)
+
+def _path_search(estimator, param_grid, cv=5, scoring='f1_micro', n_jobs=None, random_state=None):
+    return RegularizationPathSearch(estimator, param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs)
+
+def _bayesian_search(estimator, param_grid, cv=5, scoring='f1_micro', n_jobs=None, random_state=None):
+    return BayesianCSearch(estimator, param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs)
+
+# Search strategies by name, each returning an unfitted search with the attributes of a fitted GridSearchCV
+SEARCHES = {
+    'grid': _grid_search,
+    'halving': _halving_search,
+    'path': _path_search,
+    'smbo': _bayesian_search,
+}
+
+# What the strategies that the pinned scikit-learn can't run need
+SEARCH_REQUIREMENTS = {
+    'halving': 'scikit-learn 0.24 or later',
+}
+
+def search_available(name):
+    """Returns whether a named strategy can run with the installed scikit-learn
+
+    Arguments:
+        name {str} -- one of SEARCHES
+    """
+    if name == 'halving':
+        try:
+            importlib.import_module('sklearn.experimental.enable_halving_search_cv')
+        except ImportError:
+            return False
+    return True
+
+def make_search(name, estimator, param_grid, cv=5, scoring='f1_micro', n_jobs=None, random_state=None):
+    """Returns an unfitted search of a named strategy
+
+    Arguments:
+        name {str} -- one of SEARCHES
+        estimator {Pipeline} -- unfitted pipeline to tune
+        param_grid {dict or list(dict)} -- grid of parameter values, as for GridSearchCV
+
+    Keyword Arguments:
+        cv {int or cross-validation generator} -- folds of the search (default: {5})
+        scoring {str} -- name of scorer to select by (default: {'f1_micro'})
+        n_jobs {int} -- cores to use (default: {None, one})
+        random_state {int} -- seed of any subsampling (default: {None})
+    """
+    if name not in SEARCHES:
+        raise ValueError("Unknown search strategy: %s" %name)
+    return SEARCHES[name](estimator, param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs, random_state=random_state)
+
+def _as_list(param_grid):
+    # sklearn's searches take a dict or a list of them, but not a tuple
+    return list(param_grid) if isinstance(param_grid, tuple) else param_grid
+
+def _fold_path(transformers, path, features, classes, train, test, c_values, scorer, gram=None):
+    # One transformation, or slicing of the Gram matrix, of the fold is shared by every C along the path
+    return _score_fold(path, _transform_fold(transformers, features, classes, train, test, gram), c_values, scorer)
+
+def _transform_fold(transformers, features, classes, train, test, gram=None):
+    if gram is not None:
+        # Sliced to float64 once here, rather than converted by libsvm in every fit
+        X_train, X_test = gram[np.ix_(train, train)].astype(float), gram[np.ix_(test, train)].astype(float)
+    else:
+        transformers = clone(transformers)
+        X_train, X_test = transformers.fit_transform(features[train], classes[train]), transformers.transform(features[test])
+    return X_train, classes[train], X_test, classes[test]
+
+def _score_fold(path, fold, c_values, scorer):
+    X_train, y_train, X_test, y_test = fold
+    scores, fit_times = np.empty(len(c_values)), np.empty(len(c_values))
+    for i, c in enumerate(c_values):
+        start = time.time()
+        estimator = clone(path).set_params(C=c).fit(X_train, y_train)
+        fit_times[i] = time.time() - start
+        scores[i] = scorer(estimator, X_test, y_test)
+    return scores, fit_times
+
+def _cv_results(c_values, scores, fit_times):
+    # The cv_results_ keys of GridSearchCV that the report and selection use
+    mean = scores.mean(axis=0)
+    results = {
+        'params': [{C_PARAMETER: c} for c in c_values],
+        'param_' + C_PARAMETER: np.array(c_values),
+        'mean_test_score': mean,
+        'std_test_score': scores.std(axis=0),
+        'rank_test_score': rankdata(-mean, method='min').astype(np.int32),
+        'mean_fit_time': fit_times.mean(axis=0),
+        'std_fit_time': fit_times.std(axis=0),
+    }
+    for k, fold_scores in enumerate(scores):
+        results['split%s_test_score' %k] = fold_scores
+    return results
@@ -0,0 +1,146 @@
+"""This module defines a content-addressed cache of trained models, so `train` only refits the models whose inputs changed.
+
+    Each (experiment, grouping) TrainingJob is keyed by a hash of everything its result
+    depends on: the grouping's feature rows and labels, the predictor's parameter grid,
+    search, cross validation, calibration and Gram matrix settings, the random seed, and
+    the source of the training code along with the numpy, scikit-learn and
+    imbalanced-learn versions.  A job whose key is cached gets the stored classifier and
+    metrics instead of being fitted; every other job is fitted as usual and stored.  The
+    cache is kept under a size budget by evicting the least recently used entries.
+ """
+import functools
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import pickle
+import numpy as np
+from aidp.data.cache import DEFAULT_CACHE_DIR, evict_lru
+
+DEFAULT_TRAINING_CACHE_DIR = DEFAULT_CACHE_DIR / 'training'
+
+# Training code whose changes invalidate every cached model
+SOURCE_MODULES = ['ml/predictors.py', 'ml/search.py', 'ml/calibration.py', 'ml/caching.py', 'ml/kernels.py',
+                  'ml/helpers.py', 'ml/metrics.py', 'report/writers.py', 'data/groupings.py']
+
+# Results of a finished job that are stored
+RESULTS = ['classifier', 'training_output', 'validation_output', 'training_intervals', 'validation_intervals']
+
+class TrainingCache:
+    """Stores the classifiers and metrics of finished TrainingJobs keyed by a hash of their inputs"""
+    _logger = logging.getLogger(__name__)
+
+    def __init__(self, cache_dir=DEFAULT_TRAINING_CACHE_DIR, max_bytes=512 * 1024 * 1024, force=False):
+        """
+        Keyword Arguments:
+            cache_dir {Path} -- directory of the cached models (default: {cache/training})
+            max_bytes {int} -- size budget of the cached models (default: {512MB})
+            force {bool} -- refit every job, replacing its cached model (default: {False})
+        """
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.force = force
+
+    def key(self, job):
+        """Returns the content hash of a job that hasn't run yet
+
+        Arguments:
+            job {TrainingJob} -- job still holding its features and labels
+        """
+        trainer = job.trainer()
+        settings = {
+            'experiment': job.experiment_key,
+            'grouping': job.grouping_key,
+            'param_grid': trainer.param_grid,
+            'classifier': {name: step.get_params() for name, step in trainer.classifier.steps},
+            'cv': trainer.cv,
+            'test_size': trainer.test_size,
+            'scoring': trainer.scoring,
+            'random_seed': trainer.random_seed,
+            'search': trainer.search,
+            'calibration': trainer.calibration,
+            # The Gram matrix is computed from the job's own training rows, which are hashed below
+            'precompute_gram': job.precompute_gram,
+            'split': job.split,
+            'bootstrap': job.bootstrap,
+            'code': code_version(),
+        }
+        digest = hashlib.sha1(json.dumps(settings, sort_keys=True, default=_jsonable).encode())
+        for values in [job.features, job.labels]:
+            values = np.ascontiguousarray(values)
+            digest.update(('%s%s' %(values.dtype, values.shape)).encode())
+            digest.update(values.tobytes())
+        return digest.hexdigest()
+
+    def restore(self, job):
+        """Gives a job the results of its cached model, if there is one
+
+        The job's key is kept on it as `cache_key` for `store`, so its data can be dropped.
+
+        Arguments:
+            job {TrainingJob} -- job that hasn't run yet
+
+        Returns:
+            bool -- whether the job was restored and doesn't need to run
+        """
+        job.cache_key = self.key(job)
+        entry = self._entry_path(job.cache_key)
+        if self.force or not entry.exists():
+            return False
+        try:
+            with open(str(entry), 'rb') as f:
+                results = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            self._logger.warning("Discarding unreadable cached model: %s", entry.name)
+            _remove(entry)
+            return False
+
+        for name in RESULTS:
+            setattr(job, name, results[name])
+        # No work was done this run
+        job.seconds = 0.0
+        job.features = job.labels = None
+        os.utime(str(entry))
+        self._logger.info("Reusing cached model for %s %s (%s)", job.experiment_key, job.grouping_key, entry.name)
+        return True
+
+    def store(self, job):
+        """Caches the results of a finished job under the key `restore` gave it
+
+        Arguments:
+            job {TrainingJob} -- finished job
+        """
+        entry = self._entry_path(job.cache_key)
+        os.makedirs(str(self.cache_dir), exist_ok=True)
+        tmp_entry = entry.with_suffix('.tmp')
+        with open(str(tmp_entry), 'wb') as f:
+            pickle.dump({name: getattr(job, name, None) for name in RESULTS}, f)
+        os.replace(str(tmp_entry), str(entry))
+        self._logger.debug("Cached model for %s %s as %s", job.experiment_key, job.grouping_key, entry.name)
+        evict_lru(self.cache_dir, self.max_bytes, '*.pkl')
+
+    def _entry_path(self, key):
+        return self.cache_dir / ('%s.pkl' %key)
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """Returns a hash of the training code's source and the versions of the libraries it fits models with"""
+    import imblearn
+    import sklearn
+
+    digest = hashlib.sha1(('%s %s %s' %(np.__version__, sklearn.__version__, imblearn.__version__)).encode())
+    package = pathlib.Path(__file__).parent.parent
+    for module in SOURCE_MODULES:
+        digest.update((package / module).read_bytes())
+    return digest.hexdigest()
+
+def _jsonable(value):
+    # numpy arrays and scalars as lists and numbers, anything else by its repr
+    return value.tolist() if hasattr(value, 'tolist') else repr(value)
+
+def _remove(path):
+    try:
+        os.remove(str(path))
+    except FileNotFoundError:
+        pass
@@ -1,39 +1,40 @@
 import logging
-from sklearn.metrics import accuracy_score, confusion_matrix, classification_report, precision_recall_fscore_support, roc_curve, make_scorer, accuracy_score, precision_score, recall_score, roc_auc_score
-from aidp.ml.helpers import specificity, negative_predictive_value, weighted_sensitivity, weighted_ppv, weighted_specificity, weighted_npv, weighted_accuracy
+from aidp.ml.metrics import METRICS, bootstrap_intervals, score_predictions
 
 class LogReportWriter():
-    def __init__(self):
+    def __init__(self, n_resamples=0, random_state=None):
+        """
+        Keyword Arguments:
+            n_resamples {int} -- bootstrap resamples of each split's predictions for confidence intervals,
+                0 for none (default: {0})
+            random_state {int} -- seed of the resamples (default: {None})
+        """
         self._logger = logging.getLogger(__name__)
-        self._scoring_list={
-            'recall':make_scorer(recall_score),
-            'precision':make_scorer(precision_score),
-            'auc':make_scorer(roc_auc_score),
-            'specificity':make_scorer(specificity),
-            'npv':make_scorer(negative_predictive_value),
-            'accuracy':make_scorer(accuracy_score),
-            'weighted_sensitivity':make_scorer(weighted_sensitivity),
-            'weighted_ppv':make_scorer(weighted_ppv),
-            'weighted_specificity':make_scorer(weighted_specificity),
-            'weighted_npv':make_scorer(weighted_npv),
-            'weighted_accuracy':make_scorer(weighted_accuracy)
-        }
+        self.n_resamples = n_resamples
+        self.random_state = random_state
+        # Lower and upper bound of every metric of the last report, when bootstrapping
+        self.training_intervals = self.validation_intervals = None
 
     def write_report(self, model, x_train, y_train, x_test, y_test):
         self._logger.info("")
         self._logger.info("--TRAINING METRICS--")
-        training_output = []
-        validation_output = []
-        for metric in self._scoring_list:
-            score = self._scoring_list[metric](model, x_train, y_train)
-            self._logger.info("%s\t%s" %(metric, score))
-            training_output.append(score)
+        training_output, self.training_intervals = self._write_metrics(model, x_train, y_train)
         self._logger.info("")
         self._logger.info("--VALIDATION METRICS--")
-        for metric in self._scoring_list:            
-            score = self._scoring_list[metric](model, x_test, y_test)
-            self._logger.info("%s\t%s" %(metric, score))
-            validation_output.append(score)
+        validation_output, self.validation_intervals = self._write_metrics(model, x_test, y_test)
         self._logger.info("")
         return training_output, validation_output
-        
\ No newline at end of file
+
+    def _write_metrics(self, model, x, y):
+        # One prediction per split, every metric from its confusion counts
+        predictions = model.predict(x)
+        scores = score_predictions(y, predictions)
+        if not self.n_resamples:
+            for metric in METRICS:
+                self._logger.info("%s\t%s" %(metric, scores[metric]))
+            return [scores[metric] for metric in METRICS], None
+
+        intervals = bootstrap_intervals(y, predictions, self.n_resamples, random_state=self.random_state)
+        for metric, (low, high) in zip(METRICS, intervals):
+            self._logger.info("%s\t%s\t[%.4f, %.4f]" %(metric, scores[metric], low, high))
+        return [scores[metric] for metric in METRICS], intervals
@@ -0,0 +1,145 @@
+"""This module defines the batch mode of the prediction workflow, which scores many input files in one run"""
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import logging
+import os
+import time
+import pandas as pd
+
+from aidp.data.modeldata import ModelData
+from aidp.data.reader import get_reader
+from aidp.data.writer import get_writer
+from aidp.runners.engines import PredictionEngine
+from aidp.ml.diagnosis import DEFAULT_VERSIONS
+
+INPUT_EXTENSIONS = ('.xlsx', '.xls', '.csv', '.parquet', '.pq')
+
+# Per-process state of the worker processes, set up once by _init_worker
+_worker = {}
+
+def is_batch_input(path):
+    """Returns True if `path` names a directory or glob pattern rather than a single file"""
+    return os.path.isdir(path) or glob.has_magic(path)
+
+def expand_input_files(path):
+    """Returns the input files named by a file path, directory or glob pattern, in sorted order
+
+    Output files from previous runs (ending in `_out`) are skipped.
+
+    Arguments:
+        path {str} -- file path, directory or glob pattern
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, '*')
+    filepaths = glob.glob(path) if glob.has_magic(path) else [path]
+    return sorted(f for f in filepaths
+                  if os.path.splitext(f)[-1].lower() in INPUT_EXTENSIONS
+                  and not os.path.splitext(os.path.basename(f))[0].endswith('_out'))
+
+class BatchPredictionRunner:
+    """Scores many input files with models that are loaded once per worker process"""
+    _logger = logging.getLogger(__name__)
+
+    def __init__(self, model_key='default', n_jobs=None, cache=None, required_columns_only=False, output_format='xlsx',
+                 diagnosis_versions=DEFAULT_VERSIONS, fused=False, output_columns=None):
+        """
+        Keyword Arguments:
+            model_key {str} -- name of the models to use (default: {'default'})
+            n_jobs {int} -- number of worker processes (default: {None, one per cpu})
+            cache {DataFileCache} -- optional cache of previously parsed files (default: {None})
+            required_columns_only {bool} -- only read the required columns and copy them to the output,
+                instead of every input column (default: {False})
+            output_format {str} -- format of the per-file outputs (default: {'xlsx'})
+            diagnosis_versions {list(int)} -- diagnosis algorithm versions to run (default: {(1,)})
+            fused {bool} -- score all models with one matrix multiply (default: {False})
+            output_columns {list(str)} -- only run the models for these probability columns and the diagnosis (default: {None, all models})
+        """
+        self.model_key = model_key
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.cache = cache
+        self.required_columns_only = required_columns_only
+        self.output_format = output_format
+        self.diagnosis_versions = diagnosis_versions
+        self.fused = fused
+        self.output_columns = output_columns
+
+    def run(self, filepaths, merged_output=None):
+        """Scores every file, writing one output per input file or a single merged output
+
+        Arguments:
+            filepaths {list(str)} -- input files to score
+
+        Keyword Arguments:
+            merged_output {str} -- if given, write all results to this one file instead (default: {None})
+
+        Returns:
+            list(dict) -- per-file summary with the file name, row count, seconds taken and status
+        """
+        start = time.time()
+        settings = (self.model_key, self.cache, self.required_columns_only, self.output_format, self.diagnosis_versions,
+                    self.fused, self.output_columns, merged_output is not None)
+        n_jobs = min(self.n_jobs, len(filepaths))
+        self._logger.info("Scoring %s files with %s worker processes", len(filepaths), n_jobs)
+
+        if n_jobs <= 1:
+            _init_worker(*settings)
+            outcomes = [_predict_file(f) for f in filepaths]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=settings) as pool:
+                outcomes = list(pool.map(_predict_file, filepaths))
+
+        summary = [outcome for outcome, _ in outcomes]
+        if merged_output is not None:
+            outputs = [output for _, output in outcomes if output is not None]
+            if outputs:
+                write_merged_output(pd.concat(outputs, ignore_index=True), merged_output)
+
+        self._log_summary(summary, time.time() - start)
+        return summary
+
+    def _log_summary(self, summary, total_seconds):
+        self._logger.info("%-40s %8s %9s  %s", "File", "Rows", "Seconds", "Status")
+        for row in summary:
+            self._logger.info("%-40s %8s %9.2f  %s", os.path.basename(row['file']), row['rows'], row['seconds'], row['status'])
+        self._logger.info("Scored %s files in %.2f seconds (%.2f seconds of per-file work)",
+                          len(summary), total_seconds, sum(row['seconds'] for row in summary))
+
+def write_merged_output(output, filepath):
+    """Writes the combined results of a batch run in the format given by the file's extension"""
+    logging.getLogger(__name__).info("Writing merged results to output file: %s", filepath)
+    get_writer(os.path.splitext(filepath)[-1] or 'xlsx').write_data(output, filepath)
+
+def _init_worker(model_key, cache, required_columns_only, output_format, diagnosis_versions, fused, output_columns, merge):
+    engine = PredictionEngine(None)
+    engine.diagnosis_versions = diagnosis_versions
+    engine.fused = fused
+    engine.output_columns = output_columns
+    engine.load_models(model_key)
+    _worker.update(engine=engine, model_key=model_key, cache=cache, required_columns_only=required_columns_only,
+                   output_format=output_format, merge=merge)
+
+def _predict_file(filepath):
+    start = time.time()
+    engine = _worker['engine']
+    try:
+        model_data = ModelData(filepath, get_reader(filepath, cache=_worker['cache']), output_format=_worker['output_format'])
+        engine.model_data = model_data
+        model_data.read_data(columns=engine.required_columns() if _worker['required_columns_only'] else None)
+        engine.start(model_key=_worker['model_key'])
+        engine.generate_diagnosis()
+
+        output = model_data.data
+        if _worker['merge']:
+            # A Source_file column of the input, e.g. a previous merged output, is replaced
+            output = output.drop(columns='Source_file', errors='ignore')
+            output.insert(0, 'Source_file', os.path.basename(filepath))
+        else:
+            engine.write_output()
+            output = None
+        status = 'ok'
+        rows = len(model_data.data.index)
+    except Exception as error:
+        logging.getLogger(__name__).exception("Failed to score file: %s", filepath)
+        output, status, rows = None, 'failed: %s' %error, 0
+
+    return {'file': filepath, 'rows': rows, 'seconds': time.time() - start, 'status': status}, output
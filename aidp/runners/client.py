@@ -0,0 +1,40 @@
+"""This module defines a small client for the prediction server started by `aidp serve`"""
+import json
+import urllib.error
+import urllib.request
+
+from aidp.runners.server import DEFAULT_PORT
+
+class PredictionClient:
+    """Sends subjects to a running prediction server and returns their probabilities and diagnosis"""
+
+    def __init__(self, url='http://127.0.0.1:%s' %DEFAULT_PORT, timeout=30):
+        """
+        Keyword Arguments:
+            url {str} -- base url of the server (default: {'http://127.0.0.1:8585'})
+            timeout {float} -- seconds to wait for a response (default: {30})
+        """
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def predict(self, subjects):
+        """Scores one subject (a dict of column -> value) or a list of them
+
+        Returns:
+            list(dict) -- probabilities and diagnosis of each subject
+        """
+        request = urllib.request.Request(self.url + '/predict', data=json.dumps(subjects).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        return self._send(request)
+
+    def health(self):
+        return self._send(urllib.request.Request(self.url + '/health'))
+
+    def _send(self, request):
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as error:
+            # Surface the server's error message rather than only the status code
+            message = json.loads(error.read() or b'{}').get('error', error.reason)
+            raise RuntimeError("Prediction server returned %s: %s" %(error.code, message)) from None
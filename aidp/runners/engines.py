@@ -5,6 +5,11 @@ from datetime import datetime
 import logging
 from aidp.data.experiments import ClinicalOnlyDataExperiment, ImagingOnlyDataExperiment, \
     FullDataExperiment
+from aidp.data.schema import get_schema
+from aidp.ml.diagnosis import diagnose, DiagnosisRules, DEFAULT_VERSIONS
+from aidp.ml.registry import get_registry
+from aidp.ml.compact import FusedLinearScorer
+from aidp.runners.scheduler import TrainingScheduler
 import pathlib
 import os
 import pandas as pd
@@ -31,8 +36,24 @@ class Engine(ABC):
             ClinicalOnlyDataExperiment()
         ]
 
+    # Non-feature columns of the input that the engine's later stages need
+    id_columns = []
+
     def __init__(self, model_data):
         self.model_data = model_data
+
+    def required_columns(self):
+        """Returns the input columns used by the experiments and later stages, so readers can skip the rest"""
+        schema = get_schema()
+        columns = set(self.id_columns) | {schema.target}
+        for experiment in self.experiments:
+            if self.planned_groupings(experiment) != []:
+                columns.update(experiment.feature_columns(schema))
+        return columns
+
+    def planned_groupings(self, experiment):
+        """Returns the keys of the experiment's groupings whose models are needed, or None for all of them"""
+        return None
         
     @abstractmethod
     def start(self):
@@ -41,23 +62,137 @@ class Engine(ABC):
 class PredictionEngine(Engine):
 
     """Defines tasks that will be completed as part of the prediction workflow"""
+    id_columns = ['Subject']
+    # Diagnosis algorithm versions to run; the first one fills the Predicted_diagnosis column
+    diagnosis_versions = DEFAULT_VERSIONS
+    # Score all experiments' models with one matrix multiply instead of one pass per model
+    fused = False
+    # `<experiment>_<grouping>` probability columns to output, or None to run every model.
+    # The columns the diagnosis reads are always added
+    output_columns = None
 
     def start(self, model_key='default'):
+        # Build the feature matrix once and let every experiment project its columns from it
+        features, index = self.model_data.features, self.model_data.data.index
+        for results in self._predict(features, model_key, index):
+            self.model_data.add_results(results)
+
+    def prediction_plan(self):
+        """Returns the `<experiment>_<grouping>` keys of the models the outputs and the diagnosis need,
+        or None when every model is needed"""
+        if self.output_columns is None:
+            return None
+        available = {'%s_%s' %(experiment.key, grouping.key) for experiment in self.experiments
+                     for grouping in experiment.groupings}
+        wanted = set(self.output_columns) | set(DiagnosisRules(self.diagnosis_versions).columns)
+        unknown = wanted - available
+        if unknown:
+            self._logger.error("Unknown probability columns requested: %s", sorted(unknown))
+            raise ValueError("Unknown probability columns: %s" %sorted(unknown))
+        return sorted(wanted)
+
+    def planned_groupings(self, experiment):
+        plan = self.prediction_plan()
+        if plan is None:
+            return None
+        return [grouping.key for grouping in experiment.groupings if '%s_%s' %(experiment.key, grouping.key) in plan]
+
+    def load_models(self, model_key):
+        """Loads the models in the prediction plan into the model registry, in parallel"""
+        keys = []
+        for experiment in self.experiments:
+            planned = self.planned_groupings(experiment)
+            keys.extend((model_key, experiment.key, grouping.key) for grouping in experiment.groupings
+                        if planned is None or grouping.key in planned)
+        get_registry().preload(model_key, keys=keys)
+
+    def score(self, data, model_key='default', index=None):
+        """Returns the predicted probabilities and diagnosis for some data, without touching model_data
+
+        Arguments:
+            data {DataFrame or ndarray} -- input data, or its schema feature matrix
+
+        Keyword Arguments:
+            model_key {str} -- name of the models to use (default: {'default'})
+            index {Index} -- row labels for the results (default: {the index of `data`})
+        """
+        results = pd.concat(self._predict(data, model_key, index), axis=1)
+        return pd.concat([results, self._diagnose(results)], axis=1)
+
+    def _predict(self, data, model_key, index=None):
+        """Returns the results of every experiment for the input data or its schema feature matrix"""
+        if self.fused:
+            return self._predict_fused(data, model_key, index)
+
+        all_results = []
         for experiment in self.experiments: # loops through all the experiments
+            groupings = self.planned_groupings(experiment)
+            if groupings == []:
+                continue
             self._logger.info("Starting prediction experiment: %s", experiment)
-            experiment.predict(self.model_data.data, model_key) # this through all the group comparisons
+            experiment.predict(data, model_key, index=index, groupings=groupings) # this through all the group comparisons
             self._logger.debug("Finished prediction experiment: %s", experiment)
+            all_results.append(experiment.get_results())
+        return all_results
 
-            results = experiment.get_results()
-            self.model_data.add_results(results)
-            self.model_data.write_output_file()
+    def _predict_fused(self, data, model_key, index=None):
+        if isinstance(data, pd.DataFrame):
+            index = data.index if index is None else index
+            data = get_schema().to_matrix(data)
+        index = pd.RangeIndex(len(data)) if index is None else index
+
+        scorer = self._fused_scorer(model_key)
+        self._logger.info("Scoring %s models with the fused scorer", len(scorer.keys))
+        predictions = scorer.predict_proba(data)
+
+        all_results = []
+        for experiment in self.experiments:
+            groupings = [grouping.key for grouping in experiment.groupings
+                         if (experiment.key, grouping.key) in scorer.keys]
+            if not groupings:
+                continue
+            columns = [scorer.keys.index((experiment.key, grouping)) for grouping in groupings]
+            experiment.set_predictions(predictions[:, columns], index, groupings=groupings)
+            all_results.append(experiment.get_results())
+        return all_results
+
+    def _fused_scorer(self, model_key):
+        scorer_key = (model_key, self.prediction_plan())
+        if getattr(self, '_scorer_key', None) != scorer_key:
+            models = [model for experiment in self.experiments
+                      for model in experiment.compact_models(model_key, groupings=self.planned_groupings(experiment))]
+            self._scorer = FusedLinearScorer(models, get_schema().features)
+            self._scorer_key = scorer_key
+        return self._scorer
+
+    def write_output(self):
+        """Writes the input data, predictions and diagnosis to the output file in a single write"""
+        self.model_data.write_output_file()
+
+    def start_streaming(self, model_key='default', chunksize=10000, required_columns_only=False):
+        """Scores the input one chunk of rows at a time, appending each chunk's results and
+        diagnosis to the output file so memory use is bounded by the chunk size
+
+        Keyword Arguments:
+            model_key {str} -- name of the models to use (default: {'default'})
+            chunksize {int} -- number of rows scored at once (default: {10000})
+            required_columns_only {bool} -- only read the required columns and copy them to the output,
+                instead of every input column (default: {False})
+        """
+        total_rows = 0
+        chunks = self.model_data.iter_chunks(chunksize, columns=self.required_columns() if required_columns_only else None)
+        for chunk_number, chunk in enumerate(chunks):
+            self._logger.info("Scoring chunk %s (%s rows)", chunk_number + 1, len(chunk.index))
+            output = pd.concat([chunk, self.score(chunk, model_key)], axis=1)
+            self.model_data.append_output_chunk(output, first_chunk=chunk_number == 0)
+            total_rows += len(chunk.index)
+        self._logger.info("Finished scoring %s rows", total_rows)
 
     def generate_report(self):        
         # get the clinical data and diffusion data
         # need to generate subject-based report
         parent_path=str(pathlib.Path(__file__).parent.parent.parent) 
-        new_filename = '%s_out.xlsx' %os.path.splitext(os.path.basename(self.model_data.filename))[-2]
-        output_model_data = pd.read_excel(parent_path + '/' + new_filename).drop('Unnamed: 0',axis=1)
+        output_model_data = self.model_data.data
         output_dir=parent_path + '/output/'
         subject_ID_list=output_model_data['Subject']
        
@@ -79,60 +214,23 @@ class PredictionEngine(Engine):
     # does not matter what kind of experiments you perform..    
     
     def generate_diagnosis(self):        
-        # get the clinical data and diffusion data
-        # need to generate subject-based report
-        parent_path=str(pathlib.Path(__file__).parent.parent.parent) 
-        new_filename = '%s_out.xlsx' %os.path.splitext(os.path.basename(self.model_data.filename))[-2]
-        output_model_data = pd.read_excel(parent_path + '/' + new_filename).drop('Unnamed: 0',axis=1)
-        output_dir=parent_path + '/output/'
-        subject_ID_list=output_model_data['Subject']
-        predicted_dignosis = []	
-       
-
-        for s in subject_ID_list:
-
-            # for PD
-            sub_data=output_model_data.loc[output_model_data['Subject'] == s]
-
-            # # Diagnosis Algorithm Version 1 
-            if sub_data['both_park_v_control (PD/MSA/PSP Probability)'].iloc[0] < 0.5 :
-                predicted_dignosis.append('Not Parkinsonism')
-            elif sub_data['both_park_v_control (PD/MSA/PSP Probability)'].iloc[0] >= 0.5 and sub_data['dmri_msa_psp_v_pd (MSA/PSP Probability)'].iloc[0] < 0.5 and sub_data['dmri_psp_v_msa (PSP Probability)'].iloc[0] < 0.5 :
-                predicted_dignosis.append('PD')
-            elif sub_data['both_park_v_control (PD/MSA/PSP Probability)'].iloc[0] >= 0.5 and sub_data['dmri_msa_psp_v_pd (MSA/PSP Probability)'].iloc[0] >= 0.5 and sub_data['dmri_psp_v_msa (PSP Probability)'].iloc[0] < 0.5 :
-                predicted_dignosis.append('MSA')
-            elif sub_data['both_park_v_control (PD/MSA/PSP Probability)'].iloc[0] >= 0.5 and sub_data['dmri_msa_psp_v_pd (MSA/PSP Probability)'].iloc[0] >= 0.5 and sub_data['dmri_psp_v_msa (PSP Probability)'].iloc[0] >= 0.5 :
-                predicted_dignosis.append('PSP')
-            elif sub_data['both_park_v_control (PD/MSA/PSP Probability)'].iloc[0] >= 0.5 and sub_data['dmri_msa_psp_v_pd (MSA/PSP Probability)'].iloc[0] < 0.5 and sub_data['dmri_psp_v_pd_msa (PSP Probability)'].iloc[0] >= 0.5 or sub_data['dmri_psp_v_msa (PSP Probability)'].iloc[0] >= 0.5 :
-                predicted_dignosis.append('PSP')
-            else:
-                predicted_dignosis.append('Unknown')
-
-            # Diagnosis Algorithm Version 2
-            # if sub_data['both_park_v_control (PD/MSA/PSP Probability)'].iloc[0] < 0.5 :
-            #     predicted_dignosis.append('Not Parkinsonism')
-            # elif sub_data['both_park_v_control (PD/MSA/PSP Probability)'].iloc[0] >= 0.5 and sub_data['dmri_msa_psp_v_pd (MSA/PSP Probability)'].iloc[0] < 0.08 and sub_data['dmri_psp_v_pd_msa (PSP Probability)'].iloc[0] < 0.04 and sub_data['dmri_psp_v_msa (PSP Probability)'].iloc[0] < 0.5 :
-            #     predicted_dignosis.append('PD')
-            # elif sub_data['both_park_v_control (PD/MSA/PSP Probability)'].iloc[0] >= 0.5 and sub_data['dmri_psp_v_pd_msa (PSP Probability)'].iloc[0] >= 0.3 or sub_data['dmri_psp_v_msa (PSP Probability)'].iloc[0] >= 0.3 :
-            #     predicted_dignosis.append('PSP')
-            # elif sub_data['both_park_v_control (PD/MSA/PSP Probability)'].iloc[0] >= 0.5 and sub_data['dmri_psp_v_pd_msa (PSP Probability)'].iloc[0] < 0.5 and sub_data['dmri_psp_v_msa (PSP Probability)'].iloc[0] < 0.5 and sub_data['dmri_pd_v_msa (PD Probability)'].iloc[0] < 0.5:
-            #     predicted_dignosis.append('MSA')
-            # elif sub_data['both_park_v_control (PD/MSA/PSP Probability)'].iloc[0] >= 0.5 and sub_data['dmri_msa_psp_v_pd (MSA/PSP Probability)'].iloc[0] < 0.5 and sub_data['dmri_psp_v_pd_msa (PSP Probability)'].iloc[0] >= 0.5 or sub_data['dmri_psp_v_msa (PSP Probability)'].iloc[0] >= 0.5 :
-            #     predicted_dignosis.append('PSP')
-            # else:
-            #     predicted_dignosis.append('Unknown')
-
-
-        
-        output_model_data['Predicted_diagnosis'] = predicted_dignosis
-        filepath=parent_path + '/' + new_filename
-        output_model_data.to_excel(filepath)
+        # Diagnose from the predictions in memory; the output is written once by write_output
+        output_model_data = self.model_data.data
+        for column, diagnoses in self._diagnose(output_model_data).items():
+            output_model_data[column] = diagnoses
+
+    def _diagnose(self, output_model_data):
+        """Applies each diagnosis algorithm version to the subjects' predicted probabilities
+
+        Arguments:
+            output_model_data {DataFrame} -- experiment results, optionally joined to the input data
+        """
+        return diagnose(output_model_data, self.diagnosis_versions)
         
      # create a donut chart
     def donut_chart(self, test_prob, circle_title_1, circle_title_2, switch):       
         parent_path=str(pathlib.Path(__file__).parent.parent.parent) 
-        new_filename = '%s_out.xlsx' %os.path.splitext(os.path.basename(self.model_data.filename))[-2]
-        output_model_data = pd.read_excel(parent_path + '/' + new_filename).drop('Unnamed: 0',axis=1)
+        output_model_data = self.model_data.data
         output_dir=parent_path + '/output/'
         subject_ID_list=output_model_data['Subject']
         
@@ -224,8 +322,7 @@ class PredictionEngine(Engine):
 
     def bar_chart(self):  
         parent_path=str(pathlib.Path(__file__).parent.parent.parent) 
-        new_filename = '%s_out.xlsx' %os.path.splitext(os.path.basename(self.model_data.filename))[-2]
-        output_model_data = pd.read_excel(parent_path + '/' + new_filename).drop('Unnamed: 0',axis=1)
+        output_model_data = self.model_data.data
         output_dir=parent_path + '/output/'
         subject_ID_list=output_model_data['Subject']
 
@@ -321,8 +418,7 @@ class PredictionEngine(Engine):
 
     def pdf_report(self):  
         parent_path=str(pathlib.Path(__file__).parent.parent.parent) 
-        new_filename = '%s_out.xlsx' %os.path.splitext(os.path.basename(self.model_data.filename))[-2]
-        output_model_data = pd.read_excel(parent_path + '/' + new_filename).drop('Unnamed: 0',axis=1)
+        output_model_data = self.model_data.data
         output_dir=parent_path + '/output/'
         subject_ID_list=output_model_data['Subject']
         
@@ -489,8 +585,7 @@ class PredictionEngine(Engine):
     def send_report(self, switch): 
         
         parent_path=str(pathlib.Path(__file__).parent.parent.parent) 
-        new_filename = '%s_out.xlsx' %os.path.splitext(os.path.basename(self.model_data.filename))[-2]
-        output_model_data = pd.read_excel(parent_path + '/' + new_filename).drop('Unnamed: 0',axis=1)
+        output_model_data = self.model_data.data
         output_dir=parent_path + '\\output\\'
         subject_ID_list=output_model_data['Subject']
         if switch == '1':
@@ -603,11 +698,66 @@ class PredictionEngine(Engine):
 
 class TrainingEngine(Engine):
     """Defines tasks that will be completed as part of the training workflow"""
+    # TrainingScheduler that trains every experiment's models at once; None trains them one at a time
+    scheduler = None
+    # LinearSvcPredictor attributes to override for every model, e.g. {'search': 'path'}
+    training_settings = None
+    # Tune C over slices of one Gram matrix per model
+    precompute_gram = False
+    # Bootstrap resamples for confidence intervals of the training metrics, 0 for none
+    bootstrap = 0
+    # Outer folds of nested cross validation, which evaluates the models instead of training them; 0 for none
+    nested_cv = 0
+    # TrainingCache of the models of unchanged experiment and grouping jobs; None refits every model
+    training_cache = None
+
     def start(self, model_key = datetime.datetime.now().strftime("%Y-%m-%d-%H%M%S%f")):
+        if self.nested_cv:
+            return self._train_nested(model_key)
+        if self.scheduler is not None:
+            return self._train_scheduled(model_key)
         for experiment in self.experiments:
             self._logger.info("Starting training experiment: %s", experiment)
-            experiment.train(self.model_data.data, model_key)
+            experiment.train(self.model_data.data, model_key, features=self.model_data.features,
+                             group_index=self.model_data.group_index, settings=self.training_settings,
+                             precompute_gram=self.precompute_gram, bootstrap=self.bootstrap,
+                             cache=self.training_cache)
             self._logger.debug("Finished training experiment: %s", experiment)
+
+    def _train_scheduled(self, model_key):
+        jobs = {experiment: experiment.training_jobs(self.model_data.data, features=self.model_data.features,
+                                                     group_index=self.model_data.group_index,
+                                                     settings=self.training_settings,
+                                                     precompute_gram=self.precompute_gram,
+                                                     bootstrap=self.bootstrap)
+                for experiment in self.experiments}
+        cache = self.training_cache
+        # Jobs with cached models aren't sent to the workers at all
+        pending = [job for experiment_jobs in jobs.values() for job in experiment_jobs
+                   if cache is None or not cache.restore(job)]
+        finished = dict(zip(map(id, pending), self.scheduler.run(pending)))
+        if cache is not None:
+            for job in finished.values():
+                cache.store(job)
+        for experiment, experiment_jobs in jobs.items():
+            experiment.finish_training([finished.get(id(job), job) for job in experiment_jobs], model_key)
+
+    def _train_nested(self, model_key):
+        jobs = {experiment: experiment.nested_jobs(self.model_data.data, model_key, self.nested_cv,
+                                                   features=self.model_data.features,
+                                                   group_index=self.model_data.group_index,
+                                                   settings=self.training_settings)
+                for experiment in self.experiments}
+        # Folds checkpointed by an earlier run of the same model key aren't sent to the workers at all
+        pending = [job for experiment_jobs in jobs.values() for job in experiment_jobs if not job.resume()]
+        self._logger.info("Nested cross validation of %s: %s outer folds to run, %s resumed from checkpoints", model_key,
+                          len(pending), sum(len(experiment_jobs) for experiment_jobs in jobs.values()) - len(pending))
+        finished = dict(zip(map(id, pending), (self.scheduler or TrainingScheduler(1)).run(pending)))
+        for experiment, experiment_jobs in jobs.items():
+            experiment.finish_nested([finished.get(id(job), job) for job in experiment_jobs], model_key)
+
+    def write_output(self):
+        pass
     def generate_report(self):
         pass
     def donut_chart(self, test_prob, circle_title_1, circle_title_2, switch):
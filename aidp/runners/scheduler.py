@@ -0,0 +1,81 @@
+"""This module defines the training scheduler, which trains the models of every experiment and grouping in parallel.
+
+    The (experiment, grouping) models are independent, so they are trained as separate
+    jobs in a pool of worker processes.  A global core budget is split between the
+    worker processes and the cross validation inside each job, so the two levels of
+    parallelism never ask for more cores than the budget between them.
+ """
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import logging
+import os
+import time
+
+class TrainingScheduler:
+    """Runs training jobs in worker processes within a budget of cores"""
+    _logger = logging.getLogger(__name__)
+
+    def __init__(self, n_cores=None, n_workers=None):
+        """
+        Keyword Arguments:
+            n_cores {int} -- total number of cores to use (default: {None, one per cpu})
+            n_workers {int} -- number of worker processes, the rest of the budget going to each
+                job's cross validation (default: {None, as many as the budget and jobs allow})
+        """
+        self.n_cores = n_cores or os.cpu_count() or 1
+        self.n_workers = n_workers
+
+    def plan(self, n_jobs):
+        """Returns the (worker processes, cores per job) split of the budget for `n_jobs` jobs"""
+        n_workers = max(1, min(self.n_workers or self.n_cores, self.n_cores, n_jobs))
+        return n_workers, max(1, self.n_cores // n_workers)
+
+    def run(self, jobs):
+        """Runs every job, returning the finished jobs in the order given
+
+        Arguments:
+            jobs {list(TrainingJob)} -- jobs with `n_jobs` and `size` attributes and a `run()` method
+                which returns the finished job
+
+        Returns:
+            list(TrainingJob) -- the finished jobs
+        """
+        start = time.time()
+        n_workers, n_inner = self.plan(len(jobs))
+        self._logger.info("Training %s models with %s worker processes of %s cores each", len(jobs), n_workers, n_inner)
+        for job in jobs:
+            job.n_jobs = n_inner
+
+        if n_workers <= 1:
+            finished = [job.run() for job in jobs]
+        else:
+            finished = [None] * len(jobs)
+            # Biggest jobs first, so a large job doesn't start last and leave the other workers idle
+            order = sorted(range(len(jobs)), key=lambda i: jobs[i].size, reverse=True)
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(n_inner,)) as pool:
+                futures = {pool.submit(_run_job, jobs[i]): i for i in order}
+                for future in as_completed(futures):
+                    finished[futures[future]] = future.result()
+                    self._logger.debug("Finished training job %s of %s", sum(f is not None for f in finished), len(jobs))
+
+        self._log_summary(finished, time.time() - start)
+        return finished
+
+    def _log_summary(self, jobs, total_seconds):
+        self._logger.info("%-12s %-16s %9s", "Experiment", "Grouping", "Seconds")
+        for job in jobs:
+            self._logger.info("%-12s %-16s %9.2f", job.experiment_key, job.grouping_key, job.seconds)
+        job_seconds = sum(job.seconds for job in jobs)
+        self._logger.info("Trained %s models in %.2f seconds (%.2f seconds of per-job work, %.1fx speedup)",
+                          len(jobs), total_seconds, job_seconds, job_seconds / total_seconds if total_seconds else 1)
+
+def _init_worker(n_threads):
+    # Keep native thread pools (BLAS, OpenMP) within the job's share of the budget too, when
+    # threadpoolctl is installed; it is optional, so without it they are left at their defaults
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(n_threads)
+
+def _run_job(job):
+    return job.run()
@@ -0,0 +1,200 @@
+"""This module defines the prediction server, which keeps the models loaded and scores subjects sent over HTTP.
+
+    Concurrent requests are coalesced into micro-batches: the first waiting request
+    opens a short time window, every request arriving within it is scored with it in
+    one pass through the models, and the results are split back out per request.
+
+    POST /predict with a JSON subject (an object of column -> value) or a list of them
+    returns a list with the predicted probabilities and diagnosis of each subject.
+ """
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import logging
+import math
+import queue
+import socketserver
+import threading
+import time
+import numpy as np
+
+DEFAULT_PORT = 8585
+# Input columns echoed back with each subject's results
+ID_COLUMNS = ['Subject']
+
+class MicroBatcher:
+    """Collects the feature rows of concurrent requests and scores them together on one worker thread"""
+    _logger = logging.getLogger(__name__)
+
+    def __init__(self, score, batch_window=0.005, max_batch_size=256):
+        """
+        Arguments:
+            score {callable} -- scores a feature matrix, returning a DataFrame with one row per matrix row
+
+        Keyword Arguments:
+            batch_window {float} -- seconds to wait for more requests after the first one (default: {0.005})
+            max_batch_size {int} -- maximum number of subjects scored at once (default: {256})
+        """
+        self._score = score
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='MicroBatcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, features):
+        """Queues a feature matrix for scoring, returning a Future of the DataFrame of its results"""
+        future = Future()
+        self._requests.put((features, future))
+        return future
+
+    def close(self):
+        self._requests.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            batch, size = [request], len(request[0])
+            deadline = time.monotonic() + self.batch_window
+            while size < self.max_batch_size:
+                try:
+                    request = self._requests.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._requests.put(None)
+                    break
+                batch.append(request)
+                size += len(request[0])
+            self._score_batch(batch)
+
+    def _score_batch(self, batch):
+        self._logger.debug("Scoring a batch of %s requests", len(batch))
+        try:
+            results = self._score(np.concatenate([features for features, _ in batch]))
+        except Exception as error:
+            for _, future in batch:
+                future.set_exception(error)
+            return
+
+        start = 0
+        for features, future in batch:
+            end = start + len(features)
+            future.set_result(results.iloc[start:end])
+            start = end
+
+class PredictionServer:
+    """Serves predictions over localhost HTTP with models kept warm in a Scorer"""
+    _logger = logging.getLogger(__name__)
+
+    def __init__(self, scorer, host='127.0.0.1', port=DEFAULT_PORT, batch_window=0.005, max_batch_size=256):
+        """
+        Arguments:
+            scorer {Scorer} -- scorer used for each micro-batch
+
+        Keyword Arguments:
+            host {str} -- address to listen on (default: {'127.0.0.1'})
+            port {int} -- port to listen on, 0 for any free port (default: {8585})
+            batch_window {float} -- seconds to wait for more requests after the first one (default: {0.005})
+            max_batch_size {int} -- maximum number of subjects scored at once (default: {256})
+        """
+        self.scorer = scorer
+        self.batcher = MicroBatcher(scorer.score, batch_window, max_batch_size)
+        self.httpd = _HTTPServer((host, port), _PredictionRequestHandler)
+        self.httpd.prediction_server = self
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://%s:%s' %(host, port)
+
+    def predict(self, subjects):
+        """Scores a list of subject dicts as part of the next micro-batch, blocking until it is done
+
+        Arguments:
+            subjects {list(dict)} -- column -> value of each subject
+
+        Returns:
+            list(dict) -- probabilities and diagnosis of each subject, with missing values as None
+        """
+        # Straight to the feature matrix; a DataFrame per request costs more than scoring it
+        results = self.batcher.submit(self.scorer.to_matrix(subjects)).result()
+
+        ids = [column for column in ID_COLUMNS if column in subjects[0]]
+        return [dict({column: subject.get(column) for column in ids},
+                     **{column: _json_value(value) for column, value in row.items()})
+                for subject, row in zip(subjects, results.to_dict(orient='records'))]
+
+    def serve_forever(self):
+        self._logger.info("Serving predictions on %s", self.url)
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+            self.batcher.close()
+
+    def start(self):
+        """Serves on a background thread, returning once the server is accepting requests"""
+        thread = threading.Thread(target=self.serve_forever, name='PredictionServer', daemon=True)
+        thread.start()
+        return self
+
+    def shutdown(self):
+        self.httpd.shutdown()
+
+class _HTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    # A thread per connection, as http.server.ThreadingHTTPServer (python 3.7+) does
+    daemon_threads = True
+    # The default backlog of 5 drops connections under concurrent load, which clients
+    # only retry after a one second SYN timeout
+    request_queue_size = 128
+
+class _PredictionRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    _logger = logging.getLogger(__name__)
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self._send(404, {'error': 'Not found'})
+        self._send(200, {'status': 'ok', 'model_key': self.server.prediction_server.scorer.model_key})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            return self._send(404, {'error': 'Not found'})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+            subjects = [body] if isinstance(body, dict) else body
+            if not isinstance(subjects, list) or not all(isinstance(s, dict) for s in subjects) or not subjects:
+                raise ValueError("Expected a subject object or a list of them")
+        except ValueError as error:
+            return self._send(400, {'error': str(error)})
+
+        try:
+            self._send(200, self.server.prediction_server.predict(subjects))
+        except (KeyError, TypeError, ValueError) as error:
+            self._send(400, {'error': str(error).strip('"')})
+        except Exception as error:
+            self._logger.exception("Failed to score request")
+            self._send(500, {'error': str(error)})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        self._logger.debug("%s - %s", self.address_string(), format %args)
+
+def _json_value(value):
+    # NaN isn't valid JSON
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, 'item'):
+        return _json_value(value.item())
+    return value
@@ -0,0 +1,51 @@
+"""Latency of in-process scoring with aidp.ml.scorer.Scorer, one subject at a time and in batches.
+
+        python benchmarks/scorer_latency.py tests/resources/test.xlsx [--model_key default]
+ """
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aidp.data.reader import get_reader
+from aidp.data.schema import get_schema
+from aidp.ml.scorer import Scorer
+
+def time_calls(function, arguments, repeat):
+    for argument in arguments[:10]:
+        function(argument)
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        function(arguments[i % len(arguments)])
+        times.append(time.perf_counter() - start)
+    return np.array(times)
+
+def main():
+    parser = argparse.ArgumentParser("scorer_latency")
+    parser.add_argument("input_file", help="Input file whose rows are scored")
+    parser.add_argument("--model_key", default="default")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    data = get_reader(args.input_file).read_data(args.input_file)
+    features = get_schema().to_matrix(data)
+    subjects = data[get_schema().features].to_dict(orient='records')
+
+    start = time.perf_counter()
+    scorer = Scorer(args.model_key)
+    print("startup:            %8.1f ms" %((time.perf_counter() - start) * 1000))
+
+    for name, arguments in [("dict subject", subjects), ("1-D array subject", list(features))]:
+        times = time_calls(scorer.score, arguments, args.repeat)
+        print("%-18s p50 %8.1f us   p99 %8.1f us" %(name + ":", np.percentile(times, 50) * 1e6, np.percentile(times, 99) * 1e6))
+
+    batch = np.repeat(features, max(1, 10000 // len(features)), axis=0)
+    times = time_calls(scorer.score, [batch], 20)
+    print("batch of %s:     %8.1f ms   (%.2f us per subject)" %(len(batch), np.median(times) * 1000, np.median(times) / len(batch) * 1e6))
+
+if __name__ == '__main__':
+    main()
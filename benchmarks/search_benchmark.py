@@ -0,0 +1,77 @@
+"""Wall time, selected C and scores of every search strategy for every model.
+
+        python benchmarks/search_benchmark.py tests/resources/test.xlsx [--n_jobs 1] [--searches grid path]
+
+    Every search tunes the models' own C grid on the same training split as
+    LinearSvcPredictor.  Besides its selected C, each strategy is scored by the grid
+    search's cross-validated score at that C (scored directly for C values off the
+    grid), so strategies that evaluate fewer C values can be compared by how much of
+    the grid's best score they give up, and by the holdout score of the model refitted.
+ """
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.base import clone
+from sklearn.model_selection import cross_val_score, train_test_split
+from aidp.data.modeldata import ModelData
+from aidp.data.reader import get_reader
+from aidp.data.experiments import FullDataExperiment, ImagingOnlyDataExperiment, ClinicalOnlyDataExperiment
+from aidp.ml.predictors import LinearSvcPredictor
+from aidp.ml.search import C_PARAMETER, SEARCHES, make_search, search_available
+
+def timed(search, X, y):
+    start = time.perf_counter()
+    search.fit(X, y)
+    return search, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser("search_benchmark")
+    parser.add_argument("input_file", help="Training data file")
+    parser.add_argument("--n_jobs", type=int, default=1)
+    parser.add_argument("--searches", nargs='+', choices=sorted(SEARCHES),
+                        default=[name for name in sorted(SEARCHES) if search_available(name)])
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+    # The grid search is the reference the other strategies' choices are scored against
+    searches = ['grid'] + [name for name in args.searches if name != 'grid']
+
+    model_data = ModelData(args.input_file, get_reader(args.input_file)).read_data()
+    totals, matches, lost = ({name: 0.0 for name in searches} for _ in range(3))
+    count = 0
+    print("%-9s %-15s %-8s %11s %9s %9s %9s" %("", "", "search", "C", "seconds", "grid cv", "holdout"))
+    for experiment in [FullDataExperiment(), ImagingOnlyDataExperiment(), ClinicalOnlyDataExperiment()]:
+        for job in experiment.training_jobs(model_data.data, model_data.features, model_data.group_index):
+            trainer = LinearSvcPredictor()
+            X_train, X_test, Y_train, Y_test = train_test_split(job.features, job.labels, test_size=trainer.test_size,
+                                                                random_state=trainer.random_seed)
+            grid_scores = None
+            for name in searches:
+                search, seconds = timed(make_search(name, trainer.classifier, trainer.param_grid, cv=trainer.cv,
+                                                    scoring=trainer.scoring, n_jobs=args.n_jobs,
+                                                    random_state=trainer.random_seed), X_train, Y_train)
+                if grid_scores is None:
+                    grid_c, grid_best = search.best_params_[C_PARAMETER], search.best_score_
+                    grid_scores = dict(zip(search.cv_results_['param_' + C_PARAMETER], search.cv_results_['mean_test_score']))
+                c_value = search.best_params_[C_PARAMETER]
+                cv_score = grid_scores.get(c_value)
+                if cv_score is None:
+                    cv_score = cross_val_score(clone(trainer.classifier).set_params(**{C_PARAMETER: c_value}), X_train, Y_train,
+                                               cv=trainer.cv, scoring=trainer.scoring, n_jobs=args.n_jobs).mean()
+                totals[name] += seconds
+                matches[name] += c_value == grid_c
+                lost[name] += grid_best - cv_score
+                print("%-9s %-15s %-8s %11.4g %9.2f %9.4f %9.4f" %(experiment.key, job.grouping_key, name, c_value,
+                                                                  seconds, cv_score, search.score(X_test, Y_test)))
+            count += 1
+
+    for name in searches:
+        print("%-8s %7.1fs (%.1fx faster than grid), same C for %s of %s models, mean grid cv score lost %.4f"
+              %(name, totals[name], totals['grid'] / totals[name], matches[name], count, lost[name] / count))
+
+if __name__ == '__main__':
+    main()
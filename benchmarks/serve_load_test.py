@@ -0,0 +1,67 @@
+"""Load test for `aidp serve`: many concurrent single-subject requests, reporting latency and throughput.
+
+    Start the server first, e.g. `python main.py serve --fused`, then run:
+
+        python benchmarks/serve_load_test.py tests/resources/test.xlsx --clients 16 --seconds 10
+ """
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aidp.data.reader import get_reader
+from aidp.runners.client import PredictionClient
+
+def run(client, subjects, n_clients, seconds):
+    latencies = [[] for _ in range(n_clients)]
+    errors = []
+    deadline = time.perf_counter() + seconds
+
+    def send(worker):
+        i = worker
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                client.predict(subjects[i % len(subjects)])
+            except Exception as error:
+                errors.append(error)
+                continue
+            latencies[worker].append(time.perf_counter() - start)
+            i += n_clients
+
+    threads = [threading.Thread(target=send, args=(worker,)) for worker in range(n_clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.concatenate([np.array(l) for l in latencies]), time.perf_counter() - start, errors
+
+def main():
+    parser = argparse.ArgumentParser("serve_load_test")
+    parser.add_argument("input_file", help="Input file whose rows are sent as single-subject requests")
+    parser.add_argument("--url", default="http://127.0.0.1:8585")
+    parser.add_argument("--clients", type=int, default=16, help="Number of concurrent clients")
+    parser.add_argument("--seconds", type=float, default=10, help="Length of the test")
+    args = parser.parse_args()
+
+    data = get_reader(args.input_file).read_data(args.input_file)
+    subjects = json.loads(data.to_json(orient='records'))
+    client = PredictionClient(args.url)
+    client.health()
+
+    latencies, elapsed, errors = run(client, subjects, args.clients, args.seconds)
+    print("clients:     %s" %args.clients)
+    print("requests:    %s (%s errors)" %(len(latencies), len(errors)))
+    print("throughput:  %.1f requests/s" %(len(latencies) / elapsed))
+    if len(latencies):
+        print("latency p50: %.2f ms" %(np.percentile(latencies, 50) * 1000))
+        print("latency p99: %.2f ms" %(np.percentile(latencies, 99) * 1000))
+
+if __name__ == '__main__':
+    main()
@@ -5,11 +5,22 @@ import argparse
 from datetime import datetime
 
 from aidp.data.modeldata import ModelData
-from aidp.data.reader import ExcelDataReader
+from aidp.data.reader import get_reader
+from aidp.data.cache import DataFileCache
 from aidp.runners.engines import getEngine
+from aidp.ml.diagnosis import DIAGNOSIS_RULES
+from aidp.runners.batch import BatchPredictionRunner, expand_input_files, is_batch_input
+from aidp.runners.server import PredictionServer, DEFAULT_PORT
+from aidp.runners.scheduler import TrainingScheduler
+from aidp.ml.scorer import Scorer
 from fpdf import FPDF
 import datetime
 
+# The names of aidp.ml.search.SEARCHES and aidp.ml.calibration.CALIBRATION_METHODS.  Those modules
+# import sklearn, which predict, serve and export must not load, so only train imports them
+SEARCH_CHOICES = ['grid', 'halving', 'path', 'smbo']
+CALIBRATION_CHOICES = ['svc', 'sigmoid', 'isotonic']
+
 def main():
     """ Parses the command line arguments and determines what to do """
     # Parse arguments
@@ -20,12 +31,72 @@ def main():
     logger = logging.getLogger(__name__)
     logger.info("Starting AIDP Application")
 
-    # Read in csv input file
-    model_data = ModelData(args.input_file, ExcelDataReader()).read_data()
-    logger.debug(model_data.data.describe())
+    if args.cmd == 'export':
+        # Write compact .npz copies of already trained models, so predictions don't need sklearn
+        for experiment in getEngine('predict', None).experiments:
+            experiment.export_models(args.model_key)
+        logger.info("Ending AIDP Application")
+        return
+
+    if args.cmd == 'serve':
+        # Keep the models warm and score subjects sent over HTTP until interrupted
+        server = PredictionServer(Scorer(args.model_key, args.diagnosis_versions), host=args.host, port=args.port,
+                                  batch_window=args.batch_window_ms / 1000, max_batch_size=args.max_batch_size)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        logger.info("Ending AIDP Application")
+        return
+
+    cache = None if args.no_cache else DataFileCache()
+
+    if args.cmd == 'predict' and is_batch_input(args.input_file):
+        # Score every file in the directory/glob with models loaded once per worker
+        runner = BatchPredictionRunner(args.model_key, n_jobs=args.jobs, cache=cache,
+                                       required_columns_only=args.required_columns_only,
+                                       output_format=args.output_format, diagnosis_versions=args.diagnosis_versions,
+                                       fused=args.fused, output_columns=[] if args.only_diagnosis else args.columns)
+        runner.run(expand_input_files(args.input_file), merged_output=args.merge_output)
+        logger.info("Ending AIDP Application")
+        return
+
+    output_format = args.output_format if args.cmd == 'predict' else 'xlsx'
+    model_data = ModelData(args.input_file, get_reader(args.input_file, cache=cache), output_format=output_format)
 
     # Get prediction/training engine
     engine = getEngine(args.cmd, model_data)
+    if args.cmd == 'predict':
+        engine.diagnosis_versions = args.diagnosis_versions
+        engine.fused = args.fused
+        engine.output_columns = [] if args.only_diagnosis else args.columns
+        # Load the models up front, in parallel, rather than one by one as they are used
+        engine.load_models(args.model_key)
+    if args.cmd == 'train':
+        from aidp.ml.trainingcache import TrainingCache
+
+        engine.training_settings = {'search': args.search, 'calibration': args.calibration,
+                                    'cache_transformers': args.cache_transformers}
+        engine.precompute_gram = args.gram
+        engine.bootstrap = args.bootstrap
+        engine.nested_cv = args.nested_cv
+        # Models whose data, settings and code haven't changed since they were last trained are reused
+        engine.training_cache = TrainingCache(force=args.force)
+    if args.cmd == 'train' and args.cores != 1:
+        # Train the models of every experiment and grouping in parallel within the core budget
+        engine.scheduler = TrainingScheduler(args.cores, n_workers=args.workers)
+
+    if args.cmd == 'predict' and args.chunksize:
+        # Stream the input through the models without reading it all in
+        engine.start_streaming(model_key=args.model_key, chunksize=args.chunksize,
+                               required_columns_only=args.required_columns_only)
+        logger.info("Ending AIDP Application")
+        return
+
+    # Read in every column, or only the ones the engine needs
+    model_data.read_data(columns=engine.required_columns() if args.required_columns_only else None)
+    logger.debug(model_data.data.describe())
+
     engine.start(model_key=args.model_key)
     #engine.generate_report() # a bar graph with all the probablity 
     #engine.donut_chart('both_park_v_control (PD/MSA/PSP Probability)', 'PD · MSA · PSP', 'Control', 'Match')
@@ -33,6 +104,7 @@ def main():
     #engine.donut_chart('dmri_psp_v_msa (PSP Probability)','MSA', 'PSP','unmatch')
     #engine.donut_chart('dmri_psp_v_pd_msa (PSP Probability)','PSP', 'PD · MSA','Match')
     engine.generate_diagnosis()
+    engine.write_output()
     #engine.bar_chart()
     #engine.pdf_report()
     #engine.send_report('0')
@@ -70,23 +142,125 @@ def parse_arguments():
 
     parser_predict = subparser.add_parser("predict")
     parser_predict.add_argument(
-        "input_file", help="Input excel file with data you'd like to get predictions for")
+        "input_file", help="""Input excel, csv or parquet file with data you'd like to get predictions for.
+    A directory or glob pattern (e.g. 'site_*.xlsx') scores every matching file in one run""")
     parser_predict.add_argument("-v", "--verbose", help="increase output verbosity",
                         action="store_true")
     parser_predict.add_argument("--model_key", help="""(Optional) Name of the models to use for predictions.
     These models should exist in their own folder in /resources/models/<model_key>.  If no model is
      provided 'default' is used""", default='default')
+    parser_predict.add_argument("--no_cache", help="""(Optional) Always parse the input file instead of
+    reusing a cached copy from /cache""", action="store_true")
+    parser_predict.add_argument("--chunksize", help="""(Optional) Score the input this many rows at a time,
+    appending results to <input>_out.csv as each chunk finishes.  Keeps memory bounded for very large
+    csv/parquet inputs.  Only the csv output format can be written this way""", type=int, default=None)
+    parser_predict.add_argument("--required_columns_only", help="""(Optional) Only read the Subject column and the
+    columns the models use from the input file, and copy only those to the output, instead of every input column.
+    Faster for wide inputs""", action="store_true")
+    parser_predict.add_argument("--jobs", help="""(Optional) Number of worker processes used when scoring
+    a directory or glob of input files.  Defaults to one per cpu""", type=int, default=None)
+    parser_predict.add_argument("--merge_output", help="""(Optional) When scoring a directory or glob of
+    input files, write all results to this one file (.xlsx, .csv or .parquet) instead of one output per input""", default=None)
+    parser_predict.add_argument("--output_format", help="""(Optional) Format of the <input>_out file: xlsx
+    (default, csv with --chunksize), or the faster csv or parquet""", choices=['xlsx', 'csv', 'parquet'], default=None)
+    parser_predict.add_argument("--diagnosis_versions", help="""(Optional) Diagnosis algorithm versions to
+    run (see aidp/ml/diagnosis.py).  The first fills Predicted_diagnosis and each other version adds a
+    Predicted_diagnosis_v<version> column""", nargs='+', type=int, choices=sorted(DIAGNOSIS_RULES), default=[1])
+    parser_predict.add_argument("--fused", help="""(Optional) Score all 18 models with a single matrix multiply
+    over the input instead of one pass per model""", action="store_true")
+    model_selection = parser_predict.add_mutually_exclusive_group()
+    model_selection.add_argument("--columns", help="""(Optional) Only run the models for these
+    <experiment>_<grouping> probability columns (e.g. dmri_psp_v_msa), plus the ones the diagnosis needs""",
+    nargs='+', default=None)
+    model_selection.add_argument("--only_diagnosis", help="""(Optional) Only run the models the diagnosis needs
+    (4 of the 18 for the default diagnosis version)""", action="store_true")
 
     parser_train = subparser.add_parser("train")
     parser_train.add_argument(
-        "input_file", help="Input excel file with data you'd like to train the models on")
+        "input_file", help="Input excel, csv or parquet file with data you'd like to train the models on")
     parser_train.add_argument("-v", "--verbose", help="increase output verbosity",
                         action="store_true")
     parser_train.add_argument("--model_key", help="""(Optional) Name of the folder where the newly 
     trained will be stored (in /resources/models/<model_key>).  If no name is provided, a timestamp
     is used""", default=datetime.datetime.now().strftime("%Y-%m-%d-%H%M%S%f"))
+    parser_train.add_argument("--no_cache", help="""(Optional) Always parse the input file instead of
+    reusing a cached copy from /cache""", action="store_true")
+    parser_train.add_argument("--required_columns_only", help="""(Optional) Only read the columns the models use
+    from the input file, instead of every column""", action="store_true")
+    parser_train.add_argument("--cores", help="""(Optional) Number of cores to train with, split between
+    models trained in parallel and the cross validation of each model.  Defaults to one per cpu; 1 trains
+    the models one at a time""", type=int, default=None)
+    parser_train.add_argument("--workers", help="""(Optional) Number of models to train in parallel, the
+    rest of the core budget going to each model's cross validation.  Defaults to as many as the cores allow""",
+    type=int, default=None)
+    parser_train.add_argument("--search", help="""(Optional) How each model's C is tuned: 'grid' refits
+    the full pipeline for every C, 'path' skips the probability fits until the selected C and selects the
+    same C in less time, 'halving' scores every C on a subsample and only the best on more samples (needs
+    scikit-learn 0.24 or later), and 'smbo' fits a Gaussian process to the scores to choose which of fewer
+    C values to try.  Defaults to 'grid', or 'path' with --gram""", choices=SEARCH_CHOICES, default=None)
+    parser_train.add_argument("--calibration", help="""(Optional) How each model's probabilities are
+    calibrated: 'svc' uses the SVC's internal Platt scaling, refitted for every C the search tries; 'sigmoid'
+    and 'isotonic' search without probabilities and calibrate the selected model once on out-of-fold
+    decision values.  Defaults to 'svc'""", choices=CALIBRATION_CHOICES, default='svc')
+    parser_train.add_argument("--gram", help="""(Optional) Compute each model's linear kernel matrix of its
+    training rows once and tune its C over slices of it with the path search.  Implies --search path, and
+    can't be combined with another search.  Falls back to fitting on the features when the matrix wouldn't
+    fit in memory""", action="store_true")
+    parser_train.add_argument("--cache_transformers", help="""(Optional) Cache the pipeline's fitted
+    preprocessing steps per fold during the grid search, in a temporary directory removed afterwards, instead
+    of refitting them for every C.  Worth it for expensive preprocessing; the scaler alone is cheaper to
+    refit than to look up""", action="store_true")
+    parser_train.add_argument("--bootstrap", help="""(Optional) Number of bootstrap resamples of each model's
+    training and validation predictions, e.g. 10000, to write 95%% percentile confidence intervals of every
+    metric to a Training_Performance_CI CSV next to the Training_Performance one.  Defaults to 0, none""",
+    type=int, default=0)
+    parser_train.add_argument("--nested_cv", help="""(Optional) Number of outer folds of nested cross validation.
+    Instead of training the models, each grouping is split into stratified outer folds, C is tuned inside each
+    fold's training rows and the fold is scored, in parallel within --cores.  The fold metrics are averaged into
+    a Nested_CV_Performance CSV.  Every finished fold is checkpointed under checkpoints/<model_key>, so running
+    again with the same --model_key resumes an interrupted run.  Defaults to 0, a single holdout""",
+    type=int, default=0)
+    parser_train.add_argument("--force", help="""(Optional) Refit every model instead of reusing the cached
+    models, in /cache/training, of experiments and groupings whose data, settings and code haven't changed""",
+    action="store_true")
+
+    parser_serve = subparser.add_parser("serve")
+    parser_serve.add_argument("-v", "--verbose", help="increase output verbosity",
+                        action="store_true")
+    parser_serve.add_argument("--model_key", help="""(Optional) Name of the models to serve predictions from.
+    If no model is provided 'default' is used""", default='default')
+    parser_serve.add_argument("--host", help="""(Optional) Address to listen on.  Defaults to localhost only""",
+                        default='127.0.0.1')
+    parser_serve.add_argument("--port", help="(Optional) Port to listen on", type=int, default=DEFAULT_PORT)
+    parser_serve.add_argument("--batch_window_ms", help="""(Optional) Milliseconds to wait for more requests
+    to score together with the first waiting one""", type=float, default=5)
+    parser_serve.add_argument("--max_batch_size", help="""(Optional) Maximum number of subjects scored
+    together""", type=int, default=256)
+    parser_serve.add_argument("--diagnosis_versions", help="""(Optional) Diagnosis algorithm versions to
+    run""", nargs='+', type=int, choices=sorted(DIAGNOSIS_RULES), default=[1])
+
+    parser_export = subparser.add_parser("export")
+    parser_export.add_argument("-v", "--verbose", help="increase output verbosity",
+                        action="store_true")
+    parser_export.add_argument("--model_key", help="""(Optional) Name of the models in /resources/models/<model_key>
+    to write compact .npz artifacts for.  If no name is provided, 'default' is used""", default='default')
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.cmd == 'train':
+        if args.gram and args.search not in (None, 'path'):
+            parser.error("--gram tunes C with the path search; it can't be combined with --search %s" %args.search)
+        if args.search is None:
+            args.search = 'path' if args.gram else 'grid'
+        from aidp.ml.search import SEARCH_REQUIREMENTS, search_available
+        if not search_available(args.search):
+            parser.error("--search %s needs %s" %(args.search, SEARCH_REQUIREMENTS[args.search]))
+    if args.cmd == 'predict':
+        if args.chunksize and args.output_format not in (None, 'csv'):
+            parser.error("--chunksize appends each chunk to a csv output file; --output_format %s can't be appended to"
+                         %args.output_format)
+        if args.output_format is None:
+            args.output_format = 'csv' if args.chunksize else 'xlsx'
+    return args
 
 if __name__ == '__main__':
     main()
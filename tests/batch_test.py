@@ -0,0 +1,82 @@
+"""Tests for the aidp.runners.batch module"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from aidp.runners.batch import BatchPredictionRunner, expand_input_files, is_batch_input
+
+class FakePredictionEngine:
+    def __init__(self, model_data):
+        self.model_data = model_data
+        self.experiments = []
+
+    def required_columns(self):
+        return None
+
+    def load_models(self, model_key):
+        pass
+
+    def start(self, model_key='default'):
+        self.model_data.data['p'] = 0.9
+
+    def generate_diagnosis(self):
+        self.model_data.data['Predicted_diagnosis'] = 'PD'
+
+    def write_output(self):
+        self.model_data.write_output_file()
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        for name in ['site_a.csv', 'site_b.csv', 'site_a_out.csv', 'notes.txt']:
+            pd.DataFrame({'Subject': [name, name + '2']}).to_csv(os.path.join(self.tmp_dir, name), index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test__is_batch_input__directory_or_glob(self):
+        assert is_batch_input(self.tmp_dir)
+        assert is_batch_input(os.path.join(self.tmp_dir, '*.csv'))
+        assert not is_batch_input(os.path.join(self.tmp_dir, 'site_a.csv'))
+
+    def test__expand_input_files__directory__skips_outputs_and_other_files(self):
+        files = expand_input_files(self.tmp_dir)
+
+        assert [os.path.basename(f) for f in files] == ['site_a.csv', 'site_b.csv']
+
+    def test__expand_input_files__glob(self):
+        files = expand_input_files(os.path.join(self.tmp_dir, '*_b.csv'))
+
+        assert [os.path.basename(f) for f in files] == ['site_b.csv']
+
+    @patch('aidp.runners.batch.PredictionEngine', FakePredictionEngine)
+    def test__run__merged_output__one_file_with_all_rows(self):
+        merged = os.path.join(self.tmp_dir, 'merged.csv')
+
+        summary = BatchPredictionRunner(n_jobs=1).run(expand_input_files(self.tmp_dir), merged_output=merged)
+
+        output = pd.read_csv(merged, index_col=0)
+        assert [row['status'] for row in summary] == ['ok', 'ok']
+        assert len(output.index) == 4
+        assert list(output.columns) == ['Source_file', 'Subject', 'p', 'Predicted_diagnosis']
+
+    @patch('aidp.runners.batch.PredictionEngine', FakePredictionEngine)
+    def test__run__merged_output__input_source_file_column_replaced(self):
+        merged = os.path.join(self.tmp_dir, 'merged.csv')
+        input_file = os.path.join(self.tmp_dir, 'site_c.csv')
+        pd.DataFrame({'Source_file': ['old.csv'], 'Subject': ['c']}).to_csv(input_file, index=False)
+
+        summary = BatchPredictionRunner(n_jobs=1).run([input_file], merged_output=merged)
+
+        output = pd.read_csv(merged, index_col=0)
+        assert summary[0]['status'] == 'ok'
+        assert list(output.columns) == ['Source_file', 'Subject', 'p', 'Predicted_diagnosis']
+        assert list(output['Source_file']) == ['site_c.csv']
+
+    @patch('aidp.runners.batch.PredictionEngine', FakePredictionEngine)
+    def test__run__unreadable_file__reported_as_failed(self):
+        summary = BatchPredictionRunner(n_jobs=1).run([os.path.join(self.tmp_dir, 'missing.csv')], merged_output=os.devnull)
+
+        assert summary[0]['status'].startswith('failed')
@@ -0,0 +1,78 @@
+"""Tests for the aidp.data.cache module"""
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from aidp.data.cache import DataFileCache, evict_lru
+from aidp.data.reader import ExcelDataReader
+
+class TestDataFileCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.source = os.path.join(self.tmp_dir, 'data.csv')
+        pd.DataFrame([{'A':1, 'B':2.5}, {'A':3, 'B':4.5}]).to_csv(self.source, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test__load__nothing_stored__returns_none(self):
+        cache = DataFileCache(self.cache_dir)
+
+        assert cache.load(self.source) is None
+
+    def test__load__after_store__returns_same_data(self):
+        cache = DataFileCache(self.cache_dir)
+        data = pd.read_csv(self.source)
+
+        cache.store(self.source, data)
+
+        pd.testing.assert_frame_equal(cache.load(self.source), data)
+
+    def test__load__source_changed__miss_and_stale_entry_evicted(self):
+        cache = DataFileCache(self.cache_dir)
+        cache.store(self.source, pd.read_csv(self.source))
+        with open(self.source, 'a') as f:
+            f.write('5,6.5\n')
+
+        assert cache.load(self.source) is None
+        assert os.listdir(self.cache_dir) == []
+
+    def test__load__mixed_type_column__same_data(self):
+        cache = DataFileCache(self.cache_dir)
+        data = pd.DataFrame({'Subject': [1001, 'Albany_2attempt'], 'B': [2.5, 4.5]})
+
+        cache.store(self.source, data)
+
+        pd.testing.assert_frame_equal(cache.load(self.source), data)
+        assert list(cache.load(self.source)['Subject']) == [1001, 'Albany_2attempt']
+
+    def test__load__different_variant__returns_none(self):
+        cache = DataFileCache(self.cache_dir)
+        cache.store(self.source, pd.read_csv(self.source), variant='A')
+
+        assert cache.load(self.source, variant='B') is None
+
+    def test__evict_lru__over_budget__keeps_newest(self):
+        for i, name in enumerate(['old', 'new']):
+            path = os.path.join(self.tmp_dir, name + '.bin')
+            with open(path, 'wb') as f:
+                f.write(b'0' * 100)
+            os.utime(path, (i, i))
+
+        evict_lru(self.tmp_dir, 150, '*.bin')
+
+        assert sorted(os.listdir(self.tmp_dir)) == ['data.csv', 'new.bin']
+
+    def test__ExcelDataReader__with_cache__second_read_uses_cache(self):
+        source = os.path.join(self.tmp_dir, 'test.xlsx')
+        shutil.copy('./tests/resources/test.xlsx', source)
+        reader = ExcelDataReader(cache=DataFileCache(self.cache_dir))
+
+        first = reader.read_data(source)
+        with self.assertLogs('aidp.data.cache', level='INFO') as logs:
+            second = reader.read_data(source)
+
+        assert any('Cache hit' in line for line in logs.output)
+        pd.testing.assert_frame_equal(first, second)
@@ -0,0 +1,58 @@
+"""Tests for the aidp.ml.caching module"""
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.model_selection import GridSearchCV
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+from imblearn.pipeline import Pipeline
+from aidp.ml.caching import BoundedMemory, clear_memory, transformer_cache
+
+class TestTransformerCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.X, self.y = make_classification(n_samples=100, n_features=5, random_state=0)
+        self.pipeline = Pipeline([('Scaler', StandardScaler()), ('classifier', SVC(kernel='linear'))])
+        self.param_grid = {'classifier__C': [0.01, 0.1, 1.0]}
+
+    def test__transformer_cache__same_search_results_and_directory_removed(self):
+        expected = GridSearchCV(self.pipeline, self.param_grid, cv=3).fit(self.X, self.y)
+
+        with transformer_cache(self.pipeline) as pipeline:
+            location = pipeline.memory.location
+            search = GridSearchCV(pipeline, self.param_grid, cv=3).fit(self.X, self.y)
+            assert os.listdir(location)
+
+        assert not os.path.exists(location)
+        assert self.pipeline.memory is None
+        np.testing.assert_allclose(search.cv_results_['mean_test_score'], expected.cv_results_['mean_test_score'])
+
+    def test__clear_memory__search__detaches_every_pipeline(self):
+        with transformer_cache(self.pipeline) as pipeline:
+            search = GridSearchCV(pipeline, self.param_grid, cv=3).fit(self.X, self.y)
+
+        clear_memory(search)
+
+        assert search.best_estimator_.memory is None and search.estimator.memory is None
+        pickle.loads(pickle.dumps(search))
+
+    def test__BoundedMemory__over_budget__keeps_cache_under_it(self):
+        with transformer_cache(self.pipeline, max_bytes=0) as pipeline:
+            GridSearchCV(pipeline, self.param_grid, cv=3).fit(self.X, self.y)
+            sizes = [os.path.getsize(os.path.join(root, name))
+                     for root, _, names in os.walk(pipeline.memory.location) for name in names if name == 'output.pkl']
+
+        assert sizes == []
+
+    def test__BoundedMemory__pickles_with_budget(self):
+        directory = tempfile.mkdtemp()
+        try:
+            memory = pickle.loads(pickle.dumps(BoundedMemory(directory, max_bytes=10)))
+        finally:
+            shutil.rmtree(directory)
+
+        assert memory.max_bytes == 10
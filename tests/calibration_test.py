@@ -0,0 +1,60 @@
+"""Tests for the aidp.ml.calibration module"""
+import unittest
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+from imblearn.pipeline import Pipeline
+from aidp.ml.calibration import CalibratedClassifier, DecisionCalibrator
+
+class TestDecisionCalibrator(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        rng = np.random.RandomState(0)
+        self.decision = rng.normal(size=400)
+        self.positive = self.decision + rng.normal(size=400) > 0.3
+
+    def test__sigmoid__probability_increases_with_decision(self):
+        calibrator = DecisionCalibrator('sigmoid').fit(self.decision, self.positive)
+
+        probabilities = calibrator.transform(np.linspace(-3, 3, 7))
+
+        assert calibrator.a < 0
+        assert np.all(np.diff(probabilities) > 0)
+
+    def test__sigmoid__matches_positive_rate(self):
+        calibrator = DecisionCalibrator('sigmoid').fit(self.decision, self.positive)
+
+        assert abs(calibrator.transform(self.decision).mean() - self.positive.mean()) < 0.01
+
+    def test__isotonic__monotonic_probabilities(self):
+        calibrator = DecisionCalibrator('isotonic').fit(self.decision, self.positive)
+
+        probabilities = calibrator.transform(np.linspace(-5, 5, 50))
+
+        assert np.all(np.diff(probabilities) >= 0)
+        assert probabilities.min() >= 0 and probabilities.max() <= 1
+
+    def test__unknown_method__throws_error(self):
+        with self.assertRaises(ValueError):
+            DecisionCalibrator('beta')
+
+class TestCalibratedClassifier(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.X, self.y = make_classification(n_samples=200, n_features=6, flip_y=0.1, random_state=0)
+        self.pipeline = Pipeline([
+            ('Scaler', StandardScaler()),
+            ('classifier', SVC(kernel='linear', class_weight='balanced'))
+        ]).fit(self.X, self.y)
+
+    def test__fit_out_of_fold__same_classes_calibrated_probabilities(self):
+        for method in ['sigmoid', 'isotonic']:
+            calibrated = CalibratedClassifier.fit_out_of_fold(self.pipeline, self.X, self.y, method)
+
+            probabilities = calibrated.predict_proba(self.X)
+
+            np.testing.assert_array_equal(calibrated.predict(self.X), self.pipeline.predict(self.X))
+            np.testing.assert_allclose(probabilities.sum(axis=1), 1)
+            assert probabilities.shape == (len(self.X), 2)
+            assert calibrated.calibrator.method == method
@@ -0,0 +1,111 @@
+"""Tests for the aidp.ml.compact module"""
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+from imblearn.pipeline import Pipeline
+from aidp.ml.calibration import CalibratedClassifier
+from aidp.ml.compact import CompactLinearModel, FusedLinearScorer
+
+class TestCompactLinearModel(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.X, self.y = make_classification(n_samples=200, n_features=8, random_state=0)
+        self.X[:, 0] = self.X[:, 0] * 100 + 50
+        self.pipeline = Pipeline([
+            ('Scaler', StandardScaler()),
+            ('classifier', SVC(kernel='linear', class_weight='balanced', probability=True, random_state=0))
+        ]).fit(self.X, self.y)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test__predict_proba__same_as_pipeline(self):
+        compact = CompactLinearModel.from_pipeline(self.pipeline)
+
+        assert np.allclose(compact.predict_proba(self.X), self.pipeline.predict_proba(self.X), atol=1e-10)
+        assert np.allclose(compact.decision_function(self.X), self.pipeline.decision_function(self.X))
+
+    def test__load__after_save__same_predictions(self):
+        filepath = os.path.join(self.tmp_dir, 'model.npz')
+        names = ['f%s' %i for i in range(8)]
+
+        CompactLinearModel.from_pipeline(self.pipeline, names).save(filepath)
+        compact = CompactLinearModel.load(filepath)
+
+        assert compact.feature_names == names
+        assert np.allclose(compact.make_predictions(self.X), self.pipeline.predict_proba(self.X)[:, 1], atol=1e-10)
+
+    def test__make_predictions__missing_value__nan(self):
+        X = self.X[:3].copy()
+        X[1, 2] = np.nan
+
+        predictions = CompactLinearModel.from_pipeline(self.pipeline).make_predictions(X)
+
+        assert np.isnan(predictions[1])
+        assert not np.isnan(predictions[[0, 2]]).any()
+
+    def test__from_pipeline__calibrated__same_predictions_after_load(self):
+        pipeline = Pipeline([('Scaler', StandardScaler()), ('classifier', SVC(kernel='linear'))]).fit(self.X, self.y)
+        for method in ['sigmoid', 'isotonic']:
+            calibrated = CalibratedClassifier.fit_out_of_fold(pipeline, self.X, self.y, method)
+            filepath = os.path.join(self.tmp_dir, method + '.npz')
+
+            CompactLinearModel.from_pipeline(calibrated).save(filepath)
+            compact = CompactLinearModel.load(filepath)
+
+            assert compact.calibration == method
+            assert np.allclose(compact.predict_proba(self.X), calibrated.predict_proba(self.X), atol=1e-10)
+
+    def test__from_pipeline__non_linear_kernel__throws_error(self):
+        pipeline = Pipeline([('Scaler', StandardScaler()), ('classifier', SVC(probability=True))]).fit(self.X, self.X[:, 1] > 0)
+
+        with self.assertRaises(ValueError):
+            CompactLinearModel.from_pipeline(pipeline)
+
+class TestFusedLinearScorer(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.X, y = make_classification(n_samples=200, n_features=6, random_state=1)
+        self.columns = ['a', 'b', 'c', 'd', 'e', 'f']
+        self.models = []
+        for key, features in [('first', [0, 1, 2]), ('second', [5, 3]), ('all', list(range(6)))]:
+            pipeline = Pipeline([
+                ('Scaler', StandardScaler()),
+                ('classifier', SVC(kernel='linear', probability=True, random_state=0))
+            ]).fit(self.X[:, features], y)
+            self.models.append((key, features, CompactLinearModel.from_pipeline(pipeline, [self.columns[i] for i in features])))
+        for method, features in [('sigmoid', [1, 4]), ('isotonic', [0, 2, 5])]:
+            pipeline = Pipeline([('Scaler', StandardScaler()), ('classifier', SVC(kernel='linear'))]).fit(self.X[:, features], y)
+            calibrated = CalibratedClassifier.fit_out_of_fold(pipeline, self.X[:, features], y, method)
+            self.models.append((method, features, CompactLinearModel.from_pipeline(calibrated, [self.columns[i] for i in features])))
+
+    def test__predict_proba__same_as_each_model(self):
+        scorer = FusedLinearScorer([(key, model) for key, _, model in self.models], self.columns)
+
+        predictions = scorer.predict_proba(self.X)
+
+        assert scorer.keys == ['first', 'second', 'all', 'sigmoid', 'isotonic']
+        for i, (_, features, model) in enumerate(self.models):
+            assert np.allclose(predictions[:, i], model.make_predictions(self.X[:, features]), atol=1e-12)
+
+    def test__predict_proba__missing_value__only_models_using_the_column_nan(self):
+        scorer = FusedLinearScorer([(key, model) for key, _, model in self.models], self.columns)
+        X = self.X[:2].copy()
+        X[0, 4] = np.nan
+
+        predictions = scorer.predict_proba(X)
+
+        assert list(np.isnan(predictions[0])) == [False, False, True, True, False]
+        assert not np.isnan(predictions[1]).any()
+
+    def test__FusedLinearScorer__unknown_feature__throws_error(self):
+        with self.assertRaises(ValueError):
+            FusedLinearScorer([(key, model) for key, _, model in self.models], ['a', 'b'])
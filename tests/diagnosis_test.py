@@ -0,0 +1,98 @@
+"""Tests for the aidp.ml.diagnosis module"""
+import unittest
+import numpy as np
+import pandas as pd
+from aidp.ml.diagnosis import diagnose, DiagnosisRules, probability_column
+
+PARK_V_CONTROL = 'both_park_v_control (PD/MSA/PSP Probability)'
+MSA_PSP_V_PD = 'dmri_msa_psp_v_pd (MSA/PSP Probability)'
+PSP_V_MSA = 'dmri_psp_v_msa (PSP Probability)'
+PSP_V_PD_MSA = 'dmri_psp_v_pd_msa (PSP Probability)'
+PD_V_MSA = 'dmri_pd_v_msa (PD Probability)'
+
+class TestDiagnosis(unittest.TestCase):
+    def test__diagnose__version_1__same_labels_as_per_subject_algorithm(self):
+        """ Matches the original if/elif chain, including the rows with missing probabilities """
+        data = get_probabilities(2000)
+
+        expected = [diagnose_subject_v1(row) for _, row in data.iterrows()]
+
+        assert list(diagnose(data)['Predicted_diagnosis']) == expected
+
+    def test__diagnose__version_2__same_labels_as_per_subject_algorithm(self):
+        data = get_probabilities(2000)
+
+        expected = [diagnose_subject_v2(row) for _, row in data.iterrows()]
+
+        assert list(diagnose(data, [2])['Predicted_diagnosis']) == expected
+
+    def test__diagnose__rules_in_order(self):
+        data = pd.DataFrame([
+            {PARK_V_CONTROL: 0.2, MSA_PSP_V_PD: 0.9, PSP_V_MSA: 0.9, PSP_V_PD_MSA: 0.9},
+            {PARK_V_CONTROL: 0.8, MSA_PSP_V_PD: 0.1, PSP_V_MSA: 0.1, PSP_V_PD_MSA: 0.9},
+            {PARK_V_CONTROL: 0.8, MSA_PSP_V_PD: 0.9, PSP_V_MSA: 0.1, PSP_V_PD_MSA: 0.1},
+            {PARK_V_CONTROL: 0.8, MSA_PSP_V_PD: 0.9, PSP_V_MSA: 0.9, PSP_V_PD_MSA: 0.1},
+            {PARK_V_CONTROL: 0.8, MSA_PSP_V_PD: 0.1, PSP_V_MSA: 0.9, PSP_V_PD_MSA: 0.1},
+            {PARK_V_CONTROL: np.nan, MSA_PSP_V_PD: 0.1, PSP_V_MSA: 0.1, PSP_V_PD_MSA: 0.1},
+        ])
+
+        assert list(diagnose(data)['Predicted_diagnosis']) == ['Not Parkinsonism', 'PD', 'MSA', 'PSP', 'PSP', 'Unknown']
+
+    def test__evaluate__several_versions__one_column_per_version(self):
+        data = get_probabilities(50)
+
+        results = DiagnosisRules([2, 1]).evaluate(data)
+
+        assert list(results.columns) == ['Predicted_diagnosis', 'Predicted_diagnosis_v1']
+        assert list(results['Predicted_diagnosis_v1']) == list(diagnose(data, [1])['Predicted_diagnosis'])
+
+    def test__columns__only_columns_the_rules_read(self):
+        assert DiagnosisRules([1]).columns == ['both_park_v_control', 'dmri_msa_psp_v_pd', 'dmri_psp_v_msa', 'dmri_psp_v_pd_msa']
+        assert 'dmri_pd_v_msa' in DiagnosisRules([1, 2]).columns
+
+    def test__DiagnosisRules__unknown_version__throws_error(self):
+        with self.assertRaises(ValueError):
+            DiagnosisRules([99])
+
+    def test__probability_column__missing__throws_error(self):
+        assert probability_column([PSP_V_MSA, PSP_V_PD_MSA], 'dmri_psp_v_pd_msa') == PSP_V_PD_MSA
+        with self.assertRaises(KeyError):
+            probability_column([PSP_V_MSA], 'dmri_psp_v_pd_msa')
+
+
+def get_probabilities(n):
+    rng = np.random.RandomState(0)
+    columns = [PARK_V_CONTROL, MSA_PSP_V_PD, PSP_V_MSA, PSP_V_PD_MSA, PD_V_MSA]
+    data = pd.DataFrame(rng.uniform(size=(n, len(columns))), columns=columns)
+    data = data.mask(rng.uniform(size=data.shape) < 0.05)
+    return data
+
+def diagnose_subject_v1(row):
+    """ Diagnosis Algorithm Version 1 as originally written, one subject at a time """
+    if row[PARK_V_CONTROL] < 0.5 :
+        return 'Not Parkinsonism'
+    elif row[PARK_V_CONTROL] >= 0.5 and row[MSA_PSP_V_PD] < 0.5 and row[PSP_V_MSA] < 0.5 :
+        return 'PD'
+    elif row[PARK_V_CONTROL] >= 0.5 and row[MSA_PSP_V_PD] >= 0.5 and row[PSP_V_MSA] < 0.5 :
+        return 'MSA'
+    elif row[PARK_V_CONTROL] >= 0.5 and row[MSA_PSP_V_PD] >= 0.5 and row[PSP_V_MSA] >= 0.5 :
+        return 'PSP'
+    elif row[PARK_V_CONTROL] >= 0.5 and row[MSA_PSP_V_PD] < 0.5 and row[PSP_V_PD_MSA] >= 0.5 or row[PSP_V_MSA] >= 0.5 :
+        return 'PSP'
+    else:
+        return 'Unknown'
+
+def diagnose_subject_v2(row):
+    """ Diagnosis Algorithm Version 2 as originally written, one subject at a time """
+    if row[PARK_V_CONTROL] < 0.5 :
+        return 'Not Parkinsonism'
+    elif row[PARK_V_CONTROL] >= 0.5 and row[MSA_PSP_V_PD] < 0.08 and row[PSP_V_PD_MSA] < 0.04 and row[PSP_V_MSA] < 0.5 :
+        return 'PD'
+    elif row[PARK_V_CONTROL] >= 0.5 and row[PSP_V_PD_MSA] >= 0.3 or row[PSP_V_MSA] >= 0.3 :
+        return 'PSP'
+    elif row[PARK_V_CONTROL] >= 0.5 and row[PSP_V_PD_MSA] < 0.5 and row[PSP_V_MSA] < 0.5 and row[PD_V_MSA] < 0.5:
+        return 'MSA'
+    elif row[PARK_V_CONTROL] >= 0.5 and row[MSA_PSP_V_PD] < 0.5 and row[PSP_V_PD_MSA] >= 0.5 or row[PSP_V_MSA] >= 0.5 :
+        return 'PSP'
+    else:
+        return 'Unknown'
@@ -3,6 +3,7 @@ import unittest
 from unittest.mock import Mock
 from aidp.runners.engines import getEngine, PredictionEngine, TrainingEngine
 from aidp.data.modeldata import ModelData
+import pandas as pd
 
 class TestEngineFactory(unittest.TestCase):
     def test__getEngine_predict__returns_PredictionEngine(self):
@@ -44,3 +45,128 @@ class TestEngineFactory(unittest.TestCase):
         engine.start()
 
         mock_experiment.train.assert_called()
+
+    def test__TrainingEngine_start__scheduler__finishes_each_experiment_with_its_jobs(self):
+        experiments = [Mock(), Mock()]
+        experiments[0].training_jobs.return_value = ['a1', 'a2']
+        experiments[1].training_jobs.return_value = ['b1']
+        engine = TrainingEngine(Mock())
+        engine.experiments = experiments
+        engine.scheduler = Mock()
+        engine.scheduler.run.side_effect = lambda jobs: [job + '_done' for job in jobs]
+
+        engine.start(model_key='key')
+
+        engine.scheduler.run.assert_called_once_with(['a1', 'a2', 'b1'])
+        experiments[0].finish_training.assert_called_once_with(['a1_done', 'a2_done'], 'key')
+        experiments[1].finish_training.assert_called_once_with(['b1_done'], 'key')
+        experiments[0].train.assert_not_called()
+
+    def test__TrainingEngine_start__training_cache__runs_and_stores_only_uncached_jobs(self):
+        experiment = Mock()
+        experiment.training_jobs.return_value = ['cached', 'new']
+        engine = TrainingEngine(Mock())
+        engine.experiments = [experiment]
+        engine.scheduler = Mock()
+        engine.scheduler.run.side_effect = lambda jobs: [job + '_done' for job in jobs]
+        engine.training_cache = Mock()
+        engine.training_cache.restore.side_effect = lambda job: job == 'cached'
+
+        engine.start(model_key='key')
+
+        engine.scheduler.run.assert_called_once_with(['new'])
+        engine.training_cache.store.assert_called_once_with('new_done')
+        experiment.finish_training.assert_called_once_with(['cached', 'new_done'], 'key')
+
+    def test__TrainingEngine_start__nested_cv__runs_only_unfinished_folds(self):
+        folds = [Mock(), Mock()]
+        folds[0].resume.return_value = True
+        folds[1].resume.return_value = False
+        experiment = Mock()
+        experiment.nested_jobs.return_value = folds
+        engine = TrainingEngine(Mock())
+        engine.experiments = [experiment]
+        engine.nested_cv = 3
+        engine.scheduler = Mock()
+        engine.scheduler.run.side_effect = lambda jobs: ['fold1_done' for job in jobs]
+
+        engine.start(model_key='key')
+
+        assert experiment.nested_jobs.call_args[0][1:] == ('key', 3)
+        engine.scheduler.run.assert_called_once_with([folds[1]])
+        experiment.finish_nested.assert_called_once_with([folds[0], 'fold1_done'], 'key')
+        experiment.train.assert_not_called()
+
+    def test__PredictionEngine_start_streaming__appends_each_chunk(self):
+        chunks = [pd.DataFrame({'Subject': ['a', 'b']}, index=[0, 1]), pd.DataFrame({'Subject': ['c']}, index=[2])]
+        mock_model_data = Mock()
+        mock_model_data.iter_chunks = Mock(return_value=iter(chunks))
+        mock_experiment = Mock()
+        mock_experiment.feature_columns = Mock(return_value=['p'])
+        mock_experiment.get_results = Mock(side_effect=[
+            pd.DataFrame({'p': [0.1, 0.9]}, index=[0, 1]), pd.DataFrame({'p': [0.5]}, index=[2])])
+        engine = PredictionEngine(mock_model_data)
+        engine.experiments = [mock_experiment]
+        engine._diagnose = Mock(side_effect=lambda output: pd.DataFrame({'Predicted_diagnosis': 'PD'}, index=output.index))
+
+        engine.start_streaming(chunksize=2)
+
+        assert mock_experiment.predict.call_count == 2
+        # Every input column is copied to the output by default
+        mock_model_data.iter_chunks.assert_called_once_with(2, columns=None)
+        calls = mock_model_data.append_output_chunk.call_args_list
+        assert [c[1]['first_chunk'] for c in calls] == [True, False]
+        assert list(calls[1][0][0].columns) == ['Subject', 'p', 'Predicted_diagnosis']
+
+    def test__prediction_plan__only_diagnosis__diagnosis_columns(self):
+        engine = PredictionEngine(None)
+        engine.output_columns = []
+
+        assert engine.prediction_plan() == ['both_park_v_control', 'dmri_msa_psp_v_pd', 'dmri_psp_v_msa', 'dmri_psp_v_pd_msa']
+        assert engine.planned_groupings(engine.experiments[2]) == []
+
+    def test__prediction_plan__extra_columns__added_to_diagnosis_columns(self):
+        engine = PredictionEngine(None)
+        engine.output_columns = ['clinical_pd_v_msa']
+
+        assert 'clinical_pd_v_msa' in engine.prediction_plan()
+        assert engine.planned_groupings(engine.experiments[2]) == ['pd_v_msa']
+
+    def test__prediction_plan__unknown_column__throws_error(self):
+        engine = PredictionEngine(None)
+        engine.output_columns = ['nothing_v_everything']
+
+        with self.assertRaises(ValueError):
+            engine.prediction_plan()
+
+    def test__prediction_plan__no_output_columns__all_models(self):
+        engine = PredictionEngine(None)
+
+        assert engine.prediction_plan() is None
+        assert engine.planned_groupings(engine.experiments[0]) is None
+
+    def test__PredictionEngine_start__planned_groupings_only(self):
+        mock_model_data = Mock()
+        mock_model_data.data = pd.DataFrame(index=[0, 1])
+        mock_experiment = Mock()
+        mock_experiment.get_results = Mock(return_value=pd.DataFrame(index=[0, 1]))
+        skipped_experiment = Mock()
+        engine = PredictionEngine(mock_model_data)
+        engine.experiments = [mock_experiment, skipped_experiment]
+        engine.planned_groupings = Mock(side_effect=lambda experiment: ['a'] if experiment is mock_experiment else [])
+
+        engine.start()
+
+        assert mock_experiment.predict.call_args[1]['groupings'] == ['a']
+        skipped_experiment.predict.assert_not_called()
+
+    def test__required_columns__experiment_features_target_and_ids(self):
+        engine = PredictionEngine(None)
+
+        columns = engine.required_columns()
+
+        assert 'Subject' in columns
+        assert 'GroupID' in columns
+        assert 'UPDRS' in columns
+        assert len(columns) == 125
+        assert 'Subject' not in TrainingEngine(None).required_columns()
@@ -4,7 +4,10 @@ from unittest.mock import patch, Mock
 from aidp.data.experiments import get_standardized_data, DataExperiment, ClinicalOnlyDataExperiment, ImagingOnlyDataExperiment, FullDataExperiment
 from aidp.data.modeldata import ModelData
 from aidp.data.reader import ExcelDataReader
+import numpy as np
 import pandas as pd
+import os
+import tempfile
 
 class TestExperiments(unittest.TestCase):
     @classmethod
@@ -42,6 +45,42 @@ class TestExperiments(unittest.TestCase):
 
         assert len(filtered_data.columns) == 124
 
+    def test__training_jobs__precompute_gram__passed_to_each_job(self):
+        jobs = FullDataExperiment().training_jobs(self.model_data.data, precompute_gram=True)
+
+        assert len(jobs) == 6
+        assert all(job.precompute_gram for job in jobs)
+
+    def test__write_intervals__lower_and_upper_column_per_metric(self):
+        job = Mock(grouping_key='pd_v_msa', training_intervals=np.zeros((11, 2)), validation_intervals=np.ones((11, 2)))
+        filepath = os.path.join(tempfile.mkdtemp(), 'intervals.csv')
+
+        FullDataExperiment().write_intervals([job], filepath)
+
+        intervals = pd.read_csv(filepath, index_col=0)
+        assert list(intervals.columns[:3]) == ['Group', 'recall_t_low', 'recall_t_high']
+        assert intervals.loc[0, 'weighted_accuracy_v_high'] == 1
+        assert intervals.loc[0, 'auc_t_low'] == 0
+        os.remove(filepath)
+
+    def test__finish_nested__writes_mean_of_each_groupings_folds(self):
+        jobs = [Mock(grouping_key='pd_v_msa', training_output=[1.0] * 11, validation_output=[0.5] * 11),
+                Mock(grouping_key='pd_v_msa', training_output=[0.0] * 11, validation_output=[np.nan] + [0.7] * 10),
+                Mock(grouping_key='psp_v_msa', training_output=[1.0] * 11, validation_output=[1.0] * 11)]
+        experiment = FullDataExperiment()
+        experiment.write_performance = Mock()
+
+        experiment.finish_nested(jobs, 'key')
+
+        groups, outcomes, filepath = experiment.write_performance.call_args[0]
+        performance = pd.concat(outcomes, ignore_index=True)
+        assert groups == ['pd_v_msa', 'psp_v_msa']
+        assert filepath.endswith('key_both_Nested_CV_Performance.csv')
+        assert performance.loc[0, 0] == 0.5
+        assert performance.loc[0, 11] == 0.5
+        np.testing.assert_allclose(performance.loc[0, 12], 0.6)
+        assert performance.loc[1, 21] == 1.0
+
     def test__ClinicalOnlyDataExperiment__str__returns_class_name(self):
         assert ClinicalOnlyDataExperiment().__str__() == "ClinicalOnlyDataExperiment"
     
@@ -1,6 +1,6 @@
 """Test for the aidp.data.grouping module """
 import unittest
-from aidp.data.groupings import reassign_classes, ParkinsonsVsControlGrouping, MsaPspVsPdGrouping, MsaVsPdPspGrouping, PspVsPdMsaGrouping, PspVsMsaGrouping
+from aidp.data.groupings import reassign_classes, GroupIndex, ParkinsonsVsControlGrouping, MsaPspVsPdGrouping, MsaVsPdPspGrouping, PspVsPdMsaGrouping, PspVsMsaGrouping, PdVsMsaGrouping
 import pandas as pd
 
 class TestGroupings(unittest.TestCase):
@@ -85,3 +85,31 @@ def get_test_data():
 
 
 
+class TestGroupIndex(unittest.TestCase):
+    def test__index_data__same_rows_and_labels_as_group_data(self):
+        data = get_test_data()
+        group_index = GroupIndex(data['GroupID'])
+
+        for grouping in [ParkinsonsVsControlGrouping(), MsaPspVsPdGrouping(), MsaVsPdPspGrouping(),
+                         PspVsPdMsaGrouping(), PspVsMsaGrouping(), PdVsMsaGrouping()]:
+            grouped_data = grouping.group_data(data).grouped_data
+            grouping.index_data(group_index)
+
+            assert list(grouping.rows) == list(grouped_data.index)
+            assert list(grouping.labels) == list(grouped_data['GroupID'])
+
+    def test__rows__missing_group__ignored(self):
+        group_index = GroupIndex([3, 0, 3, 1])
+
+        assert list(group_index.rows([3, 7])) == [0, 2]
+        assert list(group_index.rows([7])) == []
+
+    def test_reassign_classes_feature_equal_to_class_not_changed(self):
+        """Only the class column is relabeled"""
+        data = pd.DataFrame([{'class':0,'data':0},{'class':1,'data':1}])
+        new_data = reassign_classes(data, {0:1,1:0}, 'class')
+
+        assert list(new_data['data']) == [0, 1]
+        assert list(new_data['class']) == [1, 0]
+
+
@@ -0,0 +1,26 @@
+"""Tests for the aidp.ml.kernels module"""
+import unittest
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from aidp.ml.kernels import linear_gram
+
+class TestLinearGram(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        rng = np.random.RandomState(0)
+        self.features = rng.normal(loc=5, scale=[1, 10, 100], size=(50, 3))
+        self.features[:, 2] = 7
+
+    def test__linear_gram__standardized_dot_products_in_float32(self):
+        standardized = StandardScaler().fit_transform(self.features)
+
+        gram = linear_gram(self.features)
+
+        assert gram.dtype == np.float32
+        np.testing.assert_allclose(gram, standardized @ standardized.T, rtol=1e-5, atol=1e-5)
+
+    def test__linear_gram__blocks__same_matrix(self):
+        np.testing.assert_array_equal(linear_gram(self.features, block_rows=7), linear_gram(self.features))
+
+    def test__linear_gram__over_memory_budget__none(self):
+        assert linear_gram(self.features, max_bytes=50 * 50 * 4 - 1) is None
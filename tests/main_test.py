@@ -0,0 +1,20 @@
+"""Tests for the main module"""
+import subprocess
+import sys
+import unittest
+import main
+from aidp.ml.calibration import CALIBRATION_METHODS
+from aidp.ml.search import SEARCHES
+
+class TestMain(unittest.TestCase):
+    def test__train_choices__same_as_searches_and_calibration_methods(self):
+        assert main.SEARCH_CHOICES == sorted(SEARCHES)
+        assert main.CALIBRATION_CHOICES == CALIBRATION_METHODS
+
+    def test__parse_arguments__predict__sklearn_not_imported(self):
+        code = ("import sys; sys.argv = ['aidp', 'predict', 'input.csv']; import main; main.parse_arguments(); "
+                "print('sklearn' in sys.modules)")
+
+        output = subprocess.check_output([sys.executable, '-c', code], universal_newlines=True)
+
+        assert output.strip() == 'False'
@@ -0,0 +1,134 @@
+"""Tests for the aidp.ml.metrics module"""
+import unittest
+import warnings
+from unittest.mock import Mock, patch
+import numpy as np
+from sklearn.metrics import accuracy_score, precision_score, recall_score, roc_auc_score
+from aidp.ml import helpers
+from aidp.ml.metrics import (METRICS, bootstrap_counts, bootstrap_intervals, confusion_counts, metrics_from_counts,
+                              score_model, score_predictions)
+from aidp.report.writers import LogReportWriter
+
+REFERENCE = {
+    'recall': recall_score,
+    'precision': precision_score,
+    'auc': roc_auc_score,
+    'specificity': helpers.specificity,
+    'npv': helpers.negative_predictive_value,
+    'accuracy': accuracy_score,
+    'weighted_sensitivity': helpers.weighted_sensitivity,
+    'weighted_ppv': helpers.weighted_ppv,
+    'weighted_specificity': helpers.weighted_specificity,
+    'weighted_npv': helpers.weighted_npv,
+    'weighted_accuracy': helpers.weighted_accuracy,
+}
+
+class TestMetrics(unittest.TestCase):
+    def test__confusion_counts__counts_each_cell(self):
+        counts = confusion_counts([0, 0, 0, 1, 1, 1, 1], [0, 1, 1, 0, 1, 1, 1])
+
+        np.testing.assert_array_equal(counts, [1, 2, 1, 3])
+
+    def test__score_predictions__same_as_sklearn_and_helpers(self):
+        rng = np.random.RandomState(0)
+        for _ in range(200):
+            y_true, y_pred = rng.randint(0, 2, 30), rng.randint(0, 2, 30)
+
+            scores = score_predictions(y_true, y_pred)
+
+            for metric in METRICS:
+                assert scores[metric] == REFERENCE[metric](y_true, y_pred), metric
+
+    def test__score_predictions__undefined_metrics__same_as_sklearn_and_helpers(self):
+        y_true, y_pred = np.array([1, 1, 1, 1]), np.array([1, 0, 0, 1])
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            scores = score_predictions(y_true, y_pred)
+            for metric in METRICS:
+                expected = REFERENCE[metric](y_true, y_pred)
+                assert scores[metric] == expected or (np.isnan(scores[metric]) and np.isnan(expected)), metric
+
+    def test__score_predictions__one_class_only__undefined_metrics_nan(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            positives = score_predictions(np.ones(4, dtype=int), np.ones(4, dtype=int))
+            negatives = score_predictions(np.zeros(4, dtype=int), np.zeros(4, dtype=int))
+
+        assert [positives[m] for m in ['recall', 'precision', 'accuracy', 'weighted_sensitivity']] == [1.0] * 4
+        for metric in ['specificity', 'npv', 'weighted_ppv', 'weighted_specificity', 'weighted_npv', 'weighted_accuracy']:
+            assert np.isnan(positives[metric]), metric
+        assert [negatives[m] for m in ['recall', 'precision', 'specificity', 'npv', 'accuracy']] == [0.0, 0.0, 1.0, 1.0, 1.0]
+        for metric in ['weighted_sensitivity', 'weighted_ppv', 'weighted_npv', 'weighted_accuracy']:
+            assert np.isnan(negatives[metric]), metric
+
+    def test__metrics_from_counts__leading_dimensions__scores_each_row(self):
+        counts = np.array([[5, 1, 2, 7], [3, 3, 0, 9]])
+
+        scores = metrics_from_counts(counts)
+
+        assert scores.shape == (2, len(METRICS))
+        np.testing.assert_array_equal(scores[1], metrics_from_counts(counts[1]))
+
+    def test__score_model__predicts_once(self):
+        model = Mock()
+        model.predict = Mock(return_value=np.array([0, 1, 1]))
+
+        scores = score_model(model, np.zeros((3, 2)), np.array([0, 1, 0]))
+
+        model.predict.assert_called_once()
+        assert scores['recall'] == 1.0
+        assert scores['specificity'] == 0.5
+
+    def test__bootstrap_counts__counts_of_each_resample(self):
+        y_true, y_pred = np.array([0, 0, 1, 1, 1, 0]), np.array([0, 1, 1, 0, 1, 0])
+
+        counts = bootstrap_counts(y_true, y_pred, 20, random_state=3)
+
+        rows = np.random.RandomState(3).randint(0, 6, (20, 6))
+        np.testing.assert_array_equal(counts, [confusion_counts(y_true[r], y_pred[r]) for r in rows])
+
+    def test__bootstrap_counts__batches__same_counts(self):
+        y_true, y_pred = np.array([0, 0, 1, 1, 1, 0]), np.array([0, 1, 1, 0, 1, 0])
+
+        with patch('aidp.ml.metrics.MAX_BOOTSTRAP_CELLS', 12):
+            batched = bootstrap_counts(y_true, y_pred, 7, random_state=3)
+
+        np.testing.assert_array_equal(batched, bootstrap_counts(y_true, y_pred, 7, random_state=3))
+
+    def test__bootstrap_intervals__bracket_point_estimates(self):
+        rng = np.random.RandomState(0)
+        y_true = rng.randint(0, 2, 200)
+        y_pred = np.where(rng.random_sample(200) < 0.8, y_true, 1 - y_true)
+
+        intervals = bootstrap_intervals(y_true, y_pred, 2000, random_state=0)
+
+        scores = score_predictions(y_true, y_pred)
+        assert intervals.shape == (len(METRICS), 2)
+        for metric, (low, high) in zip(METRICS, intervals):
+            assert low <= scores[metric] <= high, metric
+        np.testing.assert_array_equal(intervals, bootstrap_intervals(y_true, y_pred, 2000, random_state=0))
+
+class TestLogReportWriter(unittest.TestCase):
+    def test__write_report__metrics_in_training_performance_order(self):
+        model = Mock()
+        model.predict = Mock(side_effect=lambda x: np.asarray(x)[:, 0])
+        x = np.array([[0], [1], [1], [0]])
+
+        training, validation = LogReportWriter().write_report(model, x, np.array([0, 1, 0, 0]), x, np.array([0, 1, 1, 0]))
+
+        assert model.predict.call_count == 2
+        assert training == [score_predictions([0, 1, 0, 0], x[:, 0])[metric] for metric in METRICS]
+        assert validation[METRICS.index('accuracy')] == 1.0
+
+    def test__write_report__bootstrap__keeps_intervals(self):
+        model = Mock()
+        model.predict = Mock(side_effect=lambda x: np.asarray(x)[:, 0])
+        x = np.array([[0], [1], [1], [0]])
+        writer = LogReportWriter(n_resamples=100, random_state=0)
+
+        training, _ = writer.write_report(model, x, np.array([0, 1, 0, 0]), x, np.array([0, 1, 1, 0]))
+
+        assert training == [score_predictions([0, 1, 0, 0], x[:, 0])[metric] for metric in METRICS]
+        assert writer.training_intervals.shape == (len(METRICS), 2)
+        np.testing.assert_array_equal(writer.validation_intervals[METRICS.index('accuracy')], [1, 1])
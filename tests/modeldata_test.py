@@ -27,4 +27,14 @@ class TestModelData(unittest.TestCase):
 
         self.model_data.add_results(new_data)
 
-        assert self.model_data.data.shape == (2,3)
\ No newline at end of file
+        assert self.model_data.data.shape == (2,3)
+    def test__add_results__several_blocks__joined_in_order_on_next_read(self):
+        model_data = ModelData("dir/input.xlsx", Mock(), output_format='csv')
+        model_data.data = pd.DataFrame([{"A":1}, {"A":10}], index=[5, 6])
+
+        model_data.add_results(pd.DataFrame([{"B":2}, {"B":20}], index=[5, 6]))
+        model_data.add_results(pd.DataFrame([{"C":3}, {"C":30}], index=[5, 6]))
+
+        assert list(model_data.data.columns) == ["A", "B", "C"]
+        assert model_data.data.loc[6, "C"] == 30
+        assert model_data.output_filename == "input_out.csv"
@@ -0,0 +1,73 @@
+"""Tests for the aidp.ml.nested module"""
+import json
+import pathlib
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+from sklearn.datasets import make_classification
+from aidp.ml.nested import NestedFoldJob, nested_jobs
+
+class TestNestedFoldJob(unittest.TestCase):
+    def setUp(self):
+        self.directory = pathlib.Path(tempfile.mkdtemp())
+        self.X, self.y = make_classification(n_samples=90, n_features=4, random_state=0)
+        self.settings = {'search': 'path', 'param_grid': {'classifier__C': [0.01, 1.0]}}
+
+    def tearDown(self):
+        shutil.rmtree(str(self.directory), ignore_errors=True)
+
+    def jobs(self, settings=None):
+        jobs = nested_jobs('both', 'pd_v_msa', self.X, self.y, 3, self.directory, settings or self.settings)
+        for job in jobs:
+            job.n_jobs = 1
+        return jobs
+
+    def test__nested_jobs__stratified_outer_folds_cover_every_row_once(self):
+        jobs = self.jobs()
+
+        validation_rows = np.concatenate([job.split[1] for job in jobs])
+        assert len(jobs) == 3
+        np.testing.assert_array_equal(np.sort(validation_rows), np.arange(len(self.y)))
+        for job in jobs:
+            assert abs(self.y[job.split[1]].mean() - self.y.mean()) < 0.05
+
+    def test__run__scores_the_fold_and_writes_checkpoint(self):
+        job = self.jobs()[0]
+
+        job.run()
+
+        state = json.loads(job.checkpoint.read_text())
+        assert state['validation_output'] == job.validation_output
+        assert state['best_params']['classifier__C'] in [0.01, 1.0]
+        assert job.classifier is None and job.features is None
+
+    def test__resume__checkpoint_of_same_fold__loads_metrics_without_training(self):
+        job = self.jobs()[0]
+        job.training_output, job.validation_output, job.best_params, job.seconds = [0.5] * 11, [0.25] * 11, {'classifier__C': 1.0}, 2.0
+        job._save()
+
+        resumed = self.jobs()[0]
+
+        assert resumed.resume()
+        assert resumed.validation_output == [0.25] * 11
+        assert resumed.seconds == 0.0
+        with patch('aidp.ml.predictors.TrainingJob.run') as run:
+            resumed.run()
+        run.assert_not_called()
+
+    def test__resume__checkpoint_of_other_settings__not_resumed(self):
+        job = self.jobs()[0]
+        job.training_output, job.validation_output, job.best_params, job.seconds = [0.5] * 11, [0.25] * 11, {}, 2.0
+        job._save()
+
+        assert not self.jobs({'search': 'grid'})[0].resume()
+
+    def test__resume__no_or_unreadable_checkpoint__not_resumed(self):
+        job = self.jobs()[0]
+        assert not job.resume()
+
+        job.checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        job.checkpoint.write_text('{"fingerprint": ')
+        assert not job.resume()
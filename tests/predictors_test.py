@@ -1,9 +1,13 @@
 """Tests for the aidp.data.modeldata module"""
 import unittest
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 import pandas as pd
 import numpy as np
-from aidp.ml.predictors import Predictor
+from sklearn.datasets import make_classification
+from aidp.ml.calibration import CalibratedClassifier
+from aidp.ml.kernels import linear_gram
+from aidp.ml.predictors import Predictor, LinearSvcPredictor
+from aidp.ml.search import search_available
 
 class TestPredictor(unittest.TestCase):
     def test__load_model_from_file__sets_classifier(self):
@@ -27,4 +31,80 @@ class TestPredictor(unittest.TestCase):
         predictions = predictor.make_predictions(pd.DataFrame([{'GroupID':1}]))
 
         predictor.classifier.predict_proba.assert_called()
-        assert mock_preds[:,1] == predictions, "Predictions should be set"
\ No newline at end of file
+        assert mock_preds[:,1] == predictions, "Predictions should be set"
+
+class TestLinearSvcPredictor(unittest.TestCase):
+    def test__train_model__post_search_calibration__searches_without_probabilities(self):
+        X, y = make_classification(n_samples=120, n_features=5, random_state=0)
+        trainer = LinearSvcPredictor()
+        trainer.param_grid = {'classifier__C': [0.01, 1.0]}
+        trainer.search = 'path'
+        trainer.calibration = 'sigmoid'
+        trainer.n_jobs = 1
+
+        trainer.train_model(X, y)
+
+        assert isinstance(trainer.classifier.best_estimator_, CalibratedClassifier)
+        assert not trainer.classifier.best_estimator_.named_steps['classifier'].probability
+        assert trainer.classifier.predict_proba(X).shape == (len(X), 2)
+
+    def test__train_model__split__uses_the_given_rows(self):
+        X, y = make_classification(n_samples=60, n_features=5, random_state=0)
+        trainer = LinearSvcPredictor()
+        trainer.param_grid = {'classifier__C': [1.0]}
+        trainer.search = 'path'
+        trainer.n_jobs = 1
+
+        trainer.train_model(X, y, split=(np.arange(10, 60), np.arange(10)))
+
+        np.testing.assert_array_equal(trainer.X_test, X[:10])
+        np.testing.assert_array_equal(trainer.Y_train, y[10:])
+
+    def test__train_model__precompute_gram__gram_of_training_rows_only(self):
+        X, y = make_classification(n_samples=60, n_features=5, random_state=0)
+        trainer = LinearSvcPredictor()
+        trainer.param_grid = {'classifier__C': [0.01, 1.0]}
+        trainer.search = 'path'
+        trainer.n_jobs = 1
+
+        with patch('aidp.ml.predictors.linear_gram', wraps=linear_gram) as gram:
+            trainer.train_model(X, y, precompute_gram=True, split=(np.arange(10, 60), np.arange(10)))
+
+        np.testing.assert_array_equal(gram.call_args[0][0], X[10:])
+        assert type(trainer.classifier).__name__ == 'RegularizationPathSearch'
+
+    def test__train_model__default_grid_search__tuple_param_grid(self):
+        X, y = make_classification(n_samples=120, n_features=5, random_state=0)
+        trainer = LinearSvcPredictor()
+        trainer.param_grid = ({'classifier__C': [0.01, 1.0]},)
+        trainer.n_jobs = 1
+
+        trainer.train_model(X, y)
+
+        assert type(trainer.classifier).__name__ == 'GridSearchCV'
+        assert trainer.classifier.best_params_['classifier__C'] in [0.01, 1.0]
+
+    def test__train_model__precompute_gram_with_other_search__warns(self):
+        X, y = make_classification(n_samples=60, n_features=5, random_state=0)
+        trainer = LinearSvcPredictor()
+        trainer.param_grid = {'classifier__C': [1.0]}
+        trainer.search = 'smbo'
+        trainer.n_jobs = 1
+
+        with self.assertLogs('aidp.ml.predictors', level='WARNING'):
+            trainer.train_model(X, y, precompute_gram=True)
+
+        assert type(trainer.classifier).__name__ == 'RegularizationPathSearch'
+
+    @unittest.skipUnless(search_available('halving'), "needs scikit-learn 0.24 or later")
+    def test__train_model__named_search__fits_that_search(self):
+        X, y = make_classification(n_samples=120, n_features=5, random_state=0)
+        trainer = LinearSvcPredictor()
+        trainer.param_grid = ({'classifier__C': [0.01, 1.0]},)
+        trainer.search = 'halving'
+        trainer.n_jobs = 1
+
+        trainer.train_model(X, y)
+
+        assert type(trainer.classifier).__name__ == 'HalvingGridSearchCV'
+        assert trainer.classifier.predict_proba(X).shape == (len(X), 2)
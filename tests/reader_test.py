@@ -1,4 +1,7 @@
 """Tests for the data.reader module"""
+import os
+import shutil
+import tempfile
 import unittest
 import pandas as pd
 import aidp.data.reader as reader
@@ -16,3 +19,60 @@ class TestExcelDataReader(unittest.TestCase):
         result = excel_reader.read_data("./tests/resources/test.xlsx")
 
         assert isinstance(result, pd.DataFrame)
+
+
+class TestChunkedReaders(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data = pd.DataFrame({'A': range(10), 'B': [x / 2 for x in range(10)]})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test__CsvDataReader__read_chunks__fixed_size_chunks(self):
+        filepath = os.path.join(self.tmp_dir, 'data.csv')
+        self.data.to_csv(filepath, index=False)
+
+        chunks = list(reader.CsvDataReader().read_chunks(filepath, 4))
+
+        assert [len(c.index) for c in chunks] == [4, 4, 2]
+        pd.testing.assert_frame_equal(pd.concat(chunks), self.data)
+
+    def test__ParquetDataReader__read_chunks__fixed_size_chunks(self):
+        filepath = os.path.join(self.tmp_dir, 'data.parquet')
+        self.data.to_parquet(filepath, row_group_size=3)
+
+        chunks = list(reader.ParquetDataReader().read_chunks(filepath, 4))
+
+        assert [len(c.index) for c in chunks] == [4, 4, 2]
+        pd.testing.assert_frame_equal(pd.concat(chunks), self.data, check_index_type=False)
+
+    def test__rechunk__frames_larger_and_smaller_than_chunks__fixed_size_chunks(self):
+        frames = [self.data.iloc[:7], self.data.iloc[7:8], self.data.iloc[8:]]
+
+        chunks = list(reader.rechunk(frames, 3))
+
+        assert [len(c.index) for c in chunks] == [3, 3, 3, 1]
+        pd.testing.assert_frame_equal(pd.concat(chunks), self.data, check_index_type=False)
+
+    def test__ExcelDataReader__read_chunks__slices_sheet(self):
+        chunks = list(reader.ExcelDataReader().read_chunks("./tests/resources/test.xlsx", 500))
+
+        assert [len(c.index) for c in chunks] == [500, 296]
+
+    def test__get_reader__chooses_reader_by_extension(self):
+        assert isinstance(reader.get_reader('a.csv'), reader.CsvDataReader)
+        assert isinstance(reader.get_reader('a.parquet'), reader.ParquetDataReader)
+        assert isinstance(reader.get_reader('a.xlsx'), reader.ExcelDataReader)
+
+    def test__read_data__columns__only_requested_columns_parsed(self):
+        csv_path = os.path.join(self.tmp_dir, 'data.csv')
+        parquet_path = os.path.join(self.tmp_dir, 'data.parquet')
+        self.data.to_csv(csv_path, index=False)
+        self.data.to_parquet(parquet_path)
+
+        for data_reader, filepath in [(reader.CsvDataReader(), csv_path), (reader.ParquetDataReader(), parquet_path),
+                                      (reader.ExcelDataReader(), "./tests/resources/test.xlsx")]:
+            result = data_reader.read_data(filepath, columns={'A', 'Age', 'Missing'})
+
+            assert list(result.columns) in (['A'], ['Age'])
@@ -0,0 +1,66 @@
+"""Tests for the aidp.ml.registry module"""
+import threading
+import unittest
+from aidp.ml.registry import ModelRegistry, get_registry, saved_models
+
+class FakeLoader:
+    def __init__(self, nbytes=10):
+        self.nbytes = nbytes
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, model_key, experiment_key, grouping_key):
+        with self._lock:
+            self.calls.append((model_key, experiment_key, grouping_key))
+        return object(), self.nbytes
+
+class TestModelRegistry(unittest.TestCase):
+    def test__get__same_model_twice__loaded_once(self):
+        loader = FakeLoader()
+        registry = ModelRegistry(loader=loader)
+
+        first = registry.get('default', 'both', 'psp_v_msa')
+        second = registry.get('default', 'both', 'psp_v_msa')
+
+        assert first is second
+        assert loader.calls == [('default', 'both', 'psp_v_msa')]
+
+    def test__get__over_budget__least_recently_used_evicted(self):
+        registry = ModelRegistry(max_bytes=25, loader=FakeLoader(nbytes=10))
+
+        registry.get('default', 'both', 'a')
+        registry.get('default', 'both', 'b')
+        registry.get('default', 'both', 'a')
+        registry.get('default', 'both', 'c')
+
+        assert ('default', 'both', 'a') in registry
+        assert ('default', 'both', 'b') not in registry
+        assert ('default', 'both', 'c') in registry
+        assert registry.nbytes == 20
+
+    def test__get__single_model_over_budget__kept(self):
+        registry = ModelRegistry(max_bytes=5, loader=FakeLoader(nbytes=10))
+
+        registry.get('default', 'both', 'a')
+
+        assert len(registry) == 1
+
+    def test__preload__loads_every_saved_model_once(self):
+        loader = FakeLoader()
+        registry = ModelRegistry(loader=loader)
+
+        keys = registry.preload('default', n_jobs=4)
+        for key in keys:
+            registry.get(*key)
+
+        assert sorted(loader.calls) == saved_models('default')
+        assert len(registry) == len(keys)
+
+    def test__preload__unknown_model_key__nothing_loaded(self):
+        registry = ModelRegistry(loader=FakeLoader())
+
+        assert registry.preload('doesnt_exist') == []
+        assert len(registry) == 0
+
+    def test__get_registry__shared_instance(self):
+        assert get_registry() is get_registry()
@@ -0,0 +1,53 @@
+"""Tests for the aidp.runners.scheduler module"""
+import os
+import unittest
+from unittest.mock import patch
+from aidp.runners.scheduler import TrainingScheduler, _init_worker
+
+class FakeTrainingJob:
+    def __init__(self, grouping_key, size):
+        self.experiment_key = 'both'
+        self.grouping_key = grouping_key
+        self.size = size
+        self.n_jobs = -1
+
+    def run(self):
+        self.pid = os.getpid()
+        self.seconds = 0.01
+        return self
+
+class TestTrainingScheduler(unittest.TestCase):
+    def test__plan__more_jobs_than_cores__one_core_per_worker(self):
+        assert TrainingScheduler(8).plan(18) == (8, 1)
+
+    def test__plan__fewer_jobs_than_cores__rest_goes_to_each_job(self):
+        assert TrainingScheduler(16).plan(6) == (6, 2)
+
+    def test__plan__fixed_workers__split_budget(self):
+        assert TrainingScheduler(8, n_workers=2).plan(18) == (2, 4)
+
+    def test__plan__never_oversubscribes(self):
+        for n_cores in range(1, 20):
+            for n_jobs in range(1, 20):
+                n_workers, n_inner = TrainingScheduler(n_cores).plan(n_jobs)
+                assert n_workers * n_inner <= n_cores
+
+    def test__run__one_worker__runs_in_process(self):
+        jobs = [FakeTrainingJob('a', 1), FakeTrainingJob('b', 2)]
+
+        finished = TrainingScheduler(1).run(jobs)
+
+        assert [job.grouping_key for job in finished] == ['a', 'b']
+        assert all(job.pid == os.getpid() and job.n_jobs == 1 for job in finished)
+
+    def test__run__worker_processes__returns_jobs_in_given_order(self):
+        jobs = [FakeTrainingJob(key, size) for key, size in [('a', 1), ('b', 3), ('c', 2)]]
+
+        finished = TrainingScheduler(4, n_workers=2).run(jobs)
+
+        assert [job.grouping_key for job in finished] == ['a', 'b', 'c']
+        assert all(job.pid != os.getpid() and job.n_jobs == 2 for job in finished)
+
+    def test__init_worker__without_threadpoolctl__no_error(self):
+        with patch.dict('sys.modules', {'threadpoolctl': None}):
+            _init_worker(1)
@@ -0,0 +1,35 @@
+"""Tests for the aidp.data.schema module"""
+import unittest
+import numpy as np
+import pandas as pd
+from aidp.data.schema import ColumnSchema, get_schema
+
+class TestColumnSchema(unittest.TestCase):
+    def setUp(self):
+        self.schema = ColumnSchema(['GroupID', 'Age', 'Sex', 'UPDRS', 'FA'])
+
+    def test__features__excludes_target(self):
+        assert self.schema.features == ['Age', 'Sex', 'UPDRS', 'FA']
+        assert self.schema.positions['UPDRS'] == 3
+
+    def test__projection__contiguous_columns__returns_slice(self):
+        assert self.schema.projection(['Sex', 'UPDRS']) == slice(1, 3)
+
+    def test__projection__gapped_columns__returns_positions(self):
+        projection = self.schema.projection(['Age', 'Sex', 'FA'])
+
+        assert list(projection) == [0, 1, 3]
+        assert self.schema.projection(['Age', 'Sex', 'FA']) is projection
+
+    def test__to_matrix__schema_order_contiguous_float(self):
+        data = pd.DataFrame([{'FA': 0.5, 'UPDRS': 3, 'Sex': 1, 'Age': 70, 'Subject': 'x', 'GroupID': 1}])
+
+        matrix = self.schema.to_matrix(data)
+
+        assert matrix.dtype == np.float64
+        assert matrix.flags['C_CONTIGUOUS']
+        assert matrix.tolist() == [[70.0, 1.0, 3.0, 0.5]]
+
+    def test__get_schema__read_once_per_process(self):
+        assert get_schema() is get_schema()
+        assert len(get_schema().columns) == 124
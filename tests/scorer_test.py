@@ -0,0 +1,59 @@
+"""Tests for the aidp.ml.scorer module"""
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from aidp.data.schema import get_schema
+from aidp.data.experiments import FullDataExperiment, ImagingOnlyDataExperiment
+from aidp.ml.compact import CompactLinearModel
+from aidp.ml.registry import ModelRegistry
+from aidp.ml.scorer import Scorer
+
+def load_fake_model(model_key, experiment_key, grouping_key):
+    experiment = {'both': FullDataExperiment(), 'dmri': ImagingOnlyDataExperiment()}[experiment_key]
+    columns = experiment.feature_columns(get_schema())
+    rng = np.random.RandomState(len(grouping_key))
+    model = CompactLinearModel(rng.normal(size=len(columns)), rng.uniform(1, 2, size=len(columns)),
+                               rng.normal(size=len(columns)) / 10, 0.1, -1.5, 0.2, columns)
+    return model, 1
+
+class TestScorer(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        registry = ModelRegistry(loader=load_fake_model)
+        with patch('aidp.ml.scorer.get_registry', return_value=registry), \
+             patch('aidp.data.experiments.get_registry', return_value=registry):
+            self.scorer = Scorer(experiments=[FullDataExperiment(), ImagingOnlyDataExperiment()], diagnosis_versions=[1])
+        self.registry = registry
+        rng = np.random.RandomState(0)
+        self.data = pd.DataFrame(rng.uniform(0, 2, size=(5, len(get_schema().features))), columns=get_schema().features)
+
+    def test__score__batch__same_as_each_model(self):
+        results = self.scorer.score(self.data)
+
+        model = self.registry.get('default', 'dmri', 'psp_v_msa')
+        expected = model.make_predictions(self.data.drop(columns=['UPDRS']).to_numpy())
+        assert np.allclose(results['dmri_psp_v_msa (PSP Probability)'], expected)
+        assert list(results.columns[-1:]) == ['Predicted_diagnosis']
+        assert len(results.columns) == 13
+
+    def test__score__dict_array_and_frame__same_results(self):
+        batch = self.scorer.score(self.data)
+        subject = self.data.iloc[2]
+
+        from_dict = self.scorer.score(subject.to_dict())
+        from_array = self.scorer.score(subject.to_numpy())
+        from_list = self.scorer.score(subject.tolist())
+
+        assert from_dict == from_array == from_list
+        assert from_dict['Predicted_diagnosis'] == batch['Predicted_diagnosis'].iloc[2]
+        assert np.isclose(from_dict['both_park_v_control (PD/MSA/PSP Probability)'],
+                          batch['both_park_v_control (PD/MSA/PSP Probability)'].iloc[2])
+
+    def test__score__missing_required_column__throws_error(self):
+        with self.assertRaises(KeyError):
+            self.scorer.score({'Age': 60})
+
+    def test__score__wrong_number_of_values__throws_error(self):
+        with self.assertRaises(ValueError):
+            self.scorer.score(np.zeros(3))
@@ -0,0 +1,116 @@
+"""Tests for the aidp.ml.search module"""
+import unittest
+from unittest.mock import patch
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.model_selection import GridSearchCV
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+from imblearn.pipeline import Pipeline
+from aidp.ml.kernels import linear_gram
+from aidp.ml.search import BayesianCSearch, RegularizationPathSearch, SEARCHES, make_search, search_available
+
+class TestRegularizationPathSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.X, self.y = make_classification(n_samples=150, n_features=6, flip_y=0.2, weights=[0.7], random_state=0)
+        self.pipeline = Pipeline([
+            ('Scaler', StandardScaler()),
+            ('classifier', SVC(kernel='linear', class_weight='balanced', probability=True, random_state=0))
+        ])
+        self.param_grid = {'classifier__C': np.logspace(-3, 1, 6)}
+        self.grid = GridSearchCV(self.pipeline, self.param_grid, cv=5, scoring='f1_micro').fit(self.X, self.y)
+        self.path = RegularizationPathSearch(self.pipeline, self.param_grid, cv=5, scoring='f1_micro').fit(self.X, self.y)
+
+    def test__fit__same_scores_and_selection_as_grid_search(self):
+        np.testing.assert_allclose(self.path.cv_results_['mean_test_score'], self.grid.cv_results_['mean_test_score'])
+        np.testing.assert_array_equal(self.path.cv_results_['rank_test_score'], self.grid.cv_results_['rank_test_score'])
+        assert self.path.best_params_ == self.grid.best_params_
+        assert self.path.best_index_ == self.grid.best_index_
+
+    def test__fit__refits_calibrated_pipeline_at_best_c(self):
+        svc = self.path.best_estimator_.named_steps['classifier']
+
+        assert svc.C == self.grid.best_params_['classifier__C']
+        assert self.path.predict_proba(self.X).shape == (len(self.X), 2)
+        np.testing.assert_allclose(self.path.decision_function(self.X), self.grid.decision_function(self.X))
+
+    def test__fit__tuple_of_grids__searches_every_c(self):
+        search = RegularizationPathSearch(self.pipeline, ({'classifier__C': [0.01]}, {'classifier__C': [1.0]})).fit(self.X, self.y)
+
+        assert [params['classifier__C'] for params in search.cv_results_['params']] == [0.01, 1.0]
+
+    def test__fit__other_parameters__throws_error(self):
+        with self.assertRaises(ValueError):
+            RegularizationPathSearch(self.pipeline, {'classifier__gamma': [1.0]}).fit(self.X, self.y)
+
+    def test__fit__non_linear_svc__throws_error(self):
+        pipeline = Pipeline([('Scaler', StandardScaler()), ('classifier', SVC(kernel='rbf'))])
+
+        with self.assertRaises(ValueError):
+            RegularizationPathSearch(pipeline, self.param_grid).fit(self.X, self.y)
+
+    def test__fit__gram__scores_as_precomputed_kernel_search_and_refits_pipeline(self):
+        gram = linear_gram(self.X)
+        precomputed = GridSearchCV(SVC(kernel='precomputed', class_weight='balanced'), {'C': self.param_grid['classifier__C']},
+                                   cv=5, scoring='f1_micro').fit(gram.astype(float), self.y)
+
+        search = RegularizationPathSearch(self.pipeline, self.param_grid, cv=5, scoring='f1_micro').fit(self.X, self.y, gram=gram)
+
+        np.testing.assert_allclose(search.cv_results_['mean_test_score'], precomputed.cv_results_['mean_test_score'])
+        assert search.best_estimator_.named_steps['classifier'].kernel == 'linear'
+        assert search.predict_proba(self.X).shape == (len(self.X), 2)
+
+class TestBayesianCSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.X, self.y = make_classification(n_samples=150, n_features=6, flip_y=0.2, weights=[0.7], random_state=0)
+        self.pipeline = Pipeline([
+            ('Scaler', StandardScaler()),
+            ('classifier', SVC(kernel='linear', class_weight='balanced', probability=True, random_state=0))
+        ])
+        self.param_grid = {'classifier__C': np.logspace(-3, 1, 6)}
+        self.search = BayesianCSearch(self.pipeline, self.param_grid, cv=5, scoring='f1_micro', n_iter=6).fit(self.X, self.y)
+
+    def test__fit__evaluates_at_most_n_iter_c_values_within_grid(self):
+        c_values = [params['classifier__C'] for params in self.search.cv_results_['params']]
+
+        assert 4 <= len(c_values) <= 6
+        assert c_values == sorted(c_values)
+        assert len(set(c_values)) == len(c_values)
+        assert 1e-3 * (1 - 1e-9) <= min(c_values) and max(c_values) <= 10 * (1 + 1e-9)
+
+    def test__fit__scores_as_cross_validation(self):
+        best_c = self.search.best_params_['classifier__C']
+        grid = GridSearchCV(self.pipeline, {'classifier__C': [best_c]}, cv=5, scoring='f1_micro').fit(self.X, self.y)
+
+        np.testing.assert_allclose(self.search.best_score_, grid.best_score_)
+        assert self.search.best_score_ == max(self.search.cv_results_['mean_test_score'])
+
+    def test__fit__refits_calibrated_pipeline_at_best_c(self):
+        svc = self.search.best_estimator_.named_steps['classifier']
+
+        assert svc.C == self.search.best_params_['classifier__C']
+        assert self.search.predict_proba(self.X).shape == (len(self.X), 2)
+
+class TestMakeSearch(unittest.TestCase):
+    def setUp(self):
+        self.X, self.y = make_classification(n_samples=120, n_features=5, random_state=0)
+        self.pipeline = Pipeline([('Scaler', StandardScaler()), ('classifier', SVC(kernel='linear'))])
+
+    def test__make_search__every_strategy__fits_search_interface(self):
+        for name in filter(search_available, SEARCHES):
+            search = make_search(name, self.pipeline, ({'classifier__C': [0.01, 1.0]},), cv=3, random_state=0).fit(self.X, self.y)
+
+            assert search.best_params_['classifier__C'] in search.cv_results_['param_classifier__C'], name
+            assert search.best_estimator_.predict(self.X).shape == (len(self.X),), name
+
+    def test__make_search__halving_unsupported_by_sklearn__throws_error(self):
+        with patch.dict('sys.modules', {'sklearn.experimental.enable_halving_search_cv': None}):
+            assert not search_available('halving')
+            with self.assertRaises(ValueError):
+                make_search('halving', self.pipeline, {'classifier__C': [1.0]})
+
+    def test__make_search__unknown_strategy__throws_error(self):
+        with self.assertRaises(ValueError):
+            make_search('random', self.pipeline, {'classifier__C': [1.0]})
@@ -0,0 +1,97 @@
+"""Tests for the aidp.runners.server and aidp.runners.client modules"""
+import threading
+import unittest
+import numpy as np
+import pandas as pd
+from aidp.data.schema import get_schema
+from aidp.runners.server import MicroBatcher, PredictionServer
+from aidp.runners.client import PredictionClient
+
+class FakeScorer:
+    model_key = 'default'
+
+    def to_matrix(self, subjects):
+        if any('Age' not in subject for subject in subjects):
+            raise KeyError("Subjects are missing required columns: ['Age']")
+        return np.array([[subject.get(column) for column in get_schema().features] for subject in subjects], dtype=float)
+
+    def score(self, features):
+        age = features[:, get_schema().feature_positions['Age']]
+        return pd.DataFrame({'p': age / 100, 'Predicted_diagnosis': np.where(age > 50, 'PD', 'Not Parkinsonism')})
+
+class TestMicroBatcher(unittest.TestCase):
+    def test__submit__concurrent_requests__scored_in_one_batch(self):
+        batches = []
+        def score(features):
+            batches.append(len(features))
+            return pd.DataFrame({'row': features[:, 0]})
+        batcher = MicroBatcher(score, batch_window=0.5)
+
+        futures = [batcher.submit(np.full((n, 1), float(n))) for n in [1, 2, 3]]
+        results = [future.result(timeout=5) for future in futures]
+        batcher.close()
+
+        assert batches == [6]
+        assert [list(r['row']) for r in results] == [[1.0], [2.0, 2.0], [3.0, 3.0, 3.0]]
+
+    def test__submit__max_batch_size__split_into_batches(self):
+        batches = []
+        def score(features):
+            batches.append(len(features))
+            return pd.DataFrame({'row': features[:, 0]})
+        batcher = MicroBatcher(score, batch_window=0.5, max_batch_size=2)
+
+        futures = [batcher.submit(np.zeros((1, 1))) for _ in range(4)]
+        [future.result(timeout=5) for future in futures]
+        batcher.close()
+
+        assert batches == [2, 2]
+
+    def test__submit__scoring_fails__error_raised_for_every_request(self):
+        def score(features):
+            raise RuntimeError("broken")
+        batcher = MicroBatcher(score, batch_window=0.1)
+
+        futures = [batcher.submit(np.zeros((1, 1))) for _ in range(2)]
+        batcher.close()
+
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=5)
+
+class TestPredictionServer(unittest.TestCase):
+    def setUp(self):
+        self.server = PredictionServer(FakeScorer(), port=0, batch_window=0.01).start()
+        self.client = PredictionClient(self.server.url)
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def test__predict__single_subject(self):
+        results = self.client.predict({'Subject': 's1', 'Age': 70})
+
+        assert results == [{'Subject': 's1', 'p': 0.7, 'Predicted_diagnosis': 'PD'}]
+
+    def test__predict__concurrent_clients__each_gets_own_result(self):
+        results = {}
+        def send(age):
+            results[age] = self.client.predict({'Subject': str(age), 'Age': age})
+        threads = [threading.Thread(target=send, args=(age,)) for age in range(20, 80, 5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert all(results[age][0]['Subject'] == str(age) and results[age][0]['p'] == age / 100 for age in results)
+
+    def test__predict__missing_value__null(self):
+        results = self.client.predict([{'Subject': 's1', 'Age': None}])
+
+        assert results[0]['p'] is None
+
+    def test__predict__missing_required_column__error(self):
+        with self.assertRaises(RuntimeError):
+            self.client.predict({'Subject': 's1'})
+
+    def test__health__ok(self):
+        assert self.client.health()['status'] == 'ok'
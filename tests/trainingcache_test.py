@@ -0,0 +1,96 @@
+"""Tests for the aidp.ml.trainingcache module"""
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from aidp.ml.predictors import TrainingJob
+from aidp.ml.trainingcache import TrainingCache
+
+class TestTrainingCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = TrainingCache(self.cache_dir)
+        self.features = np.arange(40, dtype=float).reshape(10, 4)
+        self.labels = np.array([0, 1] * 5)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def job(self, labels=None, settings=None, grouping_key='pd_v_msa', features=None, precompute_gram=False):
+        return TrainingJob('both', grouping_key, self.features.copy() if features is None else features,
+                           self.labels if labels is None else labels, settings=settings, precompute_gram=precompute_gram)
+
+    def finish(self, job, score=0.5):
+        job.classifier, job.training_output, job.validation_output = 'classifier', [score] * 11, [score] * 11
+        job.training_intervals = job.validation_intervals = None
+        self.cache.store(job)
+
+    def test__key__same_inputs__same_key(self):
+        assert self.cache.key(self.job()) == self.cache.key(self.job())
+
+    def test__key__any_input_changed__different_key(self):
+        key = self.cache.key(self.job())
+
+        assert self.cache.key(self.job(labels=1 - self.labels)) != key
+        assert self.cache.key(self.job(settings={'search': 'path'})) != key
+        assert self.cache.key(self.job(settings={'param_grid': {'classifier__C': [1.0]}})) != key
+        assert self.cache.key(self.job(grouping_key='psp_v_msa')) != key
+        assert self.cache.key(self.job(precompute_gram=True)) != key
+
+    def test__key__precompute_gram__rows_changed__different_key(self):
+        key = self.cache.key(self.job(precompute_gram=True))
+        features = self.features.copy()
+        features[3, 1] += 1
+
+        assert self.cache.key(self.job(features=features, precompute_gram=True)) != key
+
+    def test__key__cores__same_key(self):
+        job = self.job()
+        job.n_jobs = 4
+
+        assert self.cache.key(job) == self.cache.key(self.job())
+
+    def test__restore__not_cached__false(self):
+        assert not self.cache.restore(self.job())
+
+    def test__restore__stored__gives_job_the_results(self):
+        stored = self.job()
+        self.cache.restore(stored)
+        self.finish(stored)
+
+        job = self.job()
+        assert self.cache.restore(job)
+        assert job.classifier == 'classifier'
+        assert job.validation_output == [0.5] * 11
+        assert job.seconds == 0.0
+        assert job.features is None
+
+    def test__restore__force__false(self):
+        stored = self.job()
+        self.cache.restore(stored)
+        self.finish(stored)
+
+        assert not TrainingCache(self.cache_dir, force=True).restore(self.job())
+
+    def test__restore__unreadable_entry__discarded(self):
+        job = self.job()
+        self.cache.restore(job)
+        self.cache._entry_path(job.cache_key).parent.mkdir(parents=True, exist_ok=True)
+        self.cache._entry_path(job.cache_key).write_bytes(b'not a pickle')
+
+        assert not self.cache.restore(self.job())
+        assert not self.cache._entry_path(job.cache_key).exists()
+
+    def test__store__over_budget__evicts_least_recently_used(self):
+        old, new = self.job(grouping_key='a'), self.job(grouping_key='b')
+        self.cache.restore(old)
+        self.finish(old)
+        os.utime(str(self.cache._entry_path(old.cache_key)), (0, 0))
+        self.cache.max_bytes = self.cache._entry_path(old.cache_key).stat().st_size + 10
+
+        self.cache.restore(new)
+        self.finish(new)
+
+        assert not self.cache._entry_path(old.cache_key).exists()
+        assert self.cache._entry_path(new.cache_key).exists()
@@ -0,0 +1,57 @@
+"""Tests for the data.writer module"""
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import aidp.data.writer as writer
+
+class TestDataWriters(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data = pd.DataFrame({'Subject': ['a', 'b'], 'p': [0.25, np.nan]})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test__ExcelDataWriter__same_layout_as_to_excel(self):
+        filepath = os.path.join(self.tmp_dir, 'out.xlsx')
+        expected_path = os.path.join(self.tmp_dir, 'expected.xlsx')
+        self.data.to_excel(expected_path)
+
+        writer.ExcelDataWriter().write_data(self.data, filepath)
+
+        pd.testing.assert_frame_equal(pd.read_excel(filepath), pd.read_excel(expected_path))
+
+    def test__CsvDataWriter__round_trips(self):
+        filepath = os.path.join(self.tmp_dir, 'out.csv')
+
+        writer.CsvDataWriter().write_data(self.data, filepath)
+
+        pd.testing.assert_frame_equal(pd.read_csv(filepath, index_col=0), self.data)
+
+    def test__ParquetDataWriter__round_trips(self):
+        filepath = os.path.join(self.tmp_dir, 'out.parquet')
+
+        writer.ParquetDataWriter().write_data(self.data, filepath)
+
+        pd.testing.assert_frame_equal(pd.read_parquet(filepath), self.data)
+
+    def test__CsvDataWriter__append_data__one_header(self):
+        filepath = os.path.join(self.tmp_dir, 'out.csv')
+        csv_writer = writer.CsvDataWriter()
+
+        csv_writer.append_data(self.data.iloc[:1], filepath, first_chunk=True)
+        csv_writer.append_data(self.data.iloc[1:], filepath, first_chunk=False)
+
+        pd.testing.assert_frame_equal(pd.read_csv(filepath, index_col=0), self.data)
+
+    def test__ParquetDataWriter__append_data__throws_error(self):
+        with self.assertRaises(NotImplementedError):
+            writer.ParquetDataWriter().append_data(self.data, os.path.join(self.tmp_dir, 'out.parquet'), True)
+
+    def test__get_writer__unsupported_format__throws_error(self):
+        assert isinstance(writer.get_writer('.csv'), writer.CsvDataWriter)
+        with self.assertRaises(NotImplementedError):
+            writer.get_writer('doc')